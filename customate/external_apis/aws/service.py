@@ -1,11 +1,15 @@
 import logging
 import boto3
 from botocore.config import Config
+from botocore.exceptions import EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError
 from customate import settings
 from customate.settings import EXTERNAL_SERVICES_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
+# Exceptions treated as AWS failures by circuit breaker
+AWS_FAILURE_EXCEPTIONS = (EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError)
+
 
 def get_aws_client(service_name, region_name=settings.AWS_REGION, *args, **kwargs):
     return boto3.client(service_name,
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+
+from frontend_api.exceptions import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Settings of breakers, may be overridden per upstream with CIRCUIT_BREAKERS setting, e.g.
+# CIRCUIT_BREAKERS = {"payment_api": {"max_concurrency": 50}}
+CIRCUIT_BREAKER_DEFAULTS = {
+    # share of failed calls (within "window" seconds) which opens the circuit
+    "failure_rate_threshold": 0.5,
+    # failure rate is not trusted until there are enough calls in window
+    "min_calls": 10,
+    "window": 60,
+    # how long (in seconds) the circuit stays open before letting probe calls through
+    "open_timeout": 30,
+    "half_open_calls": 1,
+    # max number of simultaneous calls to upstream within one process (bulkhead)
+    "max_concurrency": 20,
+    # how long (in seconds) the call may wait for free bulkhead slot
+    "bulkhead_timeout": 0.5,
+}
+CIRCUIT_BREAKERS = getattr(settings, "CIRCUIT_BREAKERS", {})
+
+DEFAULT_FAILURE_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+
+class CircuitBreakerCall:
+    def __init__(self):
+        # callers may mark call as failed without raising an exception, e.g. upon HTTP 5xx response
+        self.failed = False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with bulkhead for a single upstream service.
+
+    Closed circuit lets all calls through and counts failures within sliding window, it is opened once failure rate
+    exceeds threshold. Open circuit rejects calls with UpstreamUnavailable (without touching upstream) for
+    "open_timeout" seconds, after that it becomes half-open and lets few probe calls through: successful probe
+    closes circuit, failed one opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_rate_threshold, min_calls, window, open_timeout, half_open_calls,
+                 max_concurrency, bulkhead_timeout):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.max_concurrency = max_concurrency
+        self.bulkhead_timeout = bulkhead_timeout
+
+        self._lock = threading.Lock()
+        self._bulkhead = threading.BoundedSemaphore(max_concurrency)
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probes = 0
+        # [second, calls, failures] buckets
+        self._buckets = deque()
+        self._in_flight = 0
+        self._rejected = 0
+        self._opened_count = 0
+
+    @contextmanager
+    def call(self, failure_exceptions=DEFAULT_FAILURE_EXCEPTIONS):
+        """
+        Usage:
+            with breaker.call() as call:
+                response = requests.get(url)
+                call.failed = response.status_code >= 500
+
+        :param failure_exceptions: exceptions, which are treated as upstream failures
+        """
+        is_probe = self._acquire()
+        call = CircuitBreakerCall()
+        try:
+            yield call
+        except failure_exceptions:
+            call.failed = True
+            raise
+        finally:
+            self._release(call.failed, is_probe)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._get_state()
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            calls, failures = self._get_window_counts()
+            return {
+                "state": self._get_state(),
+                "calls": calls,
+                "failures": failures,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+                "opened_count": self._opened_count,
+            }
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            state = self._get_state()
+            is_probe = state == self.HALF_OPEN
+            if state == self.OPEN or (is_probe and self._probes >= self.half_open_calls):
+                self._rejected += 1
+                logger.info("Call to %s is rejected by open circuit breaker" % self.name, extra={'service': self.name})
+                raise UpstreamUnavailable()
+            if is_probe:
+                self._probes += 1
+
+        if not self._bulkhead.acquire(timeout=self.bulkhead_timeout):
+            with self._lock:
+                self._rejected += 1
+                if is_probe:
+                    self._probes -= 1
+            logger.warning("Too many concurrent calls to %s (max_concurrency=%s)" % (self.name, self.max_concurrency),
+                           extra={'service': self.name, 'max_concurrency': self.max_concurrency})
+            raise UpstreamUnavailable()
+
+        with self._lock:
+            self._in_flight += 1
+        return is_probe
+
+    def _release(self, failed: bool, is_probe: bool):
+        self._bulkhead.release()
+        with self._lock:
+            self._in_flight -= 1
+            if is_probe:
+                self._probes -= 1
+                if failed:
+                    self._open()
+                else:
+                    self._close()
+                return
+
+            self._add_call(failed)
+            if self._state == self.CLOSED:
+                calls, failures = self._get_window_counts()
+                if calls >= self.min_calls and failures / calls >= self.failure_rate_threshold:
+                    self._open()
+
+    def _get_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+            logger.info("Circuit breaker of %s is half-open" % self.name, extra={'service': self.name})
+        return self._state
+
+    def _open(self):
+        calls, failures = self._get_window_counts()
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._opened_count += 1
+        logger.warning("Circuit breaker of %s is open (calls=%s, failures=%s)" % (self.name, calls, failures),
+                       extra={'service': self.name, 'calls': calls, 'failures': failures})
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._buckets.clear()
+        logger.info("Circuit breaker of %s is closed" % self.name, extra={'service': self.name})
+
+    def _add_call(self, failed: bool):
+        second = int(time.monotonic())
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._buckets[-1][1] += 1
+        self._buckets[-1][2] += int(failed)
+
+    def _get_window_counts(self) -> (int, int):
+        since = int(time.monotonic()) - self.window
+        while self._buckets and self._buckets[0][0] <= since:
+            self._buckets.popleft()
+        return sum(b[1] for b in self._buckets), sum(b[2] for b in self._buckets)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Get process-wide circuit breaker of upstream service ("payment_api", "gbg", "loqate", "aws")
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                options = dict(CIRCUIT_BREAKER_DEFAULTS, **CIRCUIT_BREAKERS.get(name, {}))
+                breaker = _breakers[name] = CircuitBreaker(name, **options)
+    return breaker
+
+
+def get_breakers_metrics() -> dict:
+    """
+    Snapshot of breakers' state within current process
+    :return: {name: {"state", "calls", "failures", "in_flight", "rejected", "opened_count"}}
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.get_metrics() for breaker in breakers}
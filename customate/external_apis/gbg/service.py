@@ -2,6 +2,7 @@ from os import environ
 import logging
 
 import zeep
+import zeep.exceptions
 from zeep.transports import Transport
 from zeep.cache import InMemoryCache
 from zeep.wsse.username import UsernameToken
@@ -10,6 +11,7 @@ from requests.auth import HTTPBasicAuth
 
 import core.fields
 from core.logger import Timer
+from external_apis.circuit_breaker import get_breaker, DEFAULT_FAILURE_EXCEPTIONS
 from customate.settings import EXTERNAL_SERVICES_TIMEOUT
 
 from external_apis.gbg.settings import GBG_ACCOUNT, GBG_PASSWORD, GBG_WSDL, DEBUG
@@ -27,6 +29,8 @@ zeep_cache = InMemoryCache()
 logger = logging.getLogger(__name__)
 
 SERVICE = 'Gbg'
+# HTTP errors are raised by zeep as TransportError
+FAILURE_EXCEPTIONS = DEFAULT_FAILURE_EXCEPTIONS + (zeep.exceptions.TransportError,)
 
 
 def get_gbg_client():
@@ -96,15 +100,16 @@ def validate_banking_details(country: core.fields.Country,
 
     logger.info("Request to GBG service for banking details validation (input_data=%r)" % input_data,
                 extra={'input_data': input_data, 'service': SERVICE})
-    timer = Timer()
-    res = GlobalAuthenticate_service.AuthenticateSP(
-        ProfileIDVersion=get_profile(
-            profile_id=environ["GBG_{}_BANK_VALIDATION_PROFILE_ID".format(country.value)],
-            profile_version=environ.get("GBG_{}_BANK_VALIDATION_PROFILE_VERSION".format(country.value), 0)
-        ),
-        CustomerReference=customer_reference,
-        InputData=input_data
-    )
+    with get_breaker("gbg").call(failure_exceptions=FAILURE_EXCEPTIONS):
+        timer = Timer()
+        res = GlobalAuthenticate_service.AuthenticateSP(
+            ProfileIDVersion=get_profile(
+                profile_id=environ["GBG_{}_BANK_VALIDATION_PROFILE_ID".format(country.value)],
+                profile_version=environ.get("GBG_{}_BANK_VALIDATION_PROFILE_VERSION".format(country.value), 0)
+            ),
+            CustomerReference=customer_reference,
+            InputData=input_data
+        )
     logger.info("Response from GBG for banking details validation (BandText=%s, Score=%s): %r" % (res.BandText, res.Score, res),
                 extra={'response': res, 'duration': timer.duration(), 'service': SERVICE})
     return res
@@ -142,15 +147,16 @@ def validate_identity_details(country: core.fields.Country,
 
     logger.info("Request to GBG service for identity details validation (input_data=%r, customer_reference=%r)" % (input_data, customer_reference),
                 extra={'input_data': input_data, 'customer_reference': customer_reference, 'service': SERVICE})
-    timer = Timer()
-    res = GlobalAuthenticate_service.AuthenticateSP(
-        ProfileIDVersion=get_profile(
-            profile_id=environ["GBG_{}_IDENTITY_VALIDATION_PROFILE_ID".format(country.value)],
-            profile_version=environ.get("GBG_{}_IDENTITY_VALIDATION_PROFILE_VERSION".format(country.value), 0)
-        ),
-        CustomerReference=customer_reference,
-        InputData=input_data
-    )
+    with get_breaker("gbg").call(failure_exceptions=FAILURE_EXCEPTIONS):
+        timer = Timer()
+        res = GlobalAuthenticate_service.AuthenticateSP(
+            ProfileIDVersion=get_profile(
+                profile_id=environ["GBG_{}_IDENTITY_VALIDATION_PROFILE_ID".format(country.value)],
+                profile_version=environ.get("GBG_{}_IDENTITY_VALIDATION_PROFILE_VERSION".format(country.value), 0)
+            ),
+            CustomerReference=customer_reference,
+            InputData=input_data
+        )
     logger.info("Response from GBG for identity details validation (BandText=%s, Score=%s): %r" % (res.BandText, res.Score, res),
                 extra={'response': res, 'duration': timer.duration(), 'service': SERVICE})
     return res
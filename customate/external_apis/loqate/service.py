@@ -4,6 +4,7 @@ import logging
 from typing import List, Dict
 
 from core.logger import Timer
+from external_apis.circuit_breaker import get_breaker
 from external_apis.loqate.settings import LOQATE_SERVICE_KEY
 from customate.settings import COUNTRIES_AVAILABLE, EXTERNAL_SERVICES_TIMEOUT
 
@@ -55,7 +56,10 @@ def make_request(url, params):
     id = new_params.pop('id', None)
     if id:
         new_params["Id"] = id
-    return requests.post(url, headers=BASE_HEADERS, params=new_params, timeout=EXTERNAL_SERVICES_TIMEOUT)
+    with get_breaker("loqate").call() as call:
+        response = requests.post(url, headers=BASE_HEADERS, params=new_params, timeout=EXTERNAL_SERVICES_TIMEOUT)
+        call.failed = response.status_code >= 500
+        return response
 
 
 def _check_errors(items: List):
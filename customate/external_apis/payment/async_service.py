@@ -0,0 +1,203 @@
+"""
+Asynchronous (aiohttp based) twin of external_apis.payment.service.
+
+It returns the same typed results and raises the same exceptions (PaymentApiError for HTTP 400, requests.HTTPError
+with response for other error responses), so callers may switch between clients without changing error handling.
+Use gather_bounded() to run many calls concurrently and run_sync() to call coroutines from sync code:
+
+    payees = run_sync(gather_bounded([Payee.get(payee_id) for payee_id in payee_ids], limit=20))
+
+NOTE: the client is used by benchmark_payment_api_client command only. Unlike the sync client, its calls don't go
+through PaymentAPI circuit breaker (see external_apis.circuit_breaker): breaker's bulkhead waits on a thread semaphore,
+which would block the event loop. Make breaker asyncio-aware before using this client in production code.
+"""
+import asyncio
+import logging
+import weakref
+from datetime import datetime
+from uuid import UUID
+
+import aiohttp
+import requests
+from django.conf import settings
+
+from core.fields import Currency
+from core.logger import Timer
+from customate.settings import EXTERNAL_SERVICES_TIMEOUT
+from external_apis.payment.models import PaymentResult, PayeeDetails, FundingSourceDetails, WalletDetails
+from external_apis.payment.service import BASE_URL, PaymentApiError, build_payment_payload, parse_payment_result, \
+    parse_payee_details, parse_funding_source_details, parse_wallet_details
+import external_apis.payment.session as payment_api_session
+
+logger = logging.getLogger(__name__)
+
+# Max number of simultaneously opened connections to PaymentAPI (within one event loop)
+PAYMENT_API_ASYNC_POOL_SIZE = getattr(settings, "PAYMENT_API_ASYNC_POOL_SIZE", 50)
+# Default number of concurrently running calls for gather_bounded()
+PAYMENT_API_ASYNC_CONCURRENCY = getattr(settings, "PAYMENT_API_ASYNC_CONCURRENCY", 20)
+
+# Sessions are bound to event loop they were created in
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_event_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=PAYMENT_API_ASYNC_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=EXTERNAL_SERVICES_TIMEOUT),
+            headers={"Content-Type": "application/json"},
+        )
+        _sessions[loop] = session
+        logger.info("Created async PaymentAPI session (pool_size=%s)" % PAYMENT_API_ASYNC_POOL_SIZE)
+    return session
+
+
+async def close_session():
+    session = _sessions.pop(asyncio.get_event_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def request(method: str, url: str, endpoint: str = None, **kwargs) -> dict:
+    """
+    Send request to PaymentAPI and return decoded json body.
+    Latency/errors are accounted in the same metrics as for sync client (see session.get_metrics).
+
+    :param method: HTTP method
+    :param url: full url
+    :param endpoint: name of endpoint for metrics, e.g. "GET payees"
+    :param kwargs: the same as for aiohttp.ClientSession.request
+    :return:
+    """
+    endpoint = endpoint or "%s %s" % (method.upper(), payment_api_session.get_resource_name(url))
+    timer = Timer()
+    failed = True
+    try:
+        async with get_session().request(method, url, **kwargs) as r:
+            failed = r.status >= 500
+            if r.status == requests.codes.bad_request:
+                raise PaymentApiError(json_response=await r.json(content_type=None))
+            if r.status >= 400:
+                # the same response object as sync client provides, so that callers may inspect status and body
+                response = requests.Response()
+                response.status_code = r.status
+                response.reason = r.reason
+                response.url = url
+                response.headers.update(r.headers)
+                response._content = await r.read()
+                raise requests.HTTPError("%s Error: %s for url: %s" % (r.status, r.reason, url), response=response)
+            if r.status == requests.codes.no_content:
+                return {}
+            return await r.json(content_type=None)
+    finally:
+        duration = timer.duration()
+        payment_api_session.record(endpoint, duration, failed)
+        logger.debug("PaymentAPI async request %s took %s (failed=%s)" % (endpoint, duration, failed))
+
+
+async def gather_bounded(coros, limit: int = PAYMENT_API_ASYNC_CONCURRENCY, return_exceptions: bool = False) -> list:
+    """
+    Like asyncio.gather, but runs at most `limit` coroutines at the same time.
+    Results are returned in the same order as coroutines were given.
+
+    :param coros: iterable of coroutines
+    :param limit: max number of concurrently running coroutines
+    :param return_exceptions: return exceptions as results instead of raising the first one
+    :return:
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*[run(coro) for coro in coros], return_exceptions=return_exceptions)
+
+
+def run_sync(coro):
+    """
+    Run coroutine from sync code (e.g. celery task) in a separate event loop and wait for result.
+    Session created within this loop is closed afterwards.
+
+    :param coro:
+    :return: coroutine result
+    """
+
+    async def run():
+        try:
+            return await coro
+        finally:
+            await close_session()
+
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(run())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class Payment:
+
+    @staticmethod
+    async def create(user_id: UUID, payment_account_id: UUID,
+                     currency: Currency, amount: int, description: str,
+                     payee_id: UUID, funding_source_id: UUID,
+                     schedule_id: UUID = None,
+                     payment_id: UUID = None,
+                     escrow_id: UUID = None,
+                     parent_payment_id: UUID = None,
+                     target_user_id: UUID = None,
+                     execution_date: datetime = None) -> PaymentResult:
+        """
+        Initiates payment, see service.Payment.create
+        """
+        payload = build_payment_payload(
+            user_id=user_id, payment_account_id=payment_account_id, currency=currency, amount=amount,
+            description=description, payee_id=payee_id, funding_source_id=funding_source_id,
+            schedule_id=schedule_id, payment_id=payment_id, escrow_id=escrow_id,
+            parent_payment_id=parent_payment_id, target_user_id=target_user_id, execution_date=execution_date
+        )
+        logger.info("payload=%r" % (payload,))
+        res = await request("POST", "{base_url}payments/".format(base_url=BASE_URL), json=payload)
+        logger.debug("res=%r" % res)
+        return parse_payment_result(res["data"])
+
+
+class Payee:
+
+    @staticmethod
+    async def get(payee_id: UUID) -> PayeeDetails:
+        res = await request("GET", "{base_url}payees/{payee_id}".format(
+            base_url=BASE_URL,
+            payee_id=str(payee_id)
+        ))
+        logger.debug("res=%r" % res)
+        return parse_payee_details(res["data"])
+
+
+class FundingSource:
+
+    @staticmethod
+    async def get(fs_id: UUID) -> FundingSourceDetails:
+        res = await request("GET", "{base_url}funding_sources/{fs_id}".format(
+            base_url=BASE_URL,
+            fs_id=str(fs_id)
+        ))
+        logger.debug("res=%r" % res)
+        return parse_funding_source_details(res["data"])
+
+
+class Wallet:
+
+    @staticmethod
+    async def get(wallet_id: UUID) -> WalletDetails:
+        res = await request("GET", "{base_url}wallets/{wallet_id}".format(
+            base_url=BASE_URL,
+            wallet_id=str(wallet_id)
+        ))
+        logger.debug("res=%r" % res)
+        return parse_wallet_details(res["data"])
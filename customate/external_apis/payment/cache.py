@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Shared tier (Django cache backend) keeps PaymentAPI resources for PAYMENT_API_CACHE_TTL seconds.
+# Local-memory tier is invalidated within current process only, so its TTL should be kept short.
+PAYMENT_API_CACHE_ALIAS = getattr(settings, "PAYMENT_API_CACHE_ALIAS", "default")
+PAYMENT_API_CACHE_TTL = getattr(settings, "PAYMENT_API_CACHE_TTL", 300)
+PAYMENT_API_LOCAL_CACHE_TTL = getattr(settings, "PAYMENT_API_LOCAL_CACHE_TTL", 30)
+PAYMENT_API_LOCAL_CACHE_SIZE = getattr(settings, "PAYMENT_API_LOCAL_CACHE_SIZE", 1000)
+
+
+class PaymentApiCache:
+    """
+    Read-through cache of PaymentAPI resources (payees, funding sources, wallets) keyed by resource type and id.
+    Lookups go to local-memory LRU first, then to Django cache, and only then to PaymentAPI (loader).
+    """
+
+    def __init__(self, alias=PAYMENT_API_CACHE_ALIAS, ttl=PAYMENT_API_CACHE_TTL,
+                 local_ttl=PAYMENT_API_LOCAL_CACHE_TTL, local_size=PAYMENT_API_LOCAL_CACHE_SIZE):
+        self.alias = alias
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._metrics = defaultdict(lambda: {"local_hits": 0, "hits": 0, "misses": 0, "invalidations": 0})
+
+    def get_or_load(self, resource: str, resource_id, loader):
+        """
+        :param resource: resource type, e.g. "payees"
+        :param resource_id:
+        :param loader: callable without arguments, which requests resource from PaymentAPI
+        :return:
+        """
+        key = self._get_key(resource, resource_id)
+        value = self._get_local(key)
+        if value is not None:
+            self._count(resource, "local_hits")
+            return value
+
+        value = self._get_shared(key)
+        if value is not None:
+            self._count(resource, "hits")
+        else:
+            self._count(resource, "misses")
+            value = loader()
+            self._set_shared(key, value)
+        self._set_local(key, value)
+        return value
+
+    def invalidate(self, resource: str, resource_id):
+        key = self._get_key(resource, resource_id)
+        logger.debug("Invalidating PaymentAPI cache (key=%s)" % key)
+        with self._lock:
+            self._local.pop(key, None)
+        self._count(resource, "invalidations")
+        try:
+            caches[self.alias].delete(key)
+        except Exception as e:
+            logger.warning("Unable to invalidate PaymentAPI cache (key=%s): %r" % (key, e))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def get_metrics(self) -> dict:
+        """
+        :return: {resource: {"local_hits", "hits", "misses", "invalidations"}}
+        """
+        with self._lock:
+            return {resource: dict(values) for resource, values in self._metrics.items()}
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics.clear()
+
+    @staticmethod
+    def _get_key(resource: str, resource_id) -> str:
+        return "payment_api:%s:%s" % (resource, resource_id)
+
+    def _count(self, resource: str, counter: str):
+        with self._lock:
+            self._metrics[resource][counter] += 1
+
+    def _get_local(self, key: str):
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    # Unavailable cache backend should not break requests to PaymentAPI
+    def _get_shared(self, key: str):
+        try:
+            return caches[self.alias].get(key)
+        except Exception as e:
+            logger.warning("Unable to read PaymentAPI cache (key=%s): %r" % (key, e))
+            return None
+
+    def _set_shared(self, key: str, value):
+        try:
+            caches[self.alias].set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning("Unable to update PaymentAPI cache (key=%s): %r" % (key, e))
+
+
+payment_api_cache = PaymentApiCache()
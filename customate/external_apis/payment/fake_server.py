@@ -0,0 +1,387 @@
+"""
+In-process stand-in for PaymentAPI, intended for load testing and benchmarks (never use it in production).
+
+It implements generic JSON:API CRUD for resources used by external_apis.payment.service and
+payment_api.core.client.Session (payments, payees, funding_sources, wallets, accounts, ...) plus the few special
+endpoints (forced_payments, schedule_payments, accounts/<service_type>). Created payments are "executed" by
+sending the same events PaymentAPI sends: on_payment_change & on_transaction_change.
+
+    fake_api = FakePaymentApi(latency=0.05, error_rate=0.01)
+    base_url = fake_api.start()
+    ...
+    fake_api.deliver_events()
+    fake_api.stop()
+"""
+import copy
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Events are stored and delivered by explicit deliver_events() call (in the caller's thread)
+CALLBACKS_QUEUE = "queue"
+# Events are sent to celery workers right away, as real PaymentAPI does
+CALLBACKS_CELERY = "celery"
+
+
+class FakePaymentApi:
+
+    def __init__(self, latency=0, latency_jitter=0, error_rate=0, failure_rate=0,
+                 callbacks=CALLBACKS_QUEUE, callback_delay=0, hide_transactions=False, seed=None):
+        """
+        :param latency: delay of every response (seconds)
+        :param latency_jitter: random addition to latency (seconds)
+        :param error_rate: share of requests answered with HTTP 503
+        :param failure_rate: share of payments which end up FAILED
+        :param callbacks: CALLBACKS_QUEUE or CALLBACKS_CELERY
+        :param callback_delay: countdown of celery callbacks (seconds)
+        :param hide_transactions: send transactions with "is_hidden" flag (no user notifications)
+        :param seed: seed of random generator, for reproducible runs
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.failure_rate = failure_rate
+        self.callbacks = callbacks
+        self.callback_delay = callback_delay
+        self.hide_transactions = hide_transactions
+
+        self.resources = defaultdict(dict)
+        self.events = queue.Queue()
+        self.requests_count = 0
+        self.errors_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self, host="127.0.0.1", port=0) -> str:
+        """
+        Start serving in background thread
+        :return: base url of fake PaymentAPI
+        """
+        api = self
+
+        class Handler(FakePaymentApiHandler):
+            fake_api = api
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        base_url = "http://%s:%s/" % (host, self._server.server_port)
+        logger.info("Started fake PaymentAPI (base_url=%s)" % base_url)
+        return base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def get_resources(self, resource_type: str) -> list:
+        with self._lock:
+            return list(self.resources[resource_type].values())
+
+    def deliver_events(self, max_rounds=10, batch_size=None) -> int:
+        """
+        Deliver queued events to celery tasks (synchronously, within current thread).
+        Processing of events may produce new payments (e.g. retries with backup funding source), their events
+        are delivered in following rounds.
+        :param batch_size: if specified, events of each round are delivered by batches
+            (see on_payment_changes_batch & on_transaction_changes_batch), payment events go first
+        :return: number of delivered events
+        """
+        from frontend_api.tasks.payments import (
+            on_payment_change, on_transaction_change, on_payment_changes_batch, on_transaction_changes_batch
+        )
+        tasks = {"on_payment_change": on_payment_change, "on_transaction_change": on_transaction_change}
+        batch_tasks = {"on_payment_change": on_payment_changes_batch,
+                       "on_transaction_change": on_transaction_changes_batch}
+
+        count = 0
+        for _ in range(max_rounds):
+            if self.events.empty():
+                break
+            events = []
+            while not self.events.empty():
+                events.append(self.events.get())
+            count += len(events)
+
+            if not batch_size:
+                for task_name, info in events:
+                    tasks[task_name].apply(args=[info])
+                continue
+
+            for task_name in ("on_payment_change", "on_transaction_change"):
+                infos = [info for name, info in events if name == task_name]
+                for i in range(0, len(infos), batch_size):
+                    batch_tasks[task_name].apply(args=[infos[i:i + batch_size]])
+        return count
+
+    def handle(self, method: str, url: str, body: dict) -> (int, dict):
+        """
+        :return: (HTTP status, json response)
+        """
+        with self._lock:
+            self.requests_count += 1
+            delay = self.latency + self._random.random() * self.latency_jitter
+            is_error = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if is_error:
+            with self._lock:
+                self.errors_count += 1
+            return 503, {"errors": [{"status": "503", "detail": "Fake PaymentAPI error"}]}
+
+        parts = urlsplit(url)
+        path = [unquote(p) for p in parts.path.split("/") if p]
+        if not path:
+            return 404, self._error(404, "Unknown endpoint")
+        resource_type, resource_id = path[0], path[1] if len(path) > 1 else None
+
+        with self._lock:
+            if method == "GET" and resource_id:
+                return self._get(resource_type, resource_id)
+            if method == "GET":
+                return 200, {"data": self._find(resource_type, parse_qs(parts.query))}
+            if method == "POST" and resource_type == "forced_payments":
+                return self._force_payment(body)
+            if method == "POST" and resource_type == "accounts" and resource_id:
+                # service accounts (fee, tax, credit_card)
+                return 201, {"data": self._create("accounts", body["data"])}
+            if method == "POST":
+                return 201, {"data": self._create(resource_type, body["data"])}
+            if method == "PATCH" and resource_id:
+                return self._update(resource_type, resource_id, body["data"])
+            if method == "DELETE" and resource_type == "schedule_payments" and resource_id:
+                return self._cancel_schedule_payments(resource_id)
+            if method == "DELETE" and resource_id:
+                return self._deactivate(resource_type, resource_id)
+        return 405, self._error(405, "Method is not supported")
+
+    @staticmethod
+    def _error(status: int, detail: str) -> dict:
+        return {"errors": [{"status": str(status), "detail": detail}]}
+
+    def _get(self, resource_type: str, resource_id: str) -> (int, dict):
+        resource = self.resources[resource_type].get(resource_id)
+        if resource is None:
+            resource = self._generate(resource_type, resource_id)
+            if resource is None:
+                return 404, self._error(404, "%s (id=%s) was not found" % (resource_type, resource_id))
+        return 200, {"data": resource}
+
+    def _find(self, resource_type: str, query: dict) -> list:
+        # Only RSQL conjunction of equalities is supported, e.g. filter[payees]=account.id==<id>;type==WALLET
+        conditions = []
+        rsql = query.get("filter[%s]" % resource_type, [""])[0]
+        for condition in filter(None, rsql.split(";")):
+            field, value = condition.split("==", 1)
+            conditions.append((field, value))
+
+        return [r for r in self.resources[resource_type].values()
+                if all(self._get_field(r, field) == value for field, value in conditions)]
+
+    @staticmethod
+    def _get_field(resource: dict, field: str):
+        if field == "id":
+            return resource["id"]
+        name, _, attr = field.partition(".")
+        relationship = resource.get("relationships", {}).get(name)
+        if relationship is not None and attr == "id":
+            return (relationship.get("data") or {}).get("id")
+        value = resource["attributes"].get(name)
+        return str(value) if value is not None else None
+
+    def _create(self, resource_type: str, data: dict) -> dict:
+        resource = {
+            "type": resource_type,
+            "id": data.get("id") or str(uuid4()),
+            "attributes": dict(data.get("attributes") or {}),
+            "relationships": dict(data.get("relationships") or {}),
+        }
+        now = int(time.time() * 1000)
+        resource["attributes"].setdefault("active", 1)
+        resource["attributes"].setdefault("creationDate", now)
+        resource["attributes"]["updateDate"] = now
+
+        if resource_type == "payments":
+            resource["attributes"]["status"] = "PENDING"
+            resource["attributes"].setdefault("data", {})
+        elif resource_type == "wallets":
+            self._init_wallet(resource)
+
+        self.resources[resource_type][resource["id"]] = resource
+        response = copy.deepcopy(resource)
+        if resource_type == "payments":
+            self._execute_payment(resource)
+        return response
+
+    def _init_wallet(self, wallet: dict):
+        wallet["attributes"].setdefault("balance", 0)
+        wallet["attributes"].setdefault("iban", str(uuid4()))
+        wallet["attributes"].setdefault("isVirtual", 1)
+        currency = wallet["attributes"].get("currency", "GBP")
+        account = wallet["relationships"].get("account", {"data": {"type": "accounts", "id": str(uuid4())}})
+        wallet["relationships"]["account"] = account
+
+        fs = self._generate("funding_sources", str(uuid4()), type="WALLET", currency=currency, account=account,
+                            wallet_id=wallet["id"])
+        payee = self._generate("payees", str(uuid4()), type="WALLET", currency=currency, account=account,
+                               wallet_id=wallet["id"])
+        wallet["relationships"]["fundingSource"] = {"data": {"type": "funding_sources", "id": fs["id"]}}
+        wallet["relationships"]["payee"] = {"data": {"type": "payees", "id": payee["id"]}}
+
+    def _generate(self, resource_type: str, resource_id: str, type=None, currency="GBP", account=None,
+                  wallet_id=None):
+        """
+        Benchmarks refer to random payees/funding sources/wallets, so unknown ones are generated on the fly
+        """
+        account = account or {"data": {"type": "accounts", "id": str(uuid4())}}
+        if resource_type == "payees":
+            attributes = {
+                "title": "Fake Payee",
+                "type": type or "WALLET",
+                "currency": currency,
+                "data": {
+                    "walletId": wallet_id,
+                    "recipient": {"fullName": "Fake Recipient", "email": "fake.recipient@example.com"},
+                    "account": {"iban": "GB29NWBK60161331926819"}
+                }
+            }
+        elif resource_type == "funding_sources":
+            attributes = {
+                "title": "Fake Funding Source",
+                "type": type or "WALLET",
+                "currency": currency,
+                "status": "VALID",
+                "data": {"walletId": wallet_id}
+            }
+        elif resource_type == "wallets":
+            attributes = {"currency": currency, "balance": 0, "iban": str(uuid4()), "isVirtual": 1}
+        else:
+            return None
+
+        resource = {
+            "type": resource_type,
+            "id": resource_id,
+            "attributes": dict(attributes, active=1),
+            "relationships": {"account": account},
+        }
+        self.resources[resource_type][resource_id] = resource
+        return resource
+
+    def _update(self, resource_type: str, resource_id: str, data: dict) -> (int, dict):
+        resource = self.resources[resource_type].get(resource_id)
+        if resource is None:
+            return 404, self._error(404, "%s (id=%s) was not found" % (resource_type, resource_id))
+        resource["attributes"].update(data.get("attributes") or {})
+        resource["relationships"].update(data.get("relationships") or {})
+        return 200, {"data": resource}
+
+    def _deactivate(self, resource_type: str, resource_id: str) -> (int, dict):
+        resource = self.resources[resource_type].get(resource_id)
+        if resource is not None:
+            resource["attributes"]["active"] = 0
+        return 204, {}
+
+    def _cancel_schedule_payments(self, schedule_id: str) -> (int, dict):
+        for payment in self.resources["payments"].values():
+            if payment["attributes"].get("scheduleId") == schedule_id \
+                    and payment["attributes"]["status"] in ("PENDING", "PROCESSING"):
+                payment["attributes"]["status"] = "CANCELED"
+        return 204, {}
+
+    def _force_payment(self, data: dict) -> (int, dict):
+        original_id = data["data"]["attributes"]["originalPaymentId"]
+        original = self.resources["payments"].get(original_id)
+        if original is None:
+            return 400, self._error(400, "Payment (id=%s) was not found" % original_id)
+
+        payment = self._create("payments", {
+            "attributes": dict(original["attributes"], data=dict(original["attributes"]["data"],
+                                                                 parentPaymentId=original_id)),
+            "relationships": original["relationships"]
+        })
+        return 201, {"data": {
+            "type": "forced_payments",
+            "id": str(uuid4()),
+            "attributes": dict(data["data"]["attributes"], newPaymentId=payment["id"], newPaymentStatus="PENDING"),
+            "relationships": {}
+        }}
+
+    def _execute_payment(self, payment: dict):
+        """
+        Emit the same sequence of events PaymentAPI sends for successfully submitted payment:
+        PROCESSING, then transaction and final payment status (SUCCESS or FAILED)
+        """
+        is_failed = self._random.random() < self.failure_rate
+        status = "FAILED" if is_failed else "SUCCESS"
+        attributes = payment["attributes"]
+
+        def get_related_id(name):
+            return (payment["relationships"].get(name, {}).get("data") or {}).get("id")
+
+        payment_info = {
+            "payment_id": payment["id"],
+            "user_id": attributes.get("userId"),
+            "account_id": get_related_id("account"),
+            "schedule_id": attributes.get("scheduleId"),
+            "escrow_id": attributes["data"].get("escrowId"),
+            "funding_source_id": get_related_id("origin"),
+            "payee_id": get_related_id("recipient"),
+            "amount": attributes["data"].get("amount"),
+            "currency": attributes.get("currency"),
+        }
+        self._send_event("on_payment_change", dict(payment_info, status="PROCESSING"))
+        self._send_event("on_transaction_change", {
+            "transaction_id": str(uuid4()),
+            "status": status,
+            "user_id": payment_info["user_id"],
+            "schedule_id": payment_info["schedule_id"],
+            "escrow_id": payment_info["escrow_id"],
+            "funding_source_id": payment_info["funding_source_id"],
+            "payee_id": payment_info["payee_id"],
+            "amount": payment_info["amount"],
+            "currency": payment_info["currency"],
+            "is_hidden": int(self.hide_transactions),
+        })
+        self._send_event("on_payment_change", dict(
+            payment_info, status=status, error_message="Fake PaymentAPI failure" if is_failed else None
+        ))
+        attributes["status"] = status
+
+    def _send_event(self, task_name: str, info: dict):
+        if self.callbacks == CALLBACKS_CELERY:
+            from frontend_api.tasks import payments
+            getattr(payments, task_name).apply_async(args=[info], countdown=self.callback_delay)
+        else:
+            self.events.put((task_name, info))
+
+
+class FakePaymentApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake_api = None  # type: FakePaymentApi
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, response = self.fake_api.handle(self.command, self.path, body)
+        content = json.dumps(response).encode() if status != 204 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        logger.debug("Fake PaymentAPI: %s" % (format % args))
@@ -11,6 +11,8 @@ from core.fields import PaymentStatusType, Currency, PayeeType
 from external_apis.payment.models import PaymentResult, PayeeDetails
 from external_apis.payment.models import FundingSourceDetails, FundingSourceType
 from external_apis.payment.models import WalletDetails
+import external_apis.payment.session as payment_api_session
+from external_apis.payment.cache import payment_api_cache
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +35,112 @@ class PaymentApiError(requests.HTTPError):
         return "detail=%s, response=%r" % (self.error_detail, self.json_response)
 
 
+def build_payment_payload(user_id: UUID, payment_account_id: UUID,
+                          currency: Currency, amount: int, description: str,
+                          payee_id: UUID, funding_source_id: UUID,
+                          schedule_id: UUID = None,
+                          payment_id: UUID = None,
+                          escrow_id: UUID = None,
+                          parent_payment_id: UUID = None,
+                          target_user_id: UUID = None,
+                          execution_date: datetime = None) -> dict:
+    """
+    Build request body for payment creation (shared by sync and async clients).
+    See Payment.create for description of parameters.
+    """
+    data = {
+        "amount": amount,
+        "description": description,
+        "parentPaymentId": str(parent_payment_id) if parent_payment_id else None,
+        "executionDate": datetime.timestamp(execution_date) if execution_date else None,
+        "targetUserId": str(target_user_id) if target_user_id else None
+    }
+    if escrow_id:
+        data.update({
+            "escrowId": str(escrow_id)
+        })
+
+    payload = {
+        "data": {
+            "type": "payments",
+            "id": str(payment_id) if payment_id else str(uuid4()),
+            "attributes": {
+                "userId": str(user_id),
+                "currency": currency.value,
+                "scheduleId": str(schedule_id) if schedule_id else None,
+                "data": data
+            },
+            "relationships": {
+                "account": {
+                    "data": {
+                        "type": "accounts",
+                        "id": str(payment_account_id)
+                    }
+                },
+                "origin": {
+                    "data": {
+                        "type": "funding_sources",
+                        "id": str(funding_source_id)
+                    }
+                },
+                "recipient": {
+                    "data": {
+                        "type": "payees",
+                        "id": str(payee_id)
+                    }
+                }
+            }
+        }
+    }
+    return payload
+
+
+def parse_payment_result(data: dict) -> PaymentResult:
+    return PaymentResult(
+        id=UUID(data["id"]),
+        status=PaymentStatusType(data["attributes"]["status"]),
+        error_message=data["attributes"]["data"].get('errorMessage')
+    )
+
+
+def parse_payee_details(data: dict) -> PayeeDetails:
+    wallet_id = data['attributes']['data'].get('walletId')
+    return PayeeDetails(
+        id=UUID(data["id"]),
+        title=data["attributes"]["title"],
+        type=PayeeType(data["attributes"]["type"]),
+        iban=data['attributes']['data']['account']['iban'],
+        recipient_name=data['attributes']['data']['recipient']['fullName'],
+        recipient_email=data['attributes']['data']['recipient']['email'],
+        payment_account_id=UUID(data['relationships']['account']['data']['id']),
+        wallet_id=UUID(wallet_id) if wallet_id else None
+    )
+
+
+def parse_funding_source_details(data: dict) -> FundingSourceDetails:
+    return FundingSourceDetails(
+        id=UUID(data["id"]),
+        type=FundingSourceType(data["attributes"]["type"]),
+        currency=Currency(data["attributes"]["currency"]),
+        payment_account_id=UUID(data['relationships']['account']['data']['id'])
+    )
+
+
+def parse_wallet_details(data: dict) -> WalletDetails:
+    return WalletDetails(
+        id=UUID(data["id"]),
+        currency=Currency(data["attributes"]["currency"]),
+        iban=data["attributes"]["iban"],
+        balance=int(data["attributes"]["balance"]),
+        is_virtual=bool(int(data["attributes"]["isVirtual"])),
+        payment_account_id=UUID(data['relationships']['account']['data']['id']),
+        # Returning this fields during processing GET request requires additional changes in Payment API,
+        # which are not planned to be implemented
+        funding_source_id=None,
+        payee_id=None,
+    )
+
+
 class SchedulePayment:
     """
     Schedule Payment Management
@@ -41,7 +149,7 @@ class SchedulePayment:
 
     @staticmethod
     def cancel_all_payments(schedule_id: UUID):
-        r = requests.delete("{base_url}schedule_payments/{schedule_id}".format(
+        r = payment_api_session.delete("{base_url}schedule_payments/{schedule_id}".format(
             base_url=BASE_URL,
             schedule_id=str(schedule_id)
         ), headers={
@@ -80,7 +188,7 @@ class Payment:
             }
         }
 
-        r = requests.post("{base_url}forced_payments/".format(base_url=BASE_URL), json=payload)
+        r = payment_api_session.post("{base_url}forced_payments/".format(base_url=BASE_URL), json=payload)
         if r.status_code == requests.codes.bad_request:
             raise PaymentApiError(json_response=r.json())
         else:
@@ -105,6 +213,26 @@ class Payment:
         status = PaymentStatusType(res["data"]["attributes"]["newPaymentStatus"])
         return payment_id, status
 
+    @staticmethod
+    def exists(payment_id: UUID) -> bool:
+        """
+        Check whether payment was created in PaymentAPI
+
+        :param payment_id:
+        :return:
+        """
+        r = payment_api_session.get("{base_url}payments/{payment_id}".format(
+            base_url=BASE_URL,
+            payment_id=str(payment_id)
+        ), headers={
+            "Content-Type": "application/json"
+        })
+
+        if r.status_code == requests.codes.not_found:
+            return False
+        r.raise_for_status()
+        return True
+
     @staticmethod
     def create(user_id: UUID, payment_account_id: UUID,
                currency: Currency, amount: int, description: str,
@@ -136,54 +264,16 @@ class Payment:
         :return:
         """
 
-        data = {
-            "amount": amount,
-            "description": description,
-            "parentPaymentId": str(parent_payment_id) if parent_payment_id else None,
-            "executionDate": datetime.timestamp(execution_date) if execution_date else None,
-            "targetUserId": str(target_user_id) if target_user_id else None
-        }
-        if escrow_id:
-            data.update({
-                "escrowId": str(escrow_id)
-            })
-
-        payload = {
-            "data": {
-                "type": "payments",
-                "id": str(payment_id) if payment_id else str(uuid4()),
-                "attributes": {
-                    "userId": str(user_id),
-                    "currency": currency.value,
-                    "scheduleId": str(schedule_id) if schedule_id else None,
-                    "data": data
-                },
-                "relationships": {
-                    "account": {
-                        "data": {
-                            "type": "accounts",
-                            "id": str(payment_account_id)
-                        }
-                    },
-                    "origin": {
-                        "data": {
-                            "type": "funding_sources",
-                            "id": str(funding_source_id)
-                        }
-                    },
-                    "recipient": {
-                        "data": {
-                            "type": "payees",
-                            "id": str(payee_id)
-                        }
-                    }
-                }
-            }
-        }
+        payload = build_payment_payload(
+            user_id=user_id, payment_account_id=payment_account_id, currency=currency, amount=amount,
+            description=description, payee_id=payee_id, funding_source_id=funding_source_id,
+            schedule_id=schedule_id, payment_id=payment_id, escrow_id=escrow_id,
+            parent_payment_id=parent_payment_id, target_user_id=target_user_id, execution_date=execution_date
+        )
 
         logger.info("payload=%r" % (payload,))
 
-        r = requests.post("{base_url}payments/".format(base_url=BASE_URL), json=payload)
+        r = payment_api_session.post("{base_url}payments/".format(base_url=BASE_URL), json=payload)
         if r.status_code == requests.codes.bad_request:
             raise PaymentApiError(json_response=r.json())
         else:
@@ -242,11 +332,7 @@ class Payment:
         #     }
         #   }
         # }
-        return PaymentResult(
-            id=UUID(res["data"]["id"]),
-            status=PaymentStatusType(res["data"]["attributes"]["status"]),
-            error_message=res["data"]["attributes"]["data"].get('errorMessage')
-        )
+        return parse_payment_result(res["data"])
 
 
 class Payee:
@@ -266,7 +352,7 @@ class Payee:
         :return:
         """
 
-        r = requests.get("{base_url}payees/{payee_id}".format(
+        r = payment_api_session.get("{base_url}payees/{payee_id}".format(
             base_url=BASE_URL,
             payee_id=str(payee_id)
         ), headers={
@@ -327,18 +413,16 @@ class Payee:
         # }
         res = r.json()
         logger.debug("res=%r" % res)
-        wallet_id = res['data']['attributes']['data'].get('walletId')
+        return parse_payee_details(res["data"])
 
-        return PayeeDetails(
-            id=UUID(res["data"]["id"]),
-            title=res["data"]["attributes"]["title"],
-            type=PayeeType(res["data"]["attributes"]["type"]),
-            iban=res['data']['attributes']['data']['account']['iban'],
-            recipient_name=res['data']['attributes']['data']['recipient']['fullName'],
-            recipient_email=res['data']['attributes']['data']['recipient']['email'],
-            payment_account_id=UUID(res['data']['relationships']['account']['data']['id']),
-            wallet_id=UUID(wallet_id) if wallet_id else None
-        )
+    @staticmethod
+    def get_cached(payee_id: UUID) -> PayeeDetails:
+        """
+        The same as get, but may return recently cached details (see payment_api_cache)
+        :param payee_id:
+        :return:
+        """
+        return payment_api_cache.get_or_load("payees", payee_id, lambda: Payee.get(payee_id))
 
     @staticmethod
     def find(payment_account_id: UUID, payee_type: PayeeType, currency: Currency) -> [PayeeDetails]:
@@ -353,7 +437,7 @@ class Payee:
 
         # Using RSQL as query language (https://github.com/jirutka/rsql-parser), only this filter's format is supported
         # by payment service
-        r = requests.get(
+        r = payment_api_session.get(
             "{base_url}payees?filter[payees]=account.id=={account_id};type=={payee_type};currency=={currency}".format(
                 base_url=BASE_URL,
                 payee_type=payee_type.value,
@@ -418,23 +502,7 @@ class Payee:
         res = r.json()
         logger.debug("res=%r" % res)
 
-        result = []
-        for payee_details in res["data"]:
-            wallet_id = payee_details['attributes']['data'].get('walletId')
-            result.append(
-                PayeeDetails(
-                    id=UUID(payee_details["id"]),
-                    title=payee_details["attributes"]["title"],
-                    type=PayeeType(payee_details["attributes"]["type"]),
-                    iban=payee_details['attributes']['data']['account']['iban'],
-                    recipient_name=payee_details['attributes']['data']['recipient']['fullName'],
-                    recipient_email=payee_details['attributes']['data']['recipient']['email'],
-                    payment_account_id=UUID(payee_details['relationships']['account']['data']['id']),
-                    wallet_id=UUID(wallet_id) if wallet_id else None
-                )
-            )
-
-        return result
+        return [parse_payee_details(payee_details) for payee_details in res["data"]]
 
     @staticmethod
     def deactivate(payee_id: UUID):
@@ -445,7 +513,7 @@ class Payee:
         :param payee_id:
         :return:
         """
-        r = requests.delete("{base_url}payees/{payee_id}".format(
+        r = payment_api_session.delete("{base_url}payees/{payee_id}".format(
             base_url=BASE_URL,
             payee_id=str(payee_id)
         ), headers={
@@ -457,6 +525,8 @@ class Payee:
         else:
             r.raise_for_status()
 
+        payment_api_cache.invalidate("payees", payee_id)
+
 
 class FundingSource:
     """
@@ -474,7 +544,7 @@ class FundingSource:
         :return:
         """
 
-        r = requests.get("{base_url}funding_sources/{fs_id}".format(
+        r = payment_api_session.get("{base_url}funding_sources/{fs_id}".format(
             base_url=BASE_URL,
             fs_id=str(fs_id)
         ), headers={
@@ -533,12 +603,16 @@ class FundingSource:
         # }
         res = r.json()
         logger.debug("res=%r" % res)
-        return FundingSourceDetails(
-            id=UUID(res["data"]["id"]),
-            type=FundingSourceType(res["data"]["attributes"]["type"]),
-            currency=Currency(res["data"]["attributes"]["currency"]),
-            payment_account_id=UUID(res['data']['relationships']['account']['data']['id'])
-        )
+        return parse_funding_source_details(res["data"])
+
+    @staticmethod
+    def get_cached(fs_id: UUID) -> FundingSourceDetails:
+        """
+        The same as get, but may return recently cached details (see payment_api_cache)
+        :param fs_id:
+        :return:
+        """
+        return payment_api_cache.get_or_load("funding_sources", fs_id, lambda: FundingSource.get(fs_id))
 
     @staticmethod
     def deactivate(fs_id: UUID):
@@ -549,7 +623,7 @@ class FundingSource:
         :param fs_id:
         :return:
         """
-        r = requests.delete("{base_url}funding_sources/{fs_id}".format(
+        r = payment_api_session.delete("{base_url}funding_sources/{fs_id}".format(
             base_url=BASE_URL,
             fs_id=str(fs_id)
         ), headers={
@@ -561,6 +635,8 @@ class FundingSource:
         else:
             r.raise_for_status()
 
+        payment_api_cache.invalidate("funding_sources", fs_id)
+
 
 class Wallet:
     """
@@ -575,7 +651,7 @@ class Wallet:
         :param wallet_id:
         :return:
         """
-        r = requests.get("{base_url}wallets/{wallet_id}".format(
+        r = payment_api_session.get("{base_url}wallets/{wallet_id}".format(
             base_url=BASE_URL,
             wallet_id=str(wallet_id)
         ), headers={
@@ -620,18 +696,17 @@ class Wallet:
         # }
         res = r.json()
         logger.debug("res=%r" % res)
-        return WalletDetails(
-            id=UUID(res["data"]["id"]),
-            currency=Currency(res["data"]["attributes"]["currency"]),
-            iban=res["data"]["attributes"]["iban"],
-            balance=int(res["data"]["attributes"]["balance"]),
-            is_virtual=bool(int(res["data"]["attributes"]["isVirtual"])),
-            payment_account_id=UUID(res['data']['relationships']['account']['data']['id']),
-            # Returning this fields during processing GET request requires additional changes in Payment API,
-            # which are not planned to be implemented
-            funding_source_id=None,
-            payee_id=None,
-        )
+        return parse_wallet_details(res["data"])
+
+    @staticmethod
+    def get_cached(wallet_id: UUID) -> WalletDetails:
+        """
+        The same as get, but may return recently cached details (see payment_api_cache).
+        Note that "balance" of cached wallet is not reliable, use "get" if you need it.
+        :param wallet_id:
+        :return:
+        """
+        return payment_api_cache.get_or_load("wallets", wallet_id, lambda: Wallet.get(wallet_id))
 
     @staticmethod
     def create(currency: Currency, payment_account_id: UUID) -> WalletDetails:
@@ -660,7 +735,7 @@ class Wallet:
                 }
             }
         }
-        r = requests.post("{base_url}wallets/".format(base_url=BASE_URL), json=payload)
+        r = payment_api_session.post("{base_url}wallets/".format(base_url=BASE_URL), json=payload)
         if r.status_code == requests.codes.bad_request:
             raise PaymentApiError(json_response=r.json())
         else:
@@ -726,7 +801,7 @@ class Wallet:
         :param wallet_id:
         :return:
         """
-        r = requests.delete("{base_url}wallets/{wallet_id}".format(
+        r = payment_api_session.delete("{base_url}wallets/{wallet_id}".format(
             base_url=BASE_URL,
             wallet_id=str(wallet_id)
         ), headers={
@@ -738,6 +813,8 @@ class Wallet:
         else:
             r.raise_for_status()
 
+        payment_api_cache.invalidate("wallets", wallet_id)
+
 
 class PaymentAccount:
     """
@@ -775,7 +852,7 @@ class PaymentAccount:
             }
         }
 
-        r = requests.post("{base_url}accounts/{s_type}".format(
+        r = payment_api_session.post("{base_url}accounts/{s_type}".format(
             base_url=BASE_URL,
             s_type="" if service_type is None else service_type.value
         ), json=payload)
@@ -895,7 +972,7 @@ class PaymentAccount:
             }
         }
 
-        r = requests.patch("{base_url}accounts/{id}".format(
+        r = payment_api_session.patch("{base_url}accounts/{id}".format(
             base_url=BASE_URL,
             id=str(user_account_id)
         ), json=payload)
@@ -914,7 +991,7 @@ class PaymentAccount:
         :param payment_account_id:
         :return:
         """
-        r = requests.delete("{base_url}accounts/{payment_account_id}".format(
+        r = payment_api_session.delete("{base_url}accounts/{payment_account_id}".format(
             base_url=BASE_URL,
             payment_account_id=str(payment_account_id)
         ), headers={
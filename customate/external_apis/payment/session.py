@@ -0,0 +1,128 @@
+import logging
+import threading
+from collections import defaultdict
+
+import requests
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+from core.logger import Timer
+from customate.settings import EXTERNAL_SERVICES_TIMEOUT
+from external_apis.circuit_breaker import get_breaker
+from external_apis.pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+# Number of kept-alive connections to PaymentAPI, should be not less than number of concurrent threads/greenlets
+# within one process
+PAYMENT_API_POOL_SIZE = getattr(settings, "PAYMENT_API_POOL_SIZE", 10)
+PAYMENT_API_MAX_RETRIES = getattr(settings, "PAYMENT_API_MAX_RETRIES", 3)
+PAYMENT_API_RETRY_BACKOFF_FACTOR = getattr(settings, "PAYMENT_API_RETRY_BACKOFF_FACTOR", 0.3)
+
+# Only these requests are retried upon read errors or 502/503/504 responses (for POST/PATCH we cannot tell whether
+# request was processed by PaymentAPI or not). Connection errors are retried for all methods, since request
+# was not sent at all.
+IDEMPOTENT_METHODS = frozenset(["HEAD", "GET", "PUT", "DELETE", "OPTIONS"])
+RETRY_STATUSES = frozenset([502, 503, 504])
+# Circuit breaker shared with payment_api proxy client
+BREAKER = "payment_api"
+
+_metrics_lock = threading.Lock()
+_metrics = defaultdict(lambda: {"count": 0, "errors": 0, "duration": 0, "max_duration": 0})
+
+# one session per process, shared by all threads/greenlets (see SessionPool)
+_session_pool = SessionPool(
+    size=PAYMENT_API_POOL_SIZE,
+    max_retries=Retry(
+        total=PAYMENT_API_MAX_RETRIES,
+        connect=PAYMENT_API_MAX_RETRIES,
+        read=PAYMENT_API_MAX_RETRIES,
+        status=PAYMENT_API_MAX_RETRIES,
+        method_whitelist=IDEMPOTENT_METHODS,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=PAYMENT_API_RETRY_BACKOFF_FACTOR,
+        # let service code handle error responses by itself (see PaymentApiError)
+        raise_on_status=False,
+    ),
+    name="PaymentAPI"
+)
+
+
+def get_session() -> requests.Session:
+    """
+    Get process-wide PaymentAPI session. Session (and its connection pool) is re-created in forked processes
+    (e.g. celery workers), since sockets cannot be shared with parent process.
+    """
+    return _session_pool.get_http_session()
+
+
+def request(method: str, url: str, endpoint: str = None, **kwargs) -> requests.Response:
+    """
+    Send request to PaymentAPI using pooled session, with default timeout and latency/error accounting.
+    Raises UpstreamUnavailable without sending request if PaymentAPI circuit breaker is open.
+
+    :param method: HTTP method
+    :param url: full url
+    :param endpoint: name of endpoint for metrics, e.g. "GET payees"
+    :param kwargs: the same as for requests.request
+    :return:
+    """
+    kwargs.setdefault("timeout", EXTERNAL_SERVICES_TIMEOUT)
+    endpoint = endpoint or "%s %s" % (method.upper(), get_resource_name(url))
+    with get_breaker(BREAKER).call() as call:
+        timer = Timer()
+        failed = True
+        try:
+            response = get_session().request(method, url, **kwargs)
+            failed = call.failed = response.status_code >= 500
+            return response
+        finally:
+            duration = timer.duration()
+            record(endpoint, duration, failed)
+            logger.debug("PaymentAPI request %s took %s (failed=%s)" % (endpoint, duration, failed))
+
+
+def get(url, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def patch(url, **kwargs) -> requests.Response:
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
+
+
+def get_metrics() -> dict:
+    """
+    Snapshot of per-endpoint counters (within current process)
+    :return: {endpoint: {"count", "errors", "duration", "max_duration"}}
+    """
+    with _metrics_lock:
+        return {endpoint: dict(values) for endpoint, values in _metrics.items()}
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def record(endpoint: str, duration, failed: bool):
+    with _metrics_lock:
+        m = _metrics[endpoint]
+        m["count"] += 1
+        m["errors"] += int(failed)
+        m["duration"] += duration
+        m["max_duration"] = max(m["max_duration"], duration)
+
+
+def get_resource_name(url: str) -> str:
+    # "http://host/payees/<uuid>" -> "payees"
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    parts = [p for p in path.split("/")[1:] if p]
+    return parts[0] if parts else "/"
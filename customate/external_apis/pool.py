@@ -0,0 +1,52 @@
+import logging
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPool:
+    """
+    Process-wide pool of kept-alive HTTP connections to external service. It is shared by all threads/greenlets
+    of a worker (urllib3 connection pool is thread-safe and greenlet-safe), whereas per-request state stays with
+    callers. Pool is re-created in forked processes, since sockets cannot be shared with parent process.
+    Used by payment_api proxy (see payment_api.core.pool) and PaymentAPI service session
+    (see external_apis.payment.session).
+    """
+
+    def __init__(self, size: int, max_retries=0, name="external service"):
+        """
+        :param size: max number of kept-alive connections
+        :param max_retries: the same as for HTTPAdapter, e.g. urllib3 Retry
+        :param name: name of pool for logs
+        """
+        self.size = size
+        self.max_retries = max_retries
+        self.name = name
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    def get_http_session(self) -> requests.Session:
+        session, pid = self._session, self._pid
+        if session is None or pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._create_http_session()
+                    self._pid = os.getpid()
+                session = self._session
+        return session
+
+    def _create_http_session(self) -> requests.Session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.size, max_retries=self.max_retries)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # session is shared by requests of different users, so nothing must be remembered between them
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        logger.info("Created %s session pool (pid=%s, pool_size=%s)" % (self.name, os.getpid(), self.size))
+        return session
@@ -0,0 +1 @@
+default_app_config = 'frontend_api.apps.FrontendApiConfig'
@@ -1,4 +1,24 @@
+from datetime import timedelta
+
 from django.apps import AppConfig
+from django.conf import settings
+
+# Periodic tasks of frontend_api, which are added to Celery beat unless CELERY_BEAT_SCHEDULE setting already
+# has entries with the same names (e.g. to use another schedule)
+PERIODIC_TASKS = {
+    "check_daily_payments_shards": {
+        "task": "frontend_api.tasks.payments.check_daily_payments_shards",
+        "schedule": timedelta(minutes=5),
+    },
+    "reclaim_stale_pending_schedule_payments": {
+        "task": "frontend_api.tasks.payments.reclaim_stale_pending_schedule_payments",
+        "schedule": timedelta(minutes=15),
+    },
+    "purge_processed_payment_api_events": {
+        "task": "frontend_api.tasks.payments.purge_processed_payment_api_events",
+        "schedule": timedelta(days=1),
+    },
+}
 
 
 class FrontendApiConfig(AppConfig):
@@ -8,7 +28,7 @@ class FrontendApiConfig(AppConfig):
     def ready(self):
         import frontend_api.models
 
-
-
-
-
+        beat_schedule = getattr(settings, "CELERY_BEAT_SCHEDULE", None)
+        if beat_schedule is not None:
+            for name, entry in PERIODIC_TASKS.items():
+                beat_schedule.setdefault(name, entry)
@@ -11,6 +11,15 @@ class ServiceUnavailable(APIException):
 	default_code = 'service_unavailable'
 
 
+class UpstreamUnavailable(APIException):
+	"""
+	Upstream service call was rejected by its circuit breaker or bulkhead
+	"""
+	status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+	default_detail = 'Upstream service is temporarily unavailable, please try again later'
+	default_code = 'upstream_unavailable'
+
+
 class GBGVerificationError(APIException):
 	status_code = status.HTTP_400_BAD_REQUEST
 	default_detail = 'KYC request is unsuccessful. Please, contact the support team.'
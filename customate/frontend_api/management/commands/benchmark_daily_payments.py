@@ -0,0 +1,130 @@
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+import arrow
+from celery import current_app
+from celery.signals import task_prerun, task_postrun
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+import external_apis.payment.service as payment_service
+from core.fields import FundingSourceType, Currency, PayeeType
+from core.models import User
+from external_apis.payment.fake_server import FakePaymentApi
+from frontend_api.fields import SchedulePeriod, ScheduleStatus, SchedulePurpose, AccountType
+from frontend_api.models import Schedule, UserAccount
+from frontend_api.tasks.payments import initiate_daily_payments
+from frontend_api.tasks.resolvers import event_entities_resolver
+
+
+class Command(BaseCommand):
+    """
+    Usage: ./manage.py benchmark_daily_payments --schedules=1000 --latency=20 --error-rate=0.01 --failure-rate=0.05
+           ./manage.py benchmark_daily_payments --schedules=1000 --events-batch-size=100
+
+    Full daily run (initiate_daily_payments -> make_payment -> on_payment_change/on_transaction_change) is executed
+    within current process (celery tasks are applied eagerly) against fake PaymentAPI.
+    All database changes (including seeded schedules) are rolled back afterwards.
+    """
+    help = 'Measure throughput of daily payments processing against local fake PaymentAPI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedules', type=int, default=1000, help='Number of seeded schedules')
+        parser.add_argument('--latency', type=int, default=20, help='Fake PaymentAPI response delay (ms)')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of HTTP 503 responses')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Share of FAILED payments')
+        parser.add_argument('--seed', type=int, default=None, help='Seed of fake PaymentAPI random generator')
+        parser.add_argument('--events-batch-size', type=int, default=None,
+                            help='Deliver events by batches of given size (on_*_changes_batch tasks)')
+
+    def handle(self, *args, **options):
+        fake_api = FakePaymentApi(
+            latency=options['latency'] / 1000,
+            error_rate=options['error_rate'],
+            failure_rate=options['failure_rate'],
+            hide_transactions=True,
+            seed=options['seed']
+        )
+        durations = defaultdict(list)
+        started = {}
+
+        def on_task_prerun(task_id=None, **kwargs):
+            started[task_id] = time.monotonic()
+
+        def on_task_postrun(task_id=None, task=None, **kwargs):
+            if task_id in started:
+                durations[task.name.rsplit(".", 1)[-1]].append(time.monotonic() - started.pop(task_id))
+
+        base_url = payment_service.BASE_URL
+        always_eager = current_app.conf.task_always_eager
+        payment_service.BASE_URL = fake_api.start()
+        current_app.conf.task_always_eager = True
+        task_prerun.connect(on_task_prerun, weak=False)
+        task_postrun.connect(on_task_postrun, weak=False)
+        try:
+            with transaction.atomic():
+                self.seed_schedules(options['schedules'])
+
+                with CaptureQueriesContext(connection) as run_queries:
+                    run_started = time.monotonic()
+                    initiate_daily_payments.apply()
+                    run_duration = time.monotonic() - run_started
+
+                event_entities_resolver.reset_metrics()
+                with CaptureQueriesContext(connection) as events_queries:
+                    events_started = time.monotonic()
+                    events_count = fake_api.deliver_events(batch_size=options['events_batch_size'])
+                    events_duration = time.monotonic() - events_started
+
+                transaction.set_rollback(True)
+        finally:
+            task_prerun.disconnect(on_task_prerun)
+            task_postrun.disconnect(on_task_postrun)
+            current_app.conf.task_always_eager = always_eager
+            payment_service.BASE_URL = base_url
+            fake_api.stop()
+
+        payments_count = len(fake_api.get_resources("payments"))
+        self.stdout.write("Schedules: %s, fake PaymentAPI: latency=%sms, error_rate=%s, failure_rate=%s" % (
+            options['schedules'], options['latency'], options['error_rate'], options['failure_rate']
+        ))
+        self.stdout.write("Daily run: %s payment(s) in %.3fs (%.1f payments/s), %s DB queries" % (
+            payments_count, run_duration, payments_count / run_duration if run_duration else 0, len(run_queries)
+        ))
+        self.stdout.write("Events: %s event(s) in %.3fs (%.1f events/s), %s DB queries" % (
+            events_count, events_duration, events_count / events_duration if events_duration else 0,
+            len(events_queries)
+        ))
+        resolver_metrics = event_entities_resolver.get_metrics()
+        self.stdout.write("Events classification: %s lookup(s) in %s quer(ies), %.2f queries saved per event, "
+                          "wallet cache hits=%s, misses=%s" % (
+                              resolver_metrics["lookups"], resolver_metrics["queries"],
+                              resolver_metrics["queries_saved_per_event"], resolver_metrics["wallet_cache_hits"],
+                              resolver_metrics["wallet_cache_misses"]
+                          ))
+        self.stdout.write("Fake PaymentAPI: %s request(s), %s error(s)" % (
+            fake_api.requests_count, fake_api.errors_count
+        ))
+        for name, values in sorted(durations.items()):
+            self.stdout.write("%s: count=%s, p50=%.1fms, p99=%.1fms" % (
+                name, len(values), self.percentile(values, 0.5) * 1000, self.percentile(values, 0.99) * 1000
+            ))
+
+    @staticmethod
+    def seed_schedules(count: int):
+        user = User.objects.create_user('benchmark_%s' % uuid4().hex)
+        UserAccount(account_type=AccountType.personal, user=user, payment_account_id=uuid4()).save()
+        today = arrow.utcnow().datetime.date()
+        for i in range(count):
+            Schedule(name="Benchmark %s" % i, start_date=today, payment_amount=100, purpose=SchedulePurpose.pay,
+                     status=ScheduleStatus.open, currency=Currency.GBP, period=SchedulePeriod.weekly,
+                     payee_id=uuid4(), payee_type=PayeeType.WALLET, number_of_payments=10,
+                     funding_source_id=uuid4(), funding_source_type=FundingSourceType.WALLET,
+                     origin_user_id=user.id).save()
+
+    @staticmethod
+    def percentile(values: list, p: float) -> float:
+        values = sorted(values)
+        return values[int(round(p * (len(values) - 1)))]
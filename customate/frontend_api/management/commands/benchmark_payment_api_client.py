@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+
+import external_apis.payment.service as payment_service
+import external_apis.payment.async_service as async_payment_service
+from external_apis.payment.async_service import gather_bounded, run_sync
+
+
+class StubPayeeHandler(BaseHTTPRequestHandler):
+    """
+    Answers any GET request with the same payee after fixed delay (emulating PaymentAPI latency)
+    """
+    protocol_version = "HTTP/1.1"
+    delay = 0
+    body = json.dumps({
+        "data": {
+            "id": str(uuid4()),
+            "type": "payees",
+            "attributes": {
+                "title": "Stub Payee",
+                "type": "BANK_ACCOUNT",
+                "active": 1,
+                "currency": "GBP",
+                "data": {
+                    "recipient": {"fullName": "Stub Recipient", "email": "stub@example.com"},
+                    "account": {"iban": "GB29NWBK60161331926819"}
+                }
+            },
+            "relationships": {"account": {"data": {"type": "accounts", "id": str(uuid4())}}}
+        }
+    }).encode()
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """
+    Usage: ./manage.py benchmark_payment_api_client --requests=200 --latency=50 --concurrency=20
+    """
+    help = 'Compare sync and async PaymentAPI clients fetching payees from local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Number of payees to fetch')
+        parser.add_argument('--latency', type=int, default=50, help='Stub server response delay (ms)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Max concurrent requests of async client')
+
+    def handle(self, *args, **options):
+        count, concurrency = options['requests'], options['concurrency']
+        StubPayeeHandler.delay = options['latency'] / 1000
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubPayeeHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # both clients build urls from module-level BASE_URL, point them to stub server for the time of benchmark
+        base_url = payment_service.BASE_URL
+        payment_service.BASE_URL = async_payment_service.BASE_URL = "http://127.0.0.1:%s/" % server.server_port
+        payee_ids = [uuid4() for _ in range(count)]
+        try:
+            started = time.monotonic()
+            sync_results = [payment_service.Payee.get(payee_id) for payee_id in payee_ids]
+            sync_duration = time.monotonic() - started
+
+            started = time.monotonic()
+            async_results = run_sync(gather_bounded(
+                [async_payment_service.Payee.get(payee_id) for payee_id in payee_ids], limit=concurrency
+            ))
+            async_duration = time.monotonic() - started
+        finally:
+            payment_service.BASE_URL = async_payment_service.BASE_URL = base_url
+            server.shutdown()
+            server.server_close()
+
+        assert sync_results == async_results, "Sync and async clients returned different results"
+        self.stdout.write("Fetched %s payee(s), stub latency=%sms" % (count, options['latency']))
+        self.stdout.write("sync client:  %.3fs (%.1f req/s)" % (sync_duration, count / sync_duration))
+        self.stdout.write("async client: %.3fs (%.1f req/s, concurrency=%s)" % (
+            async_duration, count / async_duration, concurrency
+        ))
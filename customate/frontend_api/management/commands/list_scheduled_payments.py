@@ -0,0 +1,38 @@
+import arrow
+from django.core.management.base import BaseCommand, CommandError
+
+from frontend_api.models.schedule import Schedule
+from frontend_api.tasks.payments import get_daily_payments_dates
+
+
+class Command(BaseCommand):
+    """
+    Usage: ./manage.py list_scheduled_payments --date="2019-12-24"
+    """
+    help = 'List payments which daily scheduler would initiate on specified date (today by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Date of scheduler run (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            now = arrow.get(options.get('date')) if options.get('date') else arrow.utcnow()
+        except arrow.parser.ParserError:
+            raise CommandError("Invalid date string(%s)" % options.get('date'))
+
+        dates = get_daily_payments_dates(now)
+        self.stdout.write("Dates (scheduled_date, is_execution_date_limited): %s" % ", ".join(
+            "(%s, %s)" % (d.date(), is_limited) for d, is_limited in dates
+        ))
+
+        count = 0
+        occurrences = Schedule.get_processable_occurrences([(d.date(), is_limited) for d, is_limited in dates])
+        for o in occurrences.iterator():
+            s = o.schedule
+            self.stdout.write("%s: schedule_id=%s, period=%s, is_deposit=%s, amount=%s, original_scheduled_date=%s" % (
+                o.scheduled_date, s.id, s.period.value, o.is_deposit,
+                s.deposit_amount if o.is_deposit else s.payment_amount, o.original_scheduled_date
+            ))
+            count += 1
+
+        self.stdout.write("Total: %s payment(s)" % count)
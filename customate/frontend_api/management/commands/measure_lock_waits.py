@@ -0,0 +1,59 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    """
+    Usage: ./manage.py measure_lock_waits --duration=600 --interval=0.1
+
+    Samples pg_stat_activity of current database and reports how long backends were waiting for row/table locks.
+    Run it during daily payments processing (settlement window) before and after enabling events routing
+    (PAYMENT_EVENTS_QUEUES_COUNT) to compare lock contention.
+    """
+    help = 'Measure time spent by database backends waiting for locks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=60, help='Sampling duration (seconds)')
+        parser.add_argument('--interval', type=float, default=0.1, help='Interval between samples (seconds)')
+        parser.add_argument('--top', type=int, default=5, help='Number of most frequently blocked queries to show')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        samples_count = 0
+        waiting_samples = 0
+        max_waiting = 0
+        waits = Counter()
+        queries = Counter()
+
+        started = time.monotonic()
+        with connection.cursor() as cursor:
+            while time.monotonic() - started < options['duration']:
+                cursor.execute(
+                    "SELECT wait_event, left(query, 200) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND wait_event_type = 'Lock' AND pid <> pg_backend_pid()"
+                )
+                rows = cursor.fetchall()
+                samples_count += 1
+                if rows:
+                    waiting_samples += 1
+                    max_waiting = max(max_waiting, len(rows))
+                waits.update(wait_event for wait_event, _ in rows)
+                queries.update(query for _, query in rows)
+                time.sleep(interval)
+        duration = time.monotonic() - started
+        # every sampled waiting backend accounts for approximately one sampling period of waiting
+        period = duration / samples_count if samples_count else 0
+
+        self.stdout.write("Samples: %s in %.1fs, samples with lock waits: %s (%.1f%%), max waiting backends: %s" % (
+            samples_count, duration, waiting_samples, 100.0 * waiting_samples / samples_count if samples_count else 0,
+            max_waiting
+        ))
+        self.stdout.write("Estimated lock wait time: %.2fs (%s)" % (
+            sum(waits.values()) * period,
+            ", ".join("%s=%.2fs" % (wait_event, count * period) for wait_event, count in waits.most_common())
+        ))
+        for query, count in queries.most_common(options['top']):
+            self.stdout.write("%.2fs: %s" % (count * period, query))
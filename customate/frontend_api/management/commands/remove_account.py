@@ -95,6 +95,9 @@ class Command(BaseCommand):
                 cursor.execute("DELETE FROM frontend_api_schedulepayments WHERE schedule_id "
                                "IN (SELECT id FROM frontend_api_schedule WHERE recipient_user_id = ANY(%s) OR origin_user_id = ANY(%s))",
                                params=[related_user_ids, related_user_ids])
+                cursor.execute("DELETE FROM frontend_api_scheduleoccurrence WHERE schedule_id "
+                               "IN (SELECT id FROM frontend_api_schedule WHERE recipient_user_id = ANY(%s) OR origin_user_id = ANY(%s))",
+                               params=[related_user_ids, related_user_ids])
                 cursor.execute(
                     "DELETE FROM frontend_api_schedule WHERE recipient_user_id = ANY(%s) OR origin_user_id = ANY(%s)",
                     params=[related_user_ids, related_user_ids])
@@ -45,6 +45,8 @@ class Command(BaseCommand):
                                params=[schedule_ids])
                 cursor.execute("delete from frontend_api_document where schedule_id = ANY(%s);",
                                params=[schedule_ids])
+                cursor.execute("delete from frontend_api_scheduleoccurrence where schedule_id = ANY(%s);",
+                               params=[schedule_ids])
                 cursor.execute("delete from frontend_api_schedule where id = ANY(%s);",
                                params=[schedule_ids])
 
@@ -0,0 +1,227 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend_api', '0070_update_gender_value'),
+    ]
+
+    # (re)generate all occurrences of one particular schedule, using the same date arithmetic as previous
+    # generate_series based views did (see 0049_schedule_payments_idempotence)
+    sql_refresh_function = """
+        CREATE OR REPLACE FUNCTION refresh_schedule_occurrences(target_schedule_id uuid) RETURNS void AS $$
+        DECLARE
+            s RECORD;
+            step interval;
+            horizon interval;
+        BEGIN
+            DELETE FROM frontend_api_scheduleoccurrence WHERE schedule_id = target_schedule_id;
+
+            SELECT * FROM frontend_api_schedule WHERE id = target_schedule_id INTO s;
+            IF NOT FOUND THEN
+                RETURN;
+            END IF;
+
+            IF s.period = 'one_time' THEN
+                INSERT INTO frontend_api_scheduleoccurrence (schedule_id, scheduled_date, original_scheduled_date, is_deposit)
+                VALUES (s.id, date(adjust_execution_date(s.start_date, s.funding_source_type)), s.start_date, false);
+            ELSE
+                step := CASE s.period
+                    WHEN 'weekly' THEN '1 week'::interval
+                    WHEN 'monthly' THEN '1 month'::interval
+                    WHEN 'quarterly' THEN '4 months'::interval
+                    WHEN 'yearly' THEN '1 year'::interval
+                END;
+                horizon := CASE s.period WHEN 'yearly' THEN '10 years'::interval ELSE '5 years'::interval END;
+
+                INSERT INTO frontend_api_scheduleoccurrence (schedule_id, scheduled_date, original_scheduled_date, is_deposit)
+                SELECT s.id, date(adjust_execution_date(date(t2), s.funding_source_type)), date(t2), false
+                FROM generate_series(s.start_date, s.start_date + horizon, step) AS t2
+                WHERE t2 <= s.start_date + (s.number_of_payments + s.number_of_payments_made) * step;
+            END IF;
+
+            IF s.deposit_payment_date IS NOT NULL THEN
+                INSERT INTO frontend_api_scheduleoccurrence (schedule_id, scheduled_date, original_scheduled_date, is_deposit)
+                VALUES (s.id, date(adjust_execution_date(s.deposit_payment_date, s.funding_source_type)),
+                        s.deposit_payment_date, true);
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+
+    sql_trg_function = """
+        CREATE OR REPLACE FUNCTION handle_schedule_occurrences_change() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.status = 'stopped' THEN
+                /* stopped schedule will never be processed again, keep already passed dates only */
+                DELETE FROM frontend_api_scheduleoccurrence
+                WHERE schedule_id = NEW.id AND scheduled_date >= current_date;
+            ELSE
+                PERFORM refresh_schedule_occurrences(NEW.id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+
+    sql_trg_create = """
+        CREATE TRIGGER schedule_occurrences_insert_tgr
+            AFTER INSERT ON frontend_api_schedule
+            FOR EACH ROW EXECUTE PROCEDURE handle_schedule_occurrences_change();
+
+        CREATE TRIGGER schedule_occurrences_update_tgr
+            AFTER UPDATE ON frontend_api_schedule
+            FOR EACH ROW
+            WHEN (
+                OLD.start_date IS DISTINCT FROM NEW.start_date
+                OR OLD.deposit_payment_date IS DISTINCT FROM NEW.deposit_payment_date
+                OR OLD.period IS DISTINCT FROM NEW.period
+                OR OLD.funding_source_type IS DISTINCT FROM NEW.funding_source_type
+                OR OLD.number_of_payments IS DISTINCT FROM NEW.number_of_payments
+                OR OLD.number_of_payments_made IS DISTINCT FROM NEW.number_of_payments_made
+                OR OLD.status IS DISTINCT FROM NEW.status
+            )
+            EXECUTE PROCEDURE handle_schedule_occurrences_change();
+    """
+
+    sql_fill_existing = """
+        SELECT refresh_schedule_occurrences(id) FROM frontend_api_schedule
+    """
+
+    # repeated joins
+    joins = """
+          inner join "frontend_api_schedule" as "t1"
+            on ("t1"."id" = "o"."schedule_id")
+          inner join "core_user" as "t3"
+            on ("t3"."id" = "t1"."origin_user_id")
+          inner join "frontend_api_account" as "t4"
+            on ("t4"."user_id" = "t1"."origin_user_id")
+          left join "frontend_api_subuseraccount" as "t5"
+            on ("t5".account_ptr_id = "t4".id)
+          inner join "frontend_api_useraccount" as "t6"
+            on ("t6"."account_ptr_id" = "t4"."id" OR "t6"."account_ptr_id" = "t5"."owner_account_id")
+      """
+
+    sql_periodic_view = """
+        create view frontend_api_{name}_schedule as
+             select "o"."scheduled_date", "o"."original_scheduled_date", "t1".*, "t6"."payment_account_id"
+             from frontend_api_scheduleoccurrence as "o"
+               {joins}
+             where "o"."is_deposit" = false and "t1"."period" = '{period}'
+    """
+
+    sql_deposits_view = """
+        create view frontend_api_deposits_schedule as
+             select "o"."scheduled_date", "t1".*, "t6"."payment_account_id"
+             from frontend_api_scheduleoccurrence as "o"
+               {joins}
+             where "o"."is_deposit" = true
+    """.format(joins=joins)
+
+    sql_one_time = sql_periodic_view.format(name='one_time', period='one_time', joins=joins)
+    sql_weekly = sql_periodic_view.format(name='weekly', period='weekly', joins=joins)
+    sql_monthly = sql_periodic_view.format(name='monthly', period='monthly', joins=joins)
+    sql_quarterly = sql_periodic_view.format(name='quarterly', period='quarterly', joins=joins)
+    sql_yearly = sql_periodic_view.format(name='yearly', period='yearly', joins=joins)
+
+    # views still rely on "t1".*, so we have to recreate them each time frontend_api_schedule is altered
+    sql_trg_create_event_function = """
+         CREATE FUNCTION handle_alter_schedule_event() RETURNS event_trigger AS $$
+         DECLARE
+             r RECORD;
+             joins text := 'INNER JOIN "frontend_api_schedule" AS "t1" '
+                     'ON ("t1"."id" = "o"."schedule_id") '
+                 'INNER JOIN "core_user" AS "t3" '
+                     'ON ("t3"."id" = "t1"."origin_user_id") '
+                 'INNER JOIN "frontend_api_account" AS "t4" '
+                     'ON ("t4"."user_id" = "t1"."origin_user_id") '
+                 'LEFT JOIN "frontend_api_subuseraccount" AS "t5" '
+                     'ON ("t5".account_ptr_id = "t4".id) '
+                 'INNER JOIN "frontend_api_useraccount" AS "t6" '
+                     'ON ("t6"."account_ptr_id" = "t4"."id" OR "t6"."account_ptr_id" = "t5"."owner_account_id") ';
+             periods text[] := ARRAY['one_time', 'weekly', 'monthly', 'quarterly', 'yearly'];
+             period text;
+         BEGIN
+             FOR r IN SELECT * FROM pg_event_trigger_ddl_commands() LOOP
+                 IF r.object_identity = 'public.frontend_api_schedule' THEN
+
+                     /* update views related to frontend_api_schedule */
+                     FOREACH period IN ARRAY periods LOOP
+                         RAISE NOTICE 'recreate frontend_api_%_schedule', period;
+                         EXECUTE 'DROP VIEW IF EXISTS frontend_api_' || period || '_schedule';
+                         EXECUTE 'CREATE VIEW frontend_api_' || period || '_schedule AS '
+                             'SELECT "o"."scheduled_date", "o"."original_scheduled_date", "t1".*, "t6"."payment_account_id" '
+                             'FROM frontend_api_scheduleoccurrence AS "o" '
+                             || joins ||
+                             'WHERE "o"."is_deposit" = false AND "t1"."period" = ''' || period || '''';
+                     END LOOP;
+
+                     RAISE NOTICE 'recreate frontend_api_deposits_schedule';
+                     DROP VIEW IF EXISTS frontend_api_deposits_schedule;
+                     EXECUTE 'CREATE VIEW frontend_api_deposits_schedule AS '
+                         'SELECT "o"."scheduled_date", "t1".*, "t6"."payment_account_id" '
+                         'FROM frontend_api_scheduleoccurrence AS "o" '
+                         || joins ||
+                         'WHERE "o"."is_deposit" = true';
+
+                 END IF;
+             END LOOP;
+         END;
+         $$
+         LANGUAGE plpgsql;
+      """
+
+    sql_trg_create_event = """
+         CREATE EVENT TRIGGER alter_schedule_event
+           ON ddl_command_end WHEN TAG IN ('ALTER TABLE')
+           EXECUTE PROCEDURE handle_alter_schedule_event();
+     """
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleOccurrence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheduled_date', models.DateField(
+                    db_index=True, help_text='Specific date on which the payment should be initiated')),
+                ('original_scheduled_date', models.DateField(
+                    help_text='Specific date w/o any weekends and blacklisted days')),
+                ('is_deposit', models.BooleanField(
+                    default=False, help_text='Indicates whether this occurrence is deposit payment')),
+                ('schedule', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='occurrences',
+                    to='frontend_api.Schedule'
+                )),
+            ],
+            options={
+                'unique_together': {('schedule', 'scheduled_date', 'original_scheduled_date', 'is_deposit')},
+            },
+        ),
+
+        migrations.RunSQL(sql_refresh_function),
+        migrations.RunSQL(sql_trg_function),
+        migrations.RunSQL(sql_trg_create),
+        migrations.RunSQL(sql_fill_existing),
+
+        migrations.RunSQL("DROP EVENT TRIGGER IF EXISTS alter_schedule_event"),
+        migrations.RunSQL("DROP FUNCTION IF EXISTS handle_alter_schedule_event CASCADE"),
+
+        migrations.RunSQL("DROP VIEW IF EXISTS public.frontend_api_one_time_schedule"),
+        migrations.RunSQL(sql_one_time),
+        migrations.RunSQL("DROP VIEW IF EXISTS public.frontend_api_weekly_schedule"),
+        migrations.RunSQL(sql_weekly),
+        migrations.RunSQL("DROP VIEW IF EXISTS public.frontend_api_monthly_schedule"),
+        migrations.RunSQL(sql_monthly),
+        migrations.RunSQL("DROP VIEW IF EXISTS public.frontend_api_quarterly_schedule"),
+        migrations.RunSQL(sql_quarterly),
+        migrations.RunSQL("DROP VIEW IF EXISTS public.frontend_api_yearly_schedule"),
+        migrations.RunSQL(sql_yearly),
+        migrations.RunSQL("DROP VIEW IF EXISTS public.frontend_api_deposits_schedule"),
+        migrations.RunSQL(sql_deposits_view),
+
+        migrations.RunSQL(sql_trg_create_event_function),
+        migrations.RunSQL(sql_trg_create_event),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend_api', '0071_schedule_occurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPaymentsShard',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('run_id', models.CharField(db_index=True, max_length=64)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('shards_count', models.PositiveSmallIntegerField()),
+                ('started_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('is_failed', models.BooleanField(
+                    default=False,
+                    help_text='Indicates whether shard processing was interrupted by unexpected error'
+                )),
+                ('messages_count', models.PositiveIntegerField(default=0)),
+                ('payments_count', models.PositiveIntegerField(default=0)),
+                ('skipped_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('run_id', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend_api', '0072_daily_payments_shard'),
+    ]
+
+    # raw bulk inserts (see SchedulePayments.bulk_create_pending) rely on DB-level default
+    sql_column_default = """
+        ALTER TABLE frontend_api_schedulepayments ALTER COLUMN is_last_in_chain SET DEFAULT true
+    """
+
+    sql_indexes = """
+        CREATE INDEX IF NOT EXISTS schedulepayments_payment_id_btree_idx
+            ON frontend_api_schedulepayments (payment_id);
+        CREATE INDEX IF NOT EXISTS schedulepayments_parent_payment_id_idx
+            ON frontend_api_schedulepayments (parent_payment_id);
+        CREATE INDEX IF NOT EXISTS schedulepayments_last_in_chain_idx
+            ON frontend_api_schedulepayments (schedule_id, payment_status) WHERE is_last_in_chain;
+    """
+
+    # payment is last in chain if there are no follow-up payments pointing to it
+    sql_trg_function = """
+        CREATE OR REPLACE FUNCTION update_last_in_chain() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.parent_payment_id IS NOT NULL THEN
+                UPDATE frontend_api_schedulepayments AS p
+                SET is_last_in_chain = NOT EXISTS (
+                    SELECT 1 FROM frontend_api_schedulepayments AS c WHERE c.parent_payment_id = p.payment_id
+                )
+                WHERE p.payment_id = OLD.parent_payment_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.parent_payment_id IS NOT NULL THEN
+                UPDATE frontend_api_schedulepayments
+                SET is_last_in_chain = false
+                WHERE payment_id = NEW.parent_payment_id AND is_last_in_chain;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+
+    sql_trg_create = """
+        CREATE TRIGGER last_in_chain_tgr
+            AFTER INSERT OR DELETE OR UPDATE OF parent_payment_id ON frontend_api_schedulepayments
+            FOR EACH ROW EXECUTE PROCEDURE update_last_in_chain();
+    """
+
+    sql_fill_existing = """
+        UPDATE frontend_api_schedulepayments AS p
+        SET is_last_in_chain = NOT EXISTS (
+            SELECT 1 FROM frontend_api_schedulepayments AS c WHERE c.parent_payment_id = p.payment_id
+        )
+    """
+
+    sql_last_schedulepayments = """
+        CREATE OR REPLACE VIEW frontend_api_last_schedulepayments AS
+        SELECT id, created_at, updated_at, payment_id, parent_payment_id,funding_source_id, payment_status, schedule_id,
+            original_amount, is_deposit, idempotence_key
+        FROM frontend_api_schedulepayments
+        WHERE is_last_in_chain
+    """
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulepayments',
+            name='is_last_in_chain',
+            field=models.BooleanField(
+                default=True,
+                help_text='Indicates whether there are no follow-up payments for this payment'
+            ),
+        ),
+        migrations.RunSQL(sql_column_default),
+        migrations.RunSQL(sql_indexes),
+        migrations.RunSQL(sql_trg_function),
+        migrations.RunSQL(sql_trg_create),
+        migrations.RunSQL(sql_fill_existing),
+        migrations.RunSQL(sql_last_schedulepayments),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+from core.fields import PaymentStatusType
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend_api', '0073_schedulepayments_is_last_in_chain'),
+    ]
+
+    sql_fill_existing = """
+        UPDATE frontend_api_schedule AS s
+        SET number_of_payments_made = c.number_of_payments_made,
+            total_paid_sum = c.total_paid_sum,
+            number_of_overdue_payments = c.number_of_overdue_payments
+        FROM (
+            SELECT schedule_id,
+                count(*) FILTER (WHERE payment_status = %s AND NOT is_deposit) AS number_of_payments_made,
+                coalesce(sum(original_amount) FILTER (WHERE payment_status = %s), 0) AS total_paid_sum,
+                count(*) FILTER (WHERE payment_status IN (%s, %s, %s)) AS number_of_overdue_payments
+            FROM frontend_api_last_schedulepayments
+            GROUP BY schedule_id
+        ) AS c
+        WHERE c.schedule_id = s.id
+    """
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='total_paid_sum',
+            field=models.PositiveIntegerField(default=0, help_text="Total sum of all Schedule's paid payments"),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='number_of_overdue_payments',
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text='Number of last payments in chains which were not paid (failed, refunded, canceled)'
+            ),
+        ),
+        migrations.RunSQL([(sql_fill_existing, [
+            PaymentStatusType.SUCCESS.value, PaymentStatusType.SUCCESS.value,
+            PaymentStatusType.FAILED.value, PaymentStatusType.REFUND.value, PaymentStatusType.CANCELED.value
+        ])]),
+    ]
@@ -0,0 +1,33 @@
+import django.contrib.postgres.fields.jsonb
+import django.core.serializers.json
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend_api', '0074_schedule_payment_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentApiEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event_type', models.CharField(max_length=16)),
+                ('entity_id', models.UUIDField(help_text='payment_id or transaction_id')),
+                ('status', models.CharField(max_length=32)),
+                ('payload', django.contrib.postgres.fields.jsonb.JSONField(
+                    encoder=django.core.serializers.json.DjangoJSONEncoder
+                )),
+                ('received_at', models.DateTimeField(db_index=True)),
+                ('processed_at', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+            options={
+                'unique_together': {('event_type', 'entity_id', 'status')},
+            },
+        ),
+    ]
@@ -16,6 +16,7 @@ from core.models import Model, Address
 from frontend_api.models.schedule import Schedule, ScheduleStatus
 from frontend_api.models.escrow import Escrow, EscrowOperation, EscrowStatus
 from frontend_api.models.document import Document
+from frontend_api.models.processing import DailyPaymentsShard, PaymentApiEvent
 from frontend_api.fields import AccountType, CompanyType
 
 GBG_IDENTITY_VALID_DAYS = 90
@@ -278,6 +279,8 @@ __all__ = [
     # Schedules
     Schedule,
     ScheduleStatus,
+    DailyPaymentsShard,
+    PaymentApiEvent,
 
     # Documents
     Document,
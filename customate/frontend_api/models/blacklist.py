@@ -1,5 +1,12 @@
+import datetime
+import threading
+import time
+
 from colorlog import logging
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from core.models import Model
 from django.utils.translation import gettext_lazy as _
 
@@ -7,6 +14,11 @@ logger = logging.getLogger(__name__)
 
 BLACKLISTED_DAYS_MAX_RETRY_COUNT = 10  # max number of retries to find next non-blacklisted day
 
+# How long (in seconds) loaded blacklisted dates are trusted. Signals invalidate calendar within current process only,
+# so other processes (workers) rely on this timeout to pick up changes.
+BLACKLIST_CALENDAR_TTL = getattr(settings, "BLACKLIST_CALENDAR_TTL", 300)
+BLACKLIST_CALENDAR_WINDOW_DAYS = getattr(settings, "BLACKLIST_CALENDAR_WINDOW_DAYS", 400)
+
 
 class BlacklistDate(Model):
     date = models.DateField(unique=True)
@@ -16,7 +28,7 @@ class BlacklistDate(Model):
     @staticmethod
     def contains(date) -> bool:
         # Check if specified date falls in blacklist (weekend + holidays/special days)
-        result = BlacklistDate._is_weekend(date) or BlacklistDate._is_blacklisted_date(date)
+        result = blacklist_calendar.contains(date)
         logger.info(f"Blacklist verification (data={date}) returned: {result}.")
         return result
 
@@ -24,6 +36,73 @@ class BlacklistDate(Model):
     def _is_weekend(date) -> bool:
         return date.isoweekday() >= 6
 
-    @staticmethod
-    def _is_blacklisted_date(date) -> bool:
-        return BlacklistDate.objects.filter(is_active=True, date=date).exists()
+
+class BlacklistCalendar:
+    """
+    In-memory set of active blacklisted dates within some window around requested dates.
+    Dates are loaded by single query and are reloaded when requested date falls out of window, when TTL expires or
+    after any BlacklistDate record is saved/deleted.
+    """
+
+    def __init__(self, ttl=BLACKLIST_CALENDAR_TTL, window_days=BLACKLIST_CALENDAR_WINDOW_DAYS):
+        self.ttl = ttl
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self._dates = None
+        self._window_start = None
+        self._window_end = None
+        self._loaded_at = None
+
+    def contains(self, date) -> bool:
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        return BlacklistDate._is_weekend(date) or date in self._get_dates(date)
+
+    def next_business_day(self, date) -> datetime.date:
+        """
+        Find first date (starting from specified one) which is neither weekend nor blacklisted day.
+        Raises ValueError if there is no such date within BLACKLISTED_DAYS_MAX_RETRY_COUNT days.
+        """
+        result = date
+        for _ in range(BLACKLISTED_DAYS_MAX_RETRY_COUNT):
+            if not self.contains(result):
+                return result
+            result += datetime.timedelta(days=1)
+
+        logger.error("Unable to find business day within %s days starting from %s" % (
+            BLACKLISTED_DAYS_MAX_RETRY_COUNT, date
+        ))
+        raise ValueError("No business day within %s days starting from %s" % (BLACKLISTED_DAYS_MAX_RETRY_COUNT, date))
+
+    def invalidate(self):
+        with self._lock:
+            self._dates = None
+
+    def _get_dates(self, date) -> frozenset:
+        with self._lock:
+            if self._dates is None \
+                    or time.monotonic() - self._loaded_at > self.ttl \
+                    or not self._window_start <= date <= self._window_end:
+                self._load(date)
+            return self._dates
+
+    def _load(self, date):
+        # Most of the questions are about following days, so window mostly covers the future
+        self._window_start = date - datetime.timedelta(days=self.window_days // 4)
+        self._window_end = date + datetime.timedelta(days=self.window_days)
+        self._dates = frozenset(BlacklistDate.objects.filter(
+            is_active=True, date__gte=self._window_start, date__lte=self._window_end
+        ).values_list("date", flat=True))
+        self._loaded_at = time.monotonic()
+        logger.debug("Loaded %s blacklisted date(s) within [%s, %s]" % (
+            len(self._dates), self._window_start, self._window_end
+        ))
+
+
+blacklist_calendar = BlacklistCalendar()
+
+
+@receiver(post_save, sender=BlacklistDate)
+@receiver(post_delete, sender=BlacklistDate)
+def invalidate_blacklist_calendar(sender, **kwargs):
+    blacklist_calendar.invalidate()
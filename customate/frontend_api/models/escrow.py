@@ -307,6 +307,40 @@ class Escrow(Model):
             'old_balance': old_balance,
         })
 
+    @staticmethod
+    def bulk_update_balance(balances: Dict):
+        """
+        Update balance of several Escrows using single UPDATE statement (see update_balance)
+        :param balances: mapping of Escrow.id to new balance
+        """
+        if not balances:
+            return
+
+        Escrow.objects.filter(id__in=list(balances.keys())).update(balance=models.Case(
+            *[models.When(id=escrow_id, then=models.Value(balance)) for escrow_id, balance in balances.items()],
+            output_field=models.IntegerField()
+        ))
+        logger.info("Updated balance of %s escrow(s): %r" % (len(balances), balances), extra={
+            'escrow_ids': list(balances.keys())
+        })
+
+    @staticmethod
+    def bulk_update_payment_info(statuses: Dict):
+        """
+        Update info about underlying money transactions of several Escrows (see update_payment_info),
+        using at most two UPDATE statements
+        :param statuses: mapping of Escrow.id to payment status
+        """
+        pending_ids = [escrow_id for escrow_id, status in statuses.items() if status in Escrow.PENDING_PAYMENT_STATUSES]
+        other_ids = [escrow_id for escrow_id in statuses.keys() if escrow_id not in pending_ids]
+        for has_pending_payment, ids in [(True, pending_ids), (False, other_ids)]:
+            if ids:
+                Escrow.objects.filter(id__in=ids).update(has_pending_payment=has_pending_payment)
+                logger.info("Updated escrows (ids=%s) has_pending_payment=%s" % (ids, has_pending_payment), extra={
+                    'escrow_ids': ids,
+                    'has_pending_payment': has_pending_payment
+                })
+
     def update_payment_info(self, status: PaymentStatusType = None):
         """
         Update info about underlying money transactions in this model
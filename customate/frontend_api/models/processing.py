@@ -0,0 +1,142 @@
+import json
+from typing import Dict, List, Tuple
+from uuid import UUID, uuid4
+
+from django.contrib.postgres.fields import JSONField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from core.models import Model
+
+
+class DailyPaymentsShard(Model):
+    """
+    Progress of single shard of daily payments processing (see initiate_daily_payments task).
+    All shards of the same run share run_id, so that we can tell when the whole run is finished.
+    """
+
+    class Meta:
+        unique_together = ('run_id', 'shard')
+
+    run_id = models.CharField(max_length=64, db_index=True)
+    shard = models.PositiveSmallIntegerField()
+    shards_count = models.PositiveSmallIntegerField()
+    started_at = models.DateTimeField(null=True, blank=True, default=None)
+    finished_at = models.DateTimeField(null=True, blank=True, default=None)
+    is_failed = models.BooleanField(
+        default=False,
+        help_text=_('Indicates whether shard processing was interrupted by unexpected error')
+    )
+    messages_count = models.PositiveIntegerField(default=0)
+    payments_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.finished_at is not None
+
+    @classmethod
+    def heartbeat(cls, run_id: str, shard: int):
+        """
+        Refresh updated_at of running shard, so that it isn't considered stale (see check_daily_payments_shards)
+        """
+        cls.objects.filter(run_id=run_id, shard=shard, finished_at__isnull=True).update(updated_at=timezone.now())
+
+
+class PaymentApiEvent(Model):
+    """
+    Inbox of events received from PaymentAPI (on_payment_change, on_transaction_change).
+    Event is identified by (event_type, entity_id, status), so redelivered/duplicated notifications are recognized
+    and skipped without touching schedules and escrows.
+    Record is inserted within the same transaction as event processing, so failed processing doesn't leave record
+    behind and redelivered event is processed again.
+
+    Processing lag of events is (processed_at - received_at), where received_at is taken from event's payload
+    (see RECEIVED_AT_FIELD), i.e. it includes time spent by event in queues.
+    """
+    PAYMENT = "payment"
+    TRANSACTION = "transaction"
+
+    # Field of event payload with time when event was received from PaymentAPI (before routing to dedicated queue),
+    # set by entry point tasks (see mark_events_received) unless PaymentAPI provides it
+    RECEIVED_AT_FIELD = "received_at"
+
+    class Meta:
+        unique_together = ('event_type', 'entity_id', 'status')
+
+    event_type = models.CharField(max_length=16)
+    entity_id = models.UUIDField(help_text=_('payment_id or transaction_id'))
+    status = models.CharField(max_length=32)
+    payload = JSONField(encoder=DjangoJSONEncoder)
+    received_at = models.DateTimeField(db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True, default=None)
+
+    @classmethod
+    def accept(cls, event_type: str, entity_id, status: str, payload: Dict):
+        """
+        Register event in inbox.
+
+        :return: id of new inbox record or None if the same event was already received
+        """
+        accepted = cls.accept_many(event_type, [(entity_id, status, payload)])
+        # accept_many returns keys with canonical (lowercase, dashed) UUIDs
+        return accepted.get((str(UUID(str(entity_id))), status))
+
+    @classmethod
+    def accept_many(cls, event_type: str, events: List[Tuple]) -> Dict:
+        """
+        Register events of the same type using single INSERT statement, duplicates are silently skipped.
+
+        :param event_type: PAYMENT or TRANSACTION
+        :param events: list of (entity_id, status, payload)
+        :return: mapping of accepted (entity_id, status) to id of inbox record
+        """
+        if not events:
+            return {}
+
+        now = timezone.now()
+        values = []
+        params = []
+        for entity_id, status, payload in events:
+            received_at = payload.get(cls.RECEIVED_AT_FIELD)
+            values.append("(%s, %s, %s, %s, %s, %s, %s::jsonb, %s)")
+            params.extend([
+                uuid4(), now, now, event_type, entity_id, status, json.dumps(payload, cls=DjangoJSONEncoder),
+                (parse_datetime(received_at) if isinstance(received_at, str) else received_at) or now
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO {table} (id, created_at, updated_at, event_type, entity_id, status, payload, received_at) "
+                "VALUES {values} "
+                "ON CONFLICT (event_type, entity_id, status) DO NOTHING "
+                "RETURNING entity_id, status, id".format(table=cls._meta.db_table, values=", ".join(values)),
+                params
+            )
+            return {(str(entity_id), status): id for entity_id, status, id in cursor.fetchall()}
+
+    @classmethod
+    def mark_processed(cls, ids: List):
+        cls.objects.filter(id__in=ids).update(processed_at=timezone.now())
+
+    @classmethod
+    def discard(cls, ids: List):
+        """
+        Remove inbox records of events whose processing failed, so that redelivered events are processed again.
+        """
+        cls.objects.filter(id__in=ids).delete()
+
+    @classmethod
+    def purge(cls, processed_before, limit: int) -> int:
+        """
+        Remove up to limit inbox records of events processed before given time.
+
+        :return: number of removed records
+        """
+        ids = list(cls.objects.filter(processed_at__lt=processed_before).values_list("id", flat=True)[:limit])
+        if not ids:
+            return 0
+        return cls.objects.filter(id__in=ids).delete()[0]
@@ -1,13 +1,17 @@
 import logging
 import datetime
-from typing import Union
+from collections import OrderedDict
+from typing import Union, List, Dict, Tuple, Optional
+from uuid import uuid4
 import arrow
 
 from cached_property import cached_property
 from django.core.validators import RegexValidator
 from enumfields import EnumField
-from django.db import models
-from django.db.models import Sum, Q
+from django.db import models, connection
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
 
@@ -108,6 +112,15 @@ class AbstractSchedule(Model):
 class Schedule(AbstractSchedule):
     ACTIVE_SCHEDULE_STATUSES = [ScheduleStatus.open, ScheduleStatus.pending]
     PROCESSABLE_SCHEDULE_STATUSES = [ScheduleStatus.open]
+    OVERDUE_PAYMENT_STATUSES = [PaymentStatusType.FAILED, PaymentStatusType.REFUND, PaymentStatusType.CANCELED]
+
+    # Counters below are maintained upon payment status changes (see refresh_payment_counters)
+    total_paid_sum = models.PositiveIntegerField(
+        default=0, help_text=_("Total sum of all Schedule's paid payments")
+    )
+    number_of_overdue_payments = models.PositiveIntegerField(
+        default=0, help_text=_("Number of last payments in chains which were not paid (failed, refunded, canceled)")
+    )
 
     @property
     def total_sum_to_pay(self) -> int:
@@ -119,19 +132,6 @@ class Schedule(AbstractSchedule):
                (self.deposit_amount if self.deposit_amount is not None else 0) + \
                (self.payment_amount * self.number_of_payments)
 
-    @property
-    def total_paid_sum(self) -> int:
-        """
-        Total sum of all Schedule's paid payments
-        :return:
-        """
-        res = LastSchedulePayments.objects.filter(
-            schedule_id=self.id,
-            payment_status__in=[PaymentStatusType.SUCCESS]
-        ).aggregate(Sum('original_amount'))
-        total = res.get('original_amount__sum')
-        return total if total else 0
-
     @property
     def total_fee_amount(self) -> int:
         return (self.payment_fee_amount * self.number_of_payments) + self.deposit_fee_amount
@@ -159,7 +159,6 @@ class Schedule(AbstractSchedule):
 
     @property
     def number_of_payments_left(self):
-        self.refresh_number_of_payments_made()
         return self.number_of_payments - self.number_of_payments_made
 
     @property
@@ -205,6 +204,10 @@ class Schedule(AbstractSchedule):
 
     @property
     def origin_payment_account_id(self):
+        # prefer value selected along with schedule (see ScheduleViewSet.get_queryset)
+        annotated = self.__dict__.get("annotated_origin_payment_account_id")
+        if annotated is not None:
+            return annotated
         return self.origin_user.account.payment_account_id
 
     @property
@@ -253,24 +256,33 @@ class Schedule(AbstractSchedule):
 
     def refresh_number_of_payments_made(self):
         """
-        Update count of actual payments made in the DB
+        Update count of actual payments made in the DB (along with the rest of payment counters)
         :return:
         """
-        old_number_of_payments_made = self.number_of_payments_made
-        # get the list of last successful, regular payments
-        self.number_of_payments_made = LastSchedulePayments.objects.filter(
-            schedule_id=self.id,
-            payment_status__in=[PaymentStatusType.SUCCESS],
-            is_deposit=False
-        ).count()
-        self.save(update_fields=["number_of_payments_made"])
-        logger.info("Updated schedule (id=%s) number_of_payments_made=%s (was=%s)"
-                    % (self.id, self.number_of_payments_made, old_number_of_payments_made),
-                    extra={
-                        'schedule_id': self.id,
-                        'new_value': self.number_of_payments_made,
-                        'old_value': old_number_of_payments_made
-                    })
+        self.refresh_payment_counters()
+
+    def refresh_payment_counters(self):
+        """
+        Update number_of_payments_made, total_paid_sum & number_of_overdue_payments in the DB
+        according to current statuses of last payments, using single aggregate query.
+        :return:
+        """
+        old_values = (self.number_of_payments_made, self.total_paid_sum, self.number_of_overdue_payments)
+        success = Q(payment_status=PaymentStatusType.SUCCESS)
+        res = LastSchedulePayments.objects.filter(schedule_id=self.id).aggregate(
+            number_of_payments_made=Count('id', filter=success & Q(is_deposit=False)),
+            total_paid_sum=Sum('original_amount', filter=success),
+            number_of_overdue_payments=Count('id', filter=Q(payment_status__in=Schedule.OVERDUE_PAYMENT_STATUSES))
+        )
+        self.number_of_payments_made = res['number_of_payments_made']
+        self.total_paid_sum = res['total_paid_sum'] or 0
+        self.number_of_overdue_payments = res['number_of_overdue_payments']
+        self.save(update_fields=["number_of_payments_made", "total_paid_sum", "number_of_overdue_payments"])
+        logger.info("Updated schedule (id=%s) payment counters: number_of_payments_made=%s, total_paid_sum=%s, "
+                    "number_of_overdue_payments=%s (was=%s)"
+                    % (self.id, self.number_of_payments_made, self.total_paid_sum, self.number_of_overdue_payments,
+                       old_values),
+                    extra={'schedule_id': self.id})
 
     def update_status(self) -> ScheduleStatus:
         """
@@ -607,15 +619,17 @@ class Schedule(AbstractSchedule):
         ))
         return result
 
-    def can_retry_with_backup_funding_source(self):
+    def can_retry_with_backup_funding_source(self, latest_schedule_payment=None):
         """
         This method assumes that it will query the latest schedule payment record, make sure that this is TRUE
         for concurrent environment (executing this method not in DB transaction scope may lead to issues)
+        :param latest_schedule_payment: just updated SchedulePayments record, queried if not specified
         :return: bool
         """
-        latest_schedule_payment = LastSchedulePayments.objects.filter(
-            schedule_id=self.id
-        ).order_by("-updated_at").first()
+        if latest_schedule_payment is None:
+            latest_schedule_payment = LastSchedulePayments.objects.filter(
+                schedule_id=self.id
+            ).order_by("-updated_at").first()
 
         logger.debug("latest_schedule_payment(id=%s, status=%s, funding_source_id=%s)" % (
             latest_schedule_payment.id,
@@ -632,16 +646,151 @@ class Schedule(AbstractSchedule):
         return self.funding_source_type is not FundingSourceType.WALLET or self.payee_type is not PayeeType.WALLET
 
     @staticmethod
-    def is_execution_date_limited_filters(is_execution_date_limited: bool) -> Q:
+    def is_execution_date_limited_filters(is_execution_date_limited: bool, prefix: str = "") -> Q:
         """
         Returns set of filters for use in Django ORM queries
         :param is_execution_date_limited: bool
+        :param prefix: path to schedule in related queries, e.g. "schedule__"
         :return Q: complex lookup query
         """
+        funding_source_type = {prefix + "funding_source_type": FundingSourceType.WALLET}
+        payee_type = {prefix + "payee_type": PayeeType.WALLET}
         if is_execution_date_limited:
-            return ~Q(funding_source_type=FundingSourceType.WALLET) | ~Q(payee_type=PayeeType.WALLET)
+            return ~Q(**funding_source_type) | ~Q(**payee_type)
         else:
-            return Q(funding_source_type=FundingSourceType.WALLET) & Q(payee_type=PayeeType.WALLET)
+            return Q(**funding_source_type) & Q(**payee_type)
+
+    @staticmethod
+    def origin_payment_account_id_expression(prefix: str = "") -> Coalesce:
+        """
+        Returns expression to select origin user's payment account id within the same query
+        (see origin_payment_account_id property)
+        :param prefix: path to schedule in related queries, e.g. "schedule__"
+        :return:
+        """
+        # origin user is either owner (UserAccount) or subuser, which payments are made from owner's account
+        return Coalesce(
+            prefix + "origin_user__account__useraccount__payment_account_id",
+            prefix + "origin_user__account__subuseraccount__owner_account__payment_account_id"
+        )
+
+    @staticmethod
+    def get_processable_occurrences(dates: List[Tuple[datetime.date, bool]]) -> models.QuerySet:
+        """
+        Select deposit & regular payments (of all periods) which should be initiated on specified dates,
+        using single query. Every occurrence is annotated with "payment_account_id" of schedule's origin user.
+
+        :param dates: list of (scheduled_date, is_execution_date_limited) pairs
+        :return: ScheduleOccurrence queryset (with related schedule)
+        """
+        dates_filters = Q(pk__in=[])
+        for scheduled_date, is_execution_date_limited in dates:
+            dates_filters |= Q(scheduled_date=scheduled_date) & Schedule.is_execution_date_limited_filters(
+                is_execution_date_limited, prefix="schedule__"
+            )
+
+        return ScheduleOccurrence.objects.select_related("schedule").annotate(
+            payment_account_id=Schedule.origin_payment_account_id_expression(prefix="schedule__")
+        ).filter(
+            dates_filters,
+            schedule__status__in=Schedule.PROCESSABLE_SCHEDULE_STATUSES,
+            payment_account_id__isnull=False
+        ).order_by("scheduled_date", "id")
+
+    @staticmethod
+    def reconcile_statuses(schedule_ids: List = None) -> int:
+        """
+        Recompute payment counters (see refresh_payment_counters), is_overdue and status (see update_status)
+        of given schedules using single UPDATE statement based on aggregated info about last payments.
+        Only rows which actually differ are updated.
+
+        :param schedule_ids: schedules to reconcile, all schedules if not specified
+        :return: number of updated schedules
+        """
+        schedule_filter = "" if schedule_ids is None else "WHERE schedule_id = ANY(%(schedule_ids)s::uuid[])"
+        success = PaymentStatusType.SUCCESS.value
+        overdue = [s.value for s in Schedule.OVERDUE_PAYMENT_STATUSES]
+        retryable = [PaymentStatusType.FAILED.value, PaymentStatusType.REFUND.value]
+        # Stopped/closed guard uses current status of updated row (not the one of CTE snapshot), so that schedule
+        # stopped or closed concurrently is not reopened. NULL reconciled status keeps current status as well.
+        status = "CASE WHEN s.status IN (%(stopped)s, %(closed)s) THEN s.status ELSE coalesce(r.status, s.status) END"
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "WITH payments AS ("
+                "  SELECT schedule_id,"
+                "    count(*) FILTER (WHERE payment_status = %(success)s AND NOT is_deposit) AS number_of_payments_made,"
+                "    coalesce(sum(original_amount) FILTER (WHERE payment_status = %(success)s), 0) AS total_paid_sum,"
+                "    count(*) FILTER (WHERE payment_status = ANY(%(overdue)s)) AS number_of_overdue_payments"
+                "  FROM {last_payments} {schedule_filter} GROUP BY schedule_id"
+                "), latest_payments AS ("
+                "  SELECT DISTINCT ON (schedule_id) schedule_id, payment_status, funding_source_id"
+                "  FROM {last_payments} {schedule_filter} ORDER BY schedule_id, updated_at DESC, id DESC"
+                "), reconciled AS ("
+                "  SELECT s.id, p.number_of_payments_made, p.total_paid_sum, p.number_of_overdue_payments,"
+                # overdue unless it's the first failure and we are going to retry with backup funding source
+                "    CASE WHEN p.number_of_overdue_payments = 0 THEN false"
+                "      ELSE s.is_overdue OR NOT coalesce(lp.payment_status = ANY(%(retryable)s)"
+                "        AND s.backup_funding_source_id IS NOT NULL"
+                "        AND lp.funding_source_id = s.funding_source_id, false)"
+                "    END AS is_overdue,"
+                "    CASE WHEN p.number_of_overdue_payments > 0 THEN NULL"
+                "      WHEN s.number_of_payments <> p.number_of_payments_made THEN %(open)s"
+                "      ELSE %(closed)s"
+                "    END AS status"
+                "  FROM {schedule} s"
+                "  JOIN payments p ON p.schedule_id = s.id"
+                "  LEFT JOIN latest_payments lp ON lp.schedule_id = s.id"
+                ") "
+                "UPDATE {schedule} s SET number_of_payments_made = r.number_of_payments_made,"
+                "  total_paid_sum = r.total_paid_sum, number_of_overdue_payments = r.number_of_overdue_payments,"
+                "  is_overdue = r.is_overdue, status = {status}, updated_at = now() "
+                "FROM reconciled r "
+                "WHERE s.id = r.id AND (s.number_of_payments_made, s.total_paid_sum, s.number_of_overdue_payments,"
+                "  s.is_overdue, s.status) IS DISTINCT FROM (r.number_of_payments_made, r.total_paid_sum,"
+                "  r.number_of_overdue_payments, r.is_overdue, {status}) "
+                "RETURNING s.id, s.status, s.is_overdue".format(
+                    schedule=Schedule._meta.db_table,
+                    last_payments=LastSchedulePayments._meta.db_table,
+                    schedule_filter=schedule_filter,
+                    status=status
+                ),
+                {
+                    "schedule_ids": [str(schedule_id) for schedule_id in schedule_ids or []],
+                    "success": success,
+                    "overdue": overdue,
+                    "retryable": retryable,
+                    "stopped": ScheduleStatus.stopped.value,
+                    "closed": ScheduleStatus.closed.value,
+                    "open": ScheduleStatus.open.value
+                }
+            )
+            updated = cursor.fetchall()
+
+        logger.info("Reconciled statuses of %s schedule(s) (requested=%s): %r" % (
+            len(updated), "all" if schedule_ids is None else len(schedule_ids), updated[:100]
+        ))
+        return len(updated)
+
+    @staticmethod
+    def filter_by_shard(queryset: models.QuerySet, shard: int, shards_count: int,
+                        column: str = "id") -> models.QuerySet:
+        """
+        Keep only records which belong to specific shard, i.e. hash of schedule's id modulo shards_count.
+        Works for Schedule and all schedule-based views (which expose schedule's "id" column).
+
+        :param queryset:
+        :param shard: number of shard, starting from 0
+        :param shards_count: total number of shards
+        :param column: column with schedule's id, e.g. "schedule_id" for ScheduleOccurrence
+        :return:
+        """
+        return queryset.extra(
+            where=['(hashtext("%s"."%s"::text) & 2147483647) %%%% %%s = %%s' % (
+                queryset.model._meta.db_table, column
+            )],
+            params=[shards_count, shard]
+        )
 
     def allow_post_document(self, user: User) -> bool:
         """
@@ -791,6 +940,36 @@ class DepositsSchedule(AbstractSchedule):
         return self.payment_account_id
 
 
+class ScheduleOccurrence(models.Model):
+    """
+    Materialized list of dates on which Schedule's payments should be initiated (one row per deposit/regular payment).
+    Records are maintained by DB triggers on frontend_api_schedule (see 'refresh_schedule_occurrences' SQL function),
+    periodic & deposit schedule views are built on top of this table.
+    """
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.CASCADE,
+        related_name='occurrences'
+    )
+    scheduled_date = models.DateField(
+        db_index=True, help_text=_("Specific date on which the payment should be initiated")
+    )
+    original_scheduled_date = models.DateField(
+        help_text=_("Specific date w/o any weekends and blacklisted days")
+    )
+    is_deposit = models.BooleanField(
+        default=False, help_text=_('Indicates whether this occurrence is deposit payment'),
+    )
+
+    class Meta:
+        unique_together = ('schedule', 'scheduled_date', 'original_scheduled_date', 'is_deposit')
+
+    def __str__(self):
+        return "ScheduleOccurrence(schedule_id=%s, scheduled_date=%s, original_scheduled_date=%s, is_deposit=%s)" % (
+            self.schedule_id, self.scheduled_date, self.original_scheduled_date, self.is_deposit
+        )
+
+
 class AbstractSchedulePayments(Model):
     """
     Special model to hold relationships between every payment made within specific Schedule
@@ -832,12 +1011,103 @@ class AbstractSchedulePayments(Model):
 
 
 class SchedulePayments(AbstractSchedulePayments):
-    pass
+    # maintained by DB trigger (see 'update_last_in_chain' SQL function), LastSchedulePayments view relies on it
+    is_last_in_chain = models.BooleanField(
+        default=True,
+        help_text=_("Indicates whether there are no follow-up payments for this payment")
+    )
+
+    @classmethod
+    def bulk_create_pending(cls, payments: List[Dict]) -> Dict:
+        """
+        Create PENDING schedule payments using single INSERT statement. Payments whose idempotence_key
+        already exists are silently skipped (instead of raising IntegrityError), so that we get
+        only those records which were actually created.
+
+        :param payments: list of dicts with schedule_id, payment_id, funding_source_id, original_amount,
+            is_deposit and idempotence_key
+        :return: mapping of created idempotence_key to SchedulePayments.id
+        """
+        if not payments:
+            return {}
+
+        now = timezone.now()
+        values = []
+        params = []
+        for p in payments:
+            values.append("(%s, %s, %s, %s, %s, NULL, %s, %s, %s, %s, %s)")
+            params.extend([
+                uuid4(), now, now, p["schedule_id"], p["payment_id"], p["funding_source_id"],
+                PaymentStatusType.PENDING.value, p["original_amount"], p["is_deposit"], p["idempotence_key"]
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO {table} (id, created_at, updated_at, schedule_id, payment_id, parent_payment_id, "
+                "funding_source_id, payment_status, original_amount, is_deposit, idempotence_key) "
+                "VALUES {values} "
+                "ON CONFLICT (idempotence_key) DO NOTHING "
+                "RETURNING idempotence_key, id".format(table=cls._meta.db_table, values=", ".join(values)),
+                params
+            )
+            return {idempotence_key: id for idempotence_key, id in cursor.fetchall()}
+
+    @classmethod
+    def delete_pending(cls, ids: List, updated_before=None) -> int:
+        """
+        Delete schedule payments which are still PENDING, i.e. their payments were not initiated by make_payment,
+        so that they are initiated again by next daily payments processing.
+
+        :param ids: SchedulePayments ids
+        :param updated_before: delete only records which were not claimed by make_payment since this time
+        :return: number of deleted records
+        """
+        queryset = cls.objects.filter(id__in=ids, payment_status=PaymentStatusType.PENDING)
+        if updated_before is not None:
+            queryset = queryset.filter(updated_at__lt=updated_before)
+        return queryset.delete()[0]
+
+    @classmethod
+    def claim_pending(cls, id) -> Optional['SchedulePayments']:
+        """
+        Mark PENDING schedule payment as taken by make_payment (updated_at is refreshed), so that it is not deleted
+        as stale one (see delete_pending) while payment is being initiated.
+
+        :param id:
+        :return: claimed record, None if there is no PENDING record with given id
+        """
+        if not cls.objects.filter(id=id, payment_status=PaymentStatusType.PENDING).update(updated_at=timezone.now()):
+            return None
+        return cls.objects.filter(id=id).first()
+
+    @classmethod
+    def bulk_update_statuses(cls, statuses: List[Tuple]) -> int:
+        """
+        Update payment_status of several schedule payments using one UPDATE statement per distinct status.
+        If the same payment occurs several times, the last status wins.
+
+        :param statuses: list of (schedule_id, payment_id, PaymentStatusType)
+        :return: number of updated records
+        """
+        last_statuses = OrderedDict(((schedule_id, payment_id), status) for schedule_id, payment_id, status in statuses)
+        by_status = {}
+        for key, status in last_statuses.items():
+            by_status.setdefault(status, []).append(key)
+
+        now = timezone.now()
+        updated = 0
+        for status, keys in by_status.items():
+            updated += cls.objects.filter(
+                schedule_id__in={key[0] for key in keys},
+                payment_id__in=[key[1] for key in keys]
+            ).update(payment_status=status, updated_at=now)
+        return updated
 
 
 class LastSchedulePayments(AbstractSchedulePayments):
     """
-     Special view-based model to work with last payments according to payment chains (payment_id, parent_payment_id)
+     Special view-based model to work with last payments according to payment chains (payment_id, parent_payment_id),
+     i.e. SchedulePayments with is_last_in_chain flag
      """
 
     class Meta:
@@ -216,6 +216,15 @@ class IsSuperAdminOrReadOnly(permissions.BasePermission):
         return request.user.is_superuser
 
 
+class IsSuperAdmin(permissions.BasePermission):
+    """
+    Custom permission to only allow super admins (for any method).
+    """
+
+    def has_permission(self, request, view):
+        return request.user.is_superuser
+
+
 class IsRegularSubUserOrReadOnly(permissions.BasePermission):
     """
     Custom permission to only allow super admins.
@@ -38,7 +38,7 @@ class BaseEscrowSerializer(HyperlinkedModelSerializer):
         if not payee_id:
             return response
         try:
-            pd = payment_service.Payee.get(payee_id=payee_id)
+            pd = payment_service.Payee.get_cached(payee_id=payee_id)
         except Exception as e:
             logger.error("Got empty 'payee_id' or 'payee_details'. Payee_id: %s. %r", (payee_id, format_exc()))
             raise ValidationError("Payment service is not available. Try again later.")
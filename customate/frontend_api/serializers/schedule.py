@@ -42,7 +42,7 @@ class BaseScheduleSerializer(HyperlinkedModelSerializer):
         if data.get('payee_id') is None:
             return
 
-        pd = payment_service.Payee.get(payee_id=UUID(data.get('payee_id')))
+        pd = payment_service.Payee.get_cached(payee_id=UUID(data.get('payee_id')))
         if not pd:
             return
 
@@ -69,7 +69,7 @@ class BaseScheduleSerializer(HyperlinkedModelSerializer):
         :param data: dict of incoming fields from HTTP request
         """
         if data.get('funding_source_id'):
-            fs_details = payment_service.FundingSource.get(fs_id=UUID(data.get('funding_source_id')))
+            fs_details = payment_service.FundingSource.get_cached(fs_id=UUID(data.get('funding_source_id')))
             self._check_specific_funding_source(data, fs_details, 'funding_source_id')
             data.update({
                 'funding_source_type': self._get_and_validate_funding_source_type(fs_details)
@@ -78,7 +78,7 @@ class BaseScheduleSerializer(HyperlinkedModelSerializer):
         if 'backup_funding_source_id' in data:
             backup_funding_source_type = None
             if data.get('backup_funding_source_id'):
-                fs_details = payment_service.FundingSource.get(fs_id=UUID(data.get('backup_funding_source_id')))
+                fs_details = payment_service.FundingSource.get_cached(fs_id=UUID(data.get('backup_funding_source_id')))
                 self._check_specific_funding_source(data, fs_details, 'backup_funding_source_id')
                 backup_funding_source_type = self._get_and_validate_backup_funding_source_type(fs_details)
             data.update({
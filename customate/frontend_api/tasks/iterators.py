@@ -0,0 +1,64 @@
+from __future__ import absolute_import, unicode_literals
+import logging
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+logger = logging.getLogger(__name__)
+
+KEYSET_ORDERING = ("created_at", "id")
+
+
+def keyset_iterator(queryset: QuerySet, chunk_size=None, server_side_cursor=False, ordering=KEYSET_ORDERING):
+    """
+    Iterate through (potentially huge) queryset in consistent (created_at, id) order, keeping constant memory usage.
+    Unlike django.core.paginator.Paginator it doesn't run COUNT(*) and doesn't use OFFSET, so each chunk is
+    fetched by index range scan, starting right after last seen record. It is also safe to modify(or remove) records
+    which were already yielded, since this won't shift the following chunks.
+
+    :param queryset: any queryset of model (or view) with "created_at" & "id" fields
+    :param chunk_size: number of records fetched per single SQL query
+    :param server_side_cursor: stream records from single server-side cursor instead of separate keyset queries
+        (not suitable for connection poolers working in transaction mode)
+    :param ordering: ascending fields which uniquely identify record, related fields are allowed (e.g. "schedule__id")
+    :return: generator of model instances
+    """
+    chunk_size = chunk_size or settings.CELERY_BEAT_PER_PAGE_OBJECTS
+    queryset = queryset.order_by(*ordering)
+
+    if server_side_cursor:
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = chunk.filter(_get_keyset_filters(last, ordering))
+        records = list(chunk[:chunk_size])
+        logger.debug("Fetched chunk of %s records (model=%s, chunk_size=%s)" % (
+            len(records), queryset.model.__name__, chunk_size
+        ))
+        yield from records
+
+        if len(records) < chunk_size:
+            break
+        last = records[-1]
+
+
+def _get_keyset_filters(last, ordering) -> Q:
+    """
+    Build lexicographic "greater than" filter, e.g. for (a, b): a > last.a OR (a = last.a AND b > last.b)
+    """
+    values = [_get_field_value(last, field) for field in ordering]
+    result = Q()
+    for i, field in enumerate(ordering):
+        equal = {f: v for f, v in zip(ordering[:i], values[:i])}
+        result |= Q(**equal, **{"%s__gt" % field: values[i]})
+    return result
+
+
+def _get_field_value(obj, field: str):
+    for attr in field.split("__"):
+        obj = getattr(obj, attr)
+    return obj
@@ -5,7 +5,9 @@ import logging
 from celery import shared_task
 from django.conf import settings
 from botocore.exceptions import ClientError, EndpointConnectionError
-from external_apis.aws.service import get_aws_client
+from external_apis.aws.service import get_aws_client, AWS_FAILURE_EXCEPTIONS
+from external_apis.circuit_breaker import get_breaker
+from frontend_api.exceptions import UpstreamUnavailable
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +23,9 @@ def send_notification_email(to_address, message):
         }
     }
     try:
-        email_client.send_email(**kwargs, **message)
-    except (ClientError, EndpointConnectionError):
+        with get_breaker("aws").call(failure_exceptions=AWS_FAILURE_EXCEPTIONS):
+            email_client.send_email(**kwargs, **message)
+    except (ClientError, EndpointConnectionError, UpstreamUnavailable):
         logger.error("Error while sending email via boto3 with outcoming data: %s. %r" % (kwargs, format_exc()))
 
 
@@ -42,6 +45,7 @@ def send_notification_sms(to_phone_number, message):
         "PhoneNumber": to_phone_number,
         "Message": message}
     try:
-        sms_client.publish(**kwargs)
+        with get_breaker("aws").call(failure_exceptions=AWS_FAILURE_EXCEPTIONS):
+            sms_client.publish(**kwargs)
     except:
         logger.error("Unable to send message via boto3 with outcoming data: %s. %r" % (kwargs, format_exc()))
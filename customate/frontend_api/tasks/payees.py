@@ -5,6 +5,7 @@ from django.db import transaction
 from typing import Dict
 
 from core.logger import RequestIdGenerator
+from external_apis.payment.cache import payment_api_cache
 from frontend_api.models import Schedule, Escrow
 
 logger = logging.getLogger(__name__)
@@ -34,6 +35,8 @@ def on_payee_change(payee_info: Dict):
         'recipient_email': recipient_email
     })
 
+    if payee_id:
+        payment_api_cache.invalidate("payees", payee_id)
     update_schedules_payee_fields(payee_info)
     update_escrows_payee_fields(payee_info)
 
@@ -1,30 +1,34 @@
 from __future__ import absolute_import, unicode_literals
-from typing import Dict
-from datetime import datetime
+from typing import Dict, List, Tuple
+from datetime import datetime, timedelta
+from collections import OrderedDict
 from traceback import format_exc
 import logging
+import time
 from uuid import UUID, uuid4, uuid5, NAMESPACE_OID
 
 import arrow
 from celery import shared_task
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.utils import IntegrityError
-from django.core.paginator import Paginator
 from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from django.db.models import Q
 
-from core.logger import RequestIdGenerator
+from core.logger import RequestIdGenerator, Timer
 from core.models import User
 from core.fields import Currency, PaymentStatusType, TransactionStatusType, FundingSourceType, PayeeType
 
 import external_apis.payment.service as payment_service
+from external_apis.payment.cache import payment_api_cache
 
+from frontend_api.exceptions import UpstreamUnavailable
 from frontend_api.models.blacklist import BlacklistDate, BLACKLISTED_DAYS_MAX_RETRY_COUNT
-from frontend_api.models.schedule import Schedule, PeriodicSchedule, DepositsSchedule
+from frontend_api.models.schedule import Schedule, ScheduleOccurrence
 from frontend_api.models.schedule import SchedulePayments, LastSchedulePayments
 from frontend_api.models.escrow import Escrow, EscrowStatus
-from frontend_api.fields import ScheduleStatus, SchedulePeriod
+from frontend_api.models.processing import DailyPaymentsShard, PaymentApiEvent
 from frontend_api.notifications.schedules import (
     notify_about_loaded_funds,
     notify_about_schedules_successful_payment,
@@ -34,9 +38,70 @@ from frontend_api.notifications.escrows import (
     notify_about_fund_escrow_state,
     notify_escrow_funder_about_transaction_status
 )
+from frontend_api.tasks.iterators import keyset_iterator
+from frontend_api.tasks.resolvers import EventEntities, event_entities_resolver
+from frontend_api.tasks.routing import get_event_queue, group_events_by_queue
 
 logger = logging.getLogger(__name__)
 
+# PENDING SchedulePayments, which were not claimed by make_payment within this period and whose payments don't exist
+# in PaymentAPI, are considered lost (e.g. worker crashed right after records creation) and are deleted periodically
+# (see reclaim_stale_pending_schedule_payments), so that their payments are initiated again by next daily payments
+# processing. Only records created within STALE_PENDING_SCHEDULE_PAYMENTS_WINDOW_HOURS are checked, at most
+# STALE_PENDING_SCHEDULE_PAYMENTS_LIMIT of them per run.
+STALE_PENDING_SCHEDULE_PAYMENT_MINUTES = getattr(settings, "STALE_PENDING_SCHEDULE_PAYMENT_MINUTES", 60)
+STALE_PENDING_SCHEDULE_PAYMENTS_WINDOW_HOURS = getattr(settings, "STALE_PENDING_SCHEDULE_PAYMENTS_WINDOW_HOURS", 48)
+STALE_PENDING_SCHEDULE_PAYMENTS_LIMIT = getattr(settings, "STALE_PENDING_SCHEDULE_PAYMENTS_LIMIT", 100)
+
+# Max number of payments submitted by daily scheduler within single Celery message (see make_payments_batch)
+PAYMENTS_BATCH_SIZE = getattr(settings, "PAYMENTS_BATCH_SIZE", 50)
+# Number of parallel tasks (see process_daily_payments_shard) which share daily payments processing
+PAYMENTS_PROCESSING_SHARDS = getattr(settings, "PAYMENTS_PROCESSING_SHARDS", 8)
+
+# Running shard of daily payments processing updates its heartbeat every DAILY_PAYMENTS_SHARD_HEARTBEAT_SECONDS.
+# Unfinished shard without heartbeat within STALE_DAILY_PAYMENTS_SHARD_MINUTES (e.g. worker was killed or message
+# was lost) is re-queued by check_daily_payments_shards. Shards of runs older than DAILY_PAYMENTS_SHARD_REQUEUE_HOURS
+# are not re-queued anymore, they are marked as failed instead.
+DAILY_PAYMENTS_SHARD_HEARTBEAT_SECONDS = getattr(settings, "DAILY_PAYMENTS_SHARD_HEARTBEAT_SECONDS", 60)
+STALE_DAILY_PAYMENTS_SHARD_MINUTES = getattr(settings, "STALE_DAILY_PAYMENTS_SHARD_MINUTES", 15)
+DAILY_PAYMENTS_SHARD_REQUEUE_HOURS = getattr(settings, "DAILY_PAYMENTS_SHARD_REQUEUE_HOURS", 12)
+
+# Inbox records of processed PaymentAPI events are kept for this period, so that redelivered events are still
+# recognized as duplicates (see PaymentApiEvent), and then purged by purge_processed_payment_api_events
+PAYMENT_API_EVENTS_RETENTION_DAYS = getattr(settings, "PAYMENT_API_EVENTS_RETENTION_DAYS", 30)
+PAYMENT_API_EVENTS_PURGE_CHUNK_SIZE = getattr(settings, "PAYMENT_API_EVENTS_PURGE_CHUNK_SIZE", 10000)
+
+# Escrow is not processed on payment events with these statuses (see process_escrow_payment_change)
+ESCROW_SKIPPED_PAYMENT_STATUSES = [PaymentStatusType.PENDING, TransactionStatusType.PROCESSING]
+
+# Order of make_payment() arguments for every payment inside of make_payments_batch's message
+PAYMENTS_BATCH_FIELDS = (
+    "user_id", "payment_account_id", "schedule_id", "currency", "payment_amount", "additional_information",
+    "payee_id", "funding_source_id", "is_deposit", "original_scheduled_date", "schedule_payment_id"
+)
+
+
+def get_payment_idempotence_key(user_id: str, payment_account_id: str, schedule_id: str, currency: str,
+                                payment_amount: int, payee_id: str, parent_payment_id=None, is_deposit=False,
+                                original_scheduled_date=None) -> UUID:
+    """
+    Build key which is used to avoid potential double charges when calling payment-api.
+
+    :return:
+    """
+    idempotence_key = {
+        False: "%s.%s.%s.%s.%s.%s.%s.%s" % (
+            user_id, payment_account_id, schedule_id, currency, payment_amount,
+            payee_id, parent_payment_id,
+            original_scheduled_date
+        ),
+        # make sure we only have SINGLE deposit payment within specific schedule
+        True: "%s.%s.%s" % (
+            schedule_id, payee_id, parent_payment_id,
+        )
+    }[is_deposit]
+    return uuid5(NAMESPACE_OID, idempotence_key)
+
 
 # NOTE: make sure we use only primitive types in @shared_task signatures, otherwise there will be a need to write our own
 # custom JSON serializer. For more details see here:
@@ -87,7 +152,8 @@ def make_failed_payment(user_id: str, payment_account_id: str, schedule_id: str,
 @shared_task
 def make_payment(user_id: str, payment_account_id: str, schedule_id: str, currency: str, payment_amount: int,
                  additional_information: str, payee_id: str, funding_source_id: str, parent_payment_id=None,
-                 execution_date=None, request_id=None, is_deposit=False, original_scheduled_date=None):
+                 execution_date=None, request_id=None, is_deposit=False, original_scheduled_date=None,
+                 schedule_payment_id=None):
     """
     Calls payment API to initiate a payment.
 
@@ -105,10 +171,24 @@ def make_payment(user_id: str, payment_account_id: str, schedule_id: str, curren
     :param is_deposit: Indicates whether this payment is deposit
     :param original_scheduled_date: Initially planned date of payment according to PeriodicSchedule
                                     w/o any date adjustments like weekends and/or blacklisted dates
+    :param schedule_payment_id: PENDING SchedulePayments record which was already created for this payment
+                                (see PaymentsBatchDispatcher), new record is created if not specified
     :return: created payment instance
     """
     logging.init_shared_extra(request_id)
-    payment_id = uuid4()
+    result = None
+    schedule_payment = None
+
+    if schedule_payment_id:
+        schedule_payment = SchedulePayments.claim_pending(schedule_payment_id)
+        if schedule_payment is None:
+            logger.error("Pending schedule payment (id=%s) was not found, exiting" % schedule_payment_id, extra={
+                'schedule_id': schedule_id,
+                'schedule_payment_id': schedule_payment_id
+            })
+            return result
+
+    payment_id = schedule_payment.payment_id if schedule_payment else uuid4()
     logger.info("Making payment: payment_id=%s, user_id=%s, payment_account_id=%s, schedule_id=%s, currency=%s, "
                 "payment_amount=%s, additional_information=%s, payee_id=%s, funding_source_id=%s, parent_payment_id=%s,"
                 " execution_date=%s, is_deposit=%s, original_scheduled_date=%s, request_id=%s" % (
@@ -125,54 +205,59 @@ def make_payment(user_id: str, payment_account_id: str, schedule_id: str, curren
                     'is_deposit': is_deposit,
                 })
 
-    result = None
-
-    idempotence_key = {
-        False: "%s.%s.%s.%s.%s.%s.%s.%s" % (
-            user_id, payment_account_id, schedule_id, currency, payment_amount,
-            payee_id, parent_payment_id,
-            original_scheduled_date
-        ),
-        # make sure we only have SINGLE deposit payment within specific schedule
-        True: "%s.%s.%s" % (
-            schedule_id, payee_id, parent_payment_id,
-        )
-    }[is_deposit]
-
-    try:
-        schedule_payment = SchedulePayments(
+    if schedule_payment is None:
+        idempotence_key = get_payment_idempotence_key(
+            user_id=user_id,
+            payment_account_id=payment_account_id,
             schedule_id=schedule_id,
-            payment_id=payment_id,
-            funding_source_id=funding_source_id,
+            currency=currency,
+            payment_amount=payment_amount,
+            payee_id=payee_id,
             parent_payment_id=parent_payment_id,
-            payment_status=PaymentStatusType.PENDING,
-            original_amount=payment_amount,
             is_deposit=is_deposit,
-            idempotence_key=uuid5(NAMESPACE_OID, idempotence_key)
+            original_scheduled_date=original_scheduled_date
         )
-        schedule_payment.save()
-        logger.info("Schedule payment successfully created (schedule_id=%s, payment_id=%s)" % (schedule_id, payment_id))
 
-    except IntegrityError as e:
-        if not ("duplicate" and "idempotence_key" in str(e)):
-            raise e
-        logger.error("Looks like double-charge payment attempt(idempotence_key=%s), exiting" % idempotence_key, extra={
-            'schedule_id': schedule_id,
-            'payment_id': payment_id,
-            'funding_source_id': funding_source_id,
-            'payment_amount': payment_amount,
-            'is_deposit': is_deposit,
-        })
-        return result
-    except Exception:
-        logger.error("Saving schedule_payment record failed due to: %r" % format_exc(), extra={
-            'schedule_id': schedule_id,
-        })
-        return result
+        try:
+            schedule_payment = SchedulePayments(
+                schedule_id=schedule_id,
+                payment_id=payment_id,
+                funding_source_id=funding_source_id,
+                parent_payment_id=parent_payment_id,
+                payment_status=PaymentStatusType.PENDING,
+                original_amount=payment_amount,
+                is_deposit=is_deposit,
+                idempotence_key=idempotence_key
+            )
+            schedule_payment.save()
+            logger.info("Schedule payment successfully created (schedule_id=%s, payment_id=%s)" % (
+                schedule_id, payment_id
+            ))
 
-    logger.info("Schedule payment record was created (id=%r)" % schedule_payment.id, extra={
-        'schedule_payment_id': schedule_payment.id
-    })
+        except IntegrityError as e:
+            if not ("duplicate" and "idempotence_key" in str(e)):
+                raise e
+            logger.error("Looks like double-charge payment attempt(idempotence_key=%s), exiting" % idempotence_key,
+                         extra={
+                             'schedule_id': schedule_id,
+                             'payment_id': payment_id,
+                             'funding_source_id': funding_source_id,
+                             'payment_amount': payment_amount,
+                             'is_deposit': is_deposit,
+                         })
+            return result
+        except Exception:
+            logger.error("Saving schedule_payment record failed due to: %r" % format_exc(), extra={
+                'schedule_id': schedule_id,
+            })
+            return result
+
+        logger.info("Schedule payment record was created (id=%r)" % schedule_payment.id, extra={
+            'schedule_payment_id': schedule_payment.id
+        })
+        if parent_payment_id:
+            # follow-up payment replaces its parent as the last one in chain, which counters are based on
+            Schedule.objects.get(id=schedule_id).refresh_payment_counters()
 
     try:
 
@@ -190,6 +275,18 @@ def make_payment(user_id: str, payment_account_id: str, schedule_id: str, curren
             execution_date=arrow.get(execution_date).datetime if execution_date else None
         )
 
+    except UpstreamUnavailable:
+        # Request was not sent to PaymentAPI (circuit breaker is open), so the payment is neither failed nor overdue.
+        # It stays PENDING, gets deleted as stale one (see reclaim_stale_pending_schedule_payments) and is submitted
+        # again by next daily payments run.
+        logger.warning("PaymentAPI is unavailable, leaving payment(id=%s) for schedule (id=%s) pending" % (
+            payment_id, schedule_id
+        ), extra={
+            'schedule_payment_id': schedule_payment.id,
+            'schedule_id': schedule_id,
+            'payment_id': payment_id
+        })
+
     except Exception:
         logger.error("Unable to create payment(id=%s) for schedule (id=%s) due to unknown error: %r. " % (
             payment_id, schedule_id, format_exc()
@@ -208,17 +305,217 @@ def make_payment(user_id: str, payment_account_id: str, schedule_id: str, curren
         })
 
         schedule_payment.save(update_fields=['payment_status'])
-        # move overall schedule to 'Overdue' status immediately
-        Schedule.objects.get(id=schedule_id).move_to_status(ScheduleStatus.overdue)
+        schedule = Schedule.objects.get(id=schedule_id)
+        schedule.refresh_payment_counters()
+        # mark overall schedule as overdue immediately
+        schedule.overdue = True
 
     finally:
         return result
 
 
-def process_schedule_transaction_change(transaction_info: Dict):
+@shared_task
+def make_payments_batch(payments: List[List], request_id=None):
+    """
+    Make a series of payments submitted by daily scheduler within single message (see PaymentsBatchDispatcher).
+    Every payment is processed in the same way as separate make_payment task: idempotence keys are the same and
+    failure of one payment doesn't affect the rest of the batch.
+
+    :param payments: list of make_payment() arguments, ordered according to PAYMENTS_BATCH_FIELDS
+    :param request_id: Unique processing request's id.
+    :return:
+    """
+    logging.init_shared_extra(request_id)
+    logger.info("Making batch of payments (count=%s, request_id=%s)" % (len(payments), request_id))
+
+    for values in payments:
+        payment_kwargs = dict(zip(PAYMENTS_BATCH_FIELDS, values))
+        try:
+            make_payment(request_id=request_id, **payment_kwargs)
+        except Exception:
+            logger.error("Unable to make payment from batch (payment=%r) due to: %r" % (
+                payment_kwargs, format_exc()
+            ), extra={
+                'schedule_id': payment_kwargs.get('schedule_id'),
+                'is_deposit': payment_kwargs.get('is_deposit'),
+            })
+
+
+class PaymentsBatchDispatcher:
+    """
+    Accumulates payments found by daily scheduler and submits them to make_payments_batch task by chunks,
+    so that we publish one Celery message per chunk instead of one message per payment.
+    """
+
+    def __init__(self, request_id=None, batch_size=None):
+        self.request_id = request_id
+        self.batch_size = batch_size or PAYMENTS_BATCH_SIZE
+        self.messages_count = 0
+        self.payments_count = 0
+        self.skipped_count = 0
+        self.publishing_duration = 0
+        self._batch = []
+
+    def add(self, user_id: str, payment_account_id: str, schedule_id: str, currency: str, payment_amount: int,
+            additional_information: str, payee_id: str, funding_source_id: str, is_deposit=False,
+            original_scheduled_date=None):
+        # NOTE: only primitive types are allowed here, see make_payment's notes
+        self._batch.append([
+            user_id, payment_account_id, schedule_id, currency, payment_amount, additional_information,
+            payee_id, funding_source_id, is_deposit,
+            str(original_scheduled_date) if original_scheduled_date is not None else None
+        ])
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+
+        batch = self._create_schedule_payments(self._batch)
+        self._batch = []
+        if not batch:
+            return
+
+        timer = Timer()
+        try:
+            self._publish(batch)
+        except Exception:
+            # nobody is going to initiate payments of created records, so drop them to let next run submit them again
+            schedule_payment_ids = [values[PAYMENTS_BATCH_FIELDS.index("schedule_payment_id")] for values in batch]
+            deleted = SchedulePayments.delete_pending(schedule_payment_ids)
+            logger.error("Unable to submit batch of payments (count=%s, request_id=%s), deleted %s pending schedule "
+                         "payments due to: %r" % (len(batch), self.request_id, deleted, format_exc()))
+            raise
+        self.publishing_duration += timer.duration()
+        self.messages_count += 1
+        self.payments_count += len(batch)
+        logger.info("Submitted batch of payments (count=%s, request_id=%s)" % (len(batch), self.request_id))
+
+    def _publish(self, batch: List[List]):
+        make_payments_batch.delay(payments=batch, request_id=self.request_id)
+
+    def _create_schedule_payments(self, batch: List[List]) -> List[List]:
+        """
+        Create PENDING SchedulePayments records for the whole batch at once and keep only payments
+        which records were actually created, i.e. skip payments which have been already initiated.
+
+        :param batch:
+        :return: payments (with schedule_payment_id) that should be submitted to workers
+        """
+        keys = []
+        records = []
+        for values in batch:
+            payment = dict(zip(PAYMENTS_BATCH_FIELDS, values))
+            idempotence_key = get_payment_idempotence_key(
+                user_id=payment["user_id"],
+                payment_account_id=payment["payment_account_id"],
+                schedule_id=payment["schedule_id"],
+                currency=payment["currency"],
+                payment_amount=payment["payment_amount"],
+                payee_id=payment["payee_id"],
+                is_deposit=payment["is_deposit"],
+                original_scheduled_date=payment["original_scheduled_date"]
+            )
+            keys.append(idempotence_key)
+            records.append({
+                "schedule_id": payment["schedule_id"],
+                "payment_id": uuid4(),
+                "funding_source_id": payment["funding_source_id"],
+                "original_amount": payment["payment_amount"],
+                "is_deposit": payment["is_deposit"],
+                "idempotence_key": idempotence_key
+            })
+
+        created = SchedulePayments.bulk_create_pending(records)
+
+        result = []
+        for values, idempotence_key in zip(batch, keys):
+            # pop() guarantees that the same payment occurred twice within batch is submitted only once
+            schedule_payment_id = created.pop(idempotence_key, None)
+            if schedule_payment_id:
+                result.append(values + [str(schedule_payment_id)])
+            else:
+                self.skipped_count += 1
+                logger.info("Skipping payment which was already initiated (schedule_id=%s, idempotence_key=%s)" % (
+                    values[PAYMENTS_BATCH_FIELDS.index("schedule_id")], idempotence_key
+                ))
+        return result
+
+
+class DailyPaymentsShardDispatcher(PaymentsBatchDispatcher):
+    """
+    Dispatcher of process_daily_payments_shard, which updates shard's heartbeat while payments are being found,
+    so that check_daily_payments_shards doesn't re-queue running shard.
+    """
+
+    def __init__(self, run_id: str, shard: int, batch_size=None):
+        super().__init__(request_id=run_id, batch_size=batch_size)
+        self.shard = shard
+        self._heartbeat_at = time.monotonic()
+
+    def add(self, *args, **kwargs):
+        super().add(*args, **kwargs)
+        if time.monotonic() - self._heartbeat_at >= DAILY_PAYMENTS_SHARD_HEARTBEAT_SECONDS:
+            DailyPaymentsShard.heartbeat(self.request_id, self.shard)
+            self._heartbeat_at = time.monotonic()
+
+
+@shared_task
+def reclaim_stale_pending_schedule_payments() -> int:
+    """
+    Delete PENDING SchedulePayments, which were created by PaymentsBatchDispatcher (or make_payment), but whose
+    payments were never initiated, see STALE_PENDING_SCHEDULE_PAYMENT_MINUTES. Run periodically by Celery beat
+    (see frontend_api.apps.PERIODIC_TASKS), so that checks of payments in PaymentAPI don't delay daily payments.
+
+    :return: number of deleted records
+    """
+    logging.init_shared_extra()
+    now = timezone.now()
+    updated_before = now - timedelta(minutes=STALE_PENDING_SCHEDULE_PAYMENT_MINUTES)
+    candidates = SchedulePayments.objects.filter(
+        payment_status=PaymentStatusType.PENDING,
+        updated_at__lt=updated_before,
+        created_at__gte=now - timedelta(hours=STALE_PENDING_SCHEDULE_PAYMENTS_WINDOW_HOURS)
+    ).order_by("updated_at").values_list("id", "schedule_id", "payment_id")[:STALE_PENDING_SCHEDULE_PAYMENTS_LIMIT]
+
+    stale_ids = []
+    existing_ids = []
+    for schedule_payment_id, schedule_id, payment_id in candidates:
+        try:
+            if payment_service.Payment.exists(payment_id):
+                existing_ids.append(schedule_payment_id)
+                continue
+        except Exception:
+            logger.error("Unable to check payment (id=%s) of pending schedule payment (id=%s) due to: %r" % (
+                payment_id, schedule_payment_id, format_exc()
+            ))
+            continue
+        logger.warning("Found stale pending schedule payment (id=%s, schedule_id=%s, payment_id=%s)" % (
+            schedule_payment_id, schedule_id, payment_id
+        ), extra={'schedule_id': schedule_id, 'payment_id': payment_id, 'schedule_payment_id': schedule_payment_id})
+        stale_ids.append(schedule_payment_id)
+
+    # initiated payments are checked again later only, so that they don't take up the limit of next runs
+    SchedulePayments.objects.filter(
+        id__in=existing_ids, payment_status=PaymentStatusType.PENDING, updated_at__lt=updated_before
+    ).update(updated_at=now)
+    if not stale_ids:
+        return 0
+
+    schedule_ids = list(SchedulePayments.objects.filter(id__in=stale_ids).values_list("schedule_id", flat=True))
+    deleted = SchedulePayments.delete_pending(stale_ids, updated_before=updated_before)
+    # deleted follow-up payments make their parents the last ones in chains again
+    Schedule.reconcile_statuses(schedule_ids)
+    logger.info("Deleted %s stale pending schedule payment(s)" % deleted)
+    return deleted
+
+
+def process_schedule_transaction_change(transaction_info: Dict, schedule: Schedule = None):
     """
     Handle Schedule related transaction changes
     :param transaction_info:
+    :param schedule: already fetched Schedule (see process_transaction_changes_batch), queried if not specified
     :return:
     """
     transaction_id = transaction_info.get("transaction_id")
@@ -231,11 +528,12 @@ def process_schedule_transaction_change(transaction_info: Dict):
         logger.info("Omit sending notification about transaction(id=%s), since it's hidden" % transaction_id)
         return
 
-    try:
-        schedule = Schedule.objects.get(id=schedule_id)
-    except Schedule.DoesNotExist:
-        logger.info("Schedule with id %s was not found. %r" % (schedule_id, format_exc()))
-        return
+    if schedule is None:
+        try:
+            schedule = Schedule.objects.get(id=schedule_id)
+        except Schedule.DoesNotExist:
+            logger.info("Schedule with id %s was not found. %r" % (schedule_id, format_exc()))
+            return
 
     logger.info("Processing transaction_id=%s for schedule_id=%s. Transaction status=%s"
                 % (transaction_id, schedule_id, transaction_status.label))
@@ -246,10 +544,14 @@ def process_schedule_transaction_change(transaction_info: Dict):
         notify_about_schedules_failed_payment(schedule=schedule, transaction_info=transaction_info)
 
 
-def process_escrow_transaction_change(transaction_info: Dict):
+def process_escrow_transaction_change(transaction_info: Dict, escrow: Escrow = None,
+                                      is_escrow_wallet_related: bool = None, persist_balance=True):
     """
     Handle Escrow-related transaction changes
     :param transaction_info:
+    :param escrow: already fetched Escrow (see process_transaction_changes_batch), searched for if not specified
+    :param is_escrow_wallet_related: whether transaction belongs to Escrow's wallet, checked if not specified
+    :param persist_balance: whether to save Escrow's balance, otherwise it is assumed to be saved already
     :return:
     """
     user_id = transaction_info.get("user_id")
@@ -275,20 +577,26 @@ def process_escrow_transaction_change(transaction_info: Dict):
         return
 
     # figure out Escrow for processing
-    escrow = find_escrow_by_criteria(payment_info=transaction_info)  # type: Escrow
+    if escrow is None:
+        escrow = find_escrow_by_criteria(payment_info=transaction_info)  # type: Escrow
 
     if escrow is None:
         logger.info("Unable to find matching Escrow, which corresponds to transaction_info=%r" % transaction_info)
         return
 
-    is_escrow_wallet_related = is_escrow_wallet_related_transaction(transaction_info)
+    if is_escrow_wallet_related is None:
+        is_escrow_wallet_related = is_escrow_wallet_related_transaction(transaction_info)
     if is_escrow_wallet_related:
         # There are some risks if we will cast to int during first variable declaration: incoming value could be "null"
         # (for pending/processing transactions) and we will get ValueError
         closing_balance = int(closing_balance)
         # Pending/processing transaction doesn't have value in closing balance field, so we should update Escrow's
         # balance only after verification for transaction's status.
-        escrow.update_balance(closing_balance)
+        if persist_balance:
+            escrow.update_balance(closing_balance)
+        else:
+            # keep balance of this particular transaction for notifications
+            escrow.balance = closing_balance
 
     # Do not notify about hidden transactions
     if is_hidden:
@@ -455,8 +763,25 @@ def get_general_money_movement_additional_context(transaction_info: Dict) -> Dic
 
 
 @shared_task
-@transaction.atomic
 def on_transaction_change(transaction_info: Dict):
+    """
+    Receive events from payments service, events of the same Schedule/Escrow are processed serially
+    within dedicated queue (see get_event_queue).
+    :param transaction_info:
+    :return:
+    """
+    mark_events_received([transaction_info])
+    queue = get_event_queue(transaction_info)
+    if queue is None:
+        return process_transaction_change(transaction_info)
+
+    logger.debug("Routing transaction (id=%s) event to %s queue" % (transaction_info.get("transaction_id"), queue))
+    process_transaction_change.apply_async(args=[transaction_info], queue=queue)
+
+
+@shared_task
+@transaction.atomic
+def process_transaction_change(transaction_info: Dict):
     """
     Process events from payments service.
     :param transaction_info:
@@ -488,19 +813,192 @@ def on_transaction_change(transaction_info: Dict):
         'transaction_status': transaction_status,
     })
 
-    if is_schedule_related_transaction(transaction_info):
+    event_id = PaymentApiEvent.accept(
+        PaymentApiEvent.TRANSACTION, transaction_id, transaction_status.value, transaction_info
+    ) if transaction_id else None
+    if transaction_id and event_id is None:
+        logger.info("Skipping duplicate 'transaction changed' event (transaction_id=%s, status=%s)" % (
+            transaction_id, transaction_status
+        ), extra={'transaction_id': transaction_id, 'transaction_status': transaction_status})
+        return
+
+    # classify event using single query (see EventEntitiesResolver)
+    entities = event_entities_resolver.resolve(transaction_info)
+    if is_schedule_related_transaction(transaction_info, entities):
         process_schedule_transaction_change(transaction_info=transaction_info)
-    elif is_escrow_related_transaction(transaction_info):
-        process_escrow_transaction_change(transaction_info=transaction_info)
+    elif is_escrow_related_transaction(transaction_info, entities):
+        process_escrow_transaction_change(
+            transaction_info=transaction_info,
+            is_escrow_wallet_related=is_escrow_wallet_related_transaction(transaction_info, entities)
+        )
     else:
         process_general_money_movement(transaction_info=transaction_info)
 
+    if event_id:
+        PaymentApiEvent.mark_processed([event_id])
 
-def is_schedule_related_transaction(transaction_info: Dict):
+
+@shared_task
+def on_transaction_changes_batch(transactions_info: List[Dict]):
+    """
+    Receive a batch of events from payments service, batch is split by queues (see get_event_queue).
+    :param transactions_info: list of transaction_info
+    :return:
+    """
+    mark_events_received(transactions_info)
+    for queue, queue_transactions_info in group_events_by_queue(transactions_info).items():
+        if queue is None:
+            process_transaction_changes_batch(queue_transactions_info)
+        else:
+            process_transaction_changes_batch.apply_async(args=[queue_transactions_info], queue=queue)
+
+
+@shared_task
+@transaction.atomic
+def process_transaction_changes_batch(transactions_info: List[Dict]):
+    """
+    Process a batch of events from payments service (see process_transaction_change).
+    Related Schedules and Escrows are fetched and Escrows' balances are updated using bulk queries,
+    afterwards notifications are sent for each transaction.
+    :param transactions_info: list of transaction_info
+    :return:
+    """
+    request_id = RequestIdGenerator.get()
+    logging.init_shared_extra(request_id)
+    logger.info("Received batch of %s 'transaction changed' events, starting processing" % len(transactions_info),
+                extra={'request_id': request_id})
+
+    transactions_info, event_ids = accept_events_batch(PaymentApiEvent.TRANSACTION, "transaction_id", transactions_info)
+
+    schedule_ids = {UUID(t["schedule_id"]) for t in transactions_info if t.get("schedule_id")}
+    schedules = Schedule.objects.in_bulk(list(schedule_ids)) if schedule_ids else {}
+    escrows_by_id, escrows_by_wallet_id = get_related_escrows(transactions_info)
+
+    handlers = []
+    balances = OrderedDict()
+    for transaction_info, event_id in zip(transactions_info, event_ids):
+        transaction_status = TransactionStatusType(transaction_info.get("status"))
+        schedule_id = transaction_info.get("schedule_id")
+        escrow_id = transaction_info.get("escrow_id")
+        wallet_id = transaction_info.get("wallet_id")
+        schedule = schedules.get(UUID(schedule_id)) if schedule_id else None
+        escrow = escrows_by_id.get(UUID(escrow_id)) if escrow_id else None
+
+        if schedule is not None:
+            handlers.append((process_schedule_transaction_change, transaction_info, event_id, {"schedule": schedule}))
+        elif escrow is not None:
+            is_escrow_wallet_related = wallet_id is not None and UUID(wallet_id) in escrows_by_wallet_id
+            # the last transaction within batch determines actual balance (see process_escrow_transaction_change)
+            if is_escrow_wallet_related and transaction_status not in Escrow.PENDING_TRANSACTION_STATUSES:
+                balances.pop(escrow.id, None)
+                balances[escrow.id] = int(transaction_info.get("closing_balance"))
+            handlers.append((process_escrow_transaction_change, transaction_info, event_id, {
+                "escrow": escrow,
+                "is_escrow_wallet_related": is_escrow_wallet_related,
+                "persist_balance": False
+            }))
+        else:
+            handlers.append((process_general_money_movement, transaction_info, event_id, {}))
+
+    Escrow.bulk_update_balance(balances)
+
+    failed_event_ids = []
+    for handler, transaction_info, event_id, kwargs in handlers:
+        try:
+            # failure of single event must not affect the rest of batch
+            with transaction.atomic():
+                handler(transaction_info=transaction_info, **kwargs)
+        except Exception:
+            failed_event_ids.append(event_id)
+            logger.error("Unable to process 'transaction changed' event (transaction_info=%r): %r" % (
+                transaction_info, format_exc()
+            ), extra={'transaction_id': transaction_info.get("transaction_id")})
+
+    complete_events_batch(event_ids, failed_event_ids)
+
+
+def mark_events_received(events_info: List[Dict]):
+    """
+    Stamp events with time they were received from PaymentAPI (unless PaymentAPI did it), so that received_at of their
+    inbox records includes time spent in dedicated queues (see PaymentApiEvent.RECEIVED_AT_FIELD).
+    :param events_info: list of payment_info or transaction_info
+    :return:
+    """
+    received_at = timezone.now().isoformat()
+    for event_info in events_info:
+        event_info.setdefault(PaymentApiEvent.RECEIVED_AT_FIELD, received_at)
+
+
+@shared_task
+def purge_processed_payment_api_events():
+    """
+    Remove inbox records of events processed more than PAYMENT_API_EVENTS_RETENTION_DAYS ago, by chunks of
+    PAYMENT_API_EVENTS_PURGE_CHUNK_SIZE records. Run periodically by Celery beat (see frontend_api.apps.PERIODIC_TASKS).
+    :return: number of removed records
+    """
+    logging.init_shared_extra()
+    processed_before = timezone.now() - timedelta(days=PAYMENT_API_EVENTS_RETENTION_DAYS)
+    purged = 0
+    while True:
+        count = PaymentApiEvent.purge(processed_before, limit=PAYMENT_API_EVENTS_PURGE_CHUNK_SIZE)
+        purged += count
+        if count < PAYMENT_API_EVENTS_PURGE_CHUNK_SIZE:
+            break
+    logger.info("Purged %s processed PaymentAPI event(s) (processed_before=%s)" % (purged, processed_before))
+    return purged
+
+
+def accept_events_batch(event_type: str, id_field: str, events_info: List[Dict]) -> Tuple[List[Dict], List]:
+    """
+    Register batch of events in PaymentApiEvent inbox, skipping already processed ones
+    (as well as duplicates within the batch).
+    :param event_type: PaymentApiEvent.PAYMENT or PaymentApiEvent.TRANSACTION
+    :param id_field: name of field which contains id of payment or transaction
+    :param events_info: list of payment_info or transaction_info
+    :return: (list of events to process, list of their inbox records ids: None for events without id)
+    """
+    accepted = PaymentApiEvent.accept_many(event_type, [
+        (e[id_field], e.get("status"), e) for e in events_info if e.get(id_field)
+    ])
+
+    result = []
+    event_ids = []
+    for event_info in events_info:
+        entity_id = event_info.get(id_field)
+        event_id = accepted.pop((str(UUID(entity_id)), event_info.get("status")), None) if entity_id else None
+        if entity_id and event_id is None:
+            logger.info("Skipping duplicate '%s changed' event (%s=%s, status=%s)" % (
+                event_type, id_field, entity_id, event_info.get("status")
+            ), extra={id_field: entity_id, 'status': event_info.get("status")})
+            continue
+        result.append(event_info)
+        event_ids.append(event_id)
+
+    return result, event_ids
+
+
+def complete_events_batch(event_ids: List, failed_event_ids: List):
+    """
+    Mark successfully processed events of batch, inbox records of failed events are removed,
+    so that their redelivery is not skipped as duplicate (see accept_events_batch).
+    :param event_ids: inbox records ids of the batch
+    :param failed_event_ids: inbox records ids of events whose processing failed
+    :return:
+    """
+    failed_event_ids = {event_id for event_id in failed_event_ids if event_id}
+    if failed_event_ids:
+        PaymentApiEvent.discard(list(failed_event_ids))
+    PaymentApiEvent.mark_processed([
+        event_id for event_id in event_ids if event_id and event_id not in failed_event_ids
+    ])
+
+
+def is_schedule_related_transaction(transaction_info: Dict, entities: EventEntities = None):
     transaction_id = transaction_info.get("transaction_id")
     schedule_id = transaction_info.get("schedule_id")
+    entities = entities or event_entities_resolver.resolve(transaction_info)
 
-    result = schedule_id is not None and Schedule.objects.filter(id=schedule_id).exists()
+    result = entities.schedule_id is not None
     logger.info("is_schedule_related_transaction returned %s for transaction_id=%s" % (result, transaction_id), extra={
         'transaction_id': transaction_id,
         'schedule_id': schedule_id
@@ -508,11 +1006,12 @@ def is_schedule_related_transaction(transaction_info: Dict):
     return result
 
 
-def is_escrow_related_transaction(transaction_info: Dict):
+def is_escrow_related_transaction(transaction_info: Dict, entities: EventEntities = None):
     transaction_id = transaction_info.get("transaction_id")
     escrow_id = transaction_info.get("escrow_id")
+    entities = entities or event_entities_resolver.resolve(transaction_info)
 
-    result = escrow_id is not None and Escrow.objects.filter(id=escrow_id).exists()
+    result = entities.escrow_id is not None
     logger.info("is_escrow_related_transaction returned %s for transaction_id=%s" % (result, transaction_id), extra={
         'transaction_id': transaction_id,
         'escrow_id': escrow_id
@@ -520,11 +1019,12 @@ def is_escrow_related_transaction(transaction_info: Dict):
     return result
 
 
-def is_escrow_wallet_related_transaction(transaction_info: Dict):
+def is_escrow_wallet_related_transaction(transaction_info: Dict, entities: EventEntities = None):
     transaction_id = transaction_info.get("transaction_id")
     wallet_id = transaction_info.get("wallet_id")
+    entities = entities or event_entities_resolver.resolve(transaction_info)
 
-    result = Escrow.objects.filter(wallet_id=wallet_id).exists()
+    result = entities.wallet_escrow_id is not None
     logger.info("is_escrow_wallet_related_transaction returned %s for transaction_id=%s" % (
         result, transaction_id
     ), extra={
@@ -561,33 +1061,20 @@ def find_escrow_by_criteria(payment_info: Dict) -> Escrow or None:
 
     # NOTE: Try to find matching Escrow using different criteria,
     # since we don't always get 'escrow_id' from payment-api
-    escrow = None
-
     # CASE 0: try to find it by 'wallet_id' (looks like it should be present in all escrow-related payments)
-    try:
-        escrow = Escrow.objects.get(wallet_id=wallet_id)
-        logger.info("payment_id=%s is related to Escrow(id=%s, status=%s) by wallet_id" % (
-            payment_id, escrow.id, escrow.status
-        ), extra={
-            'payment_id': payment_id,
-            'escrow_id': escrow.id,
-            'escrow_status': escrow.status,
-        })
-    except ObjectDoesNotExist:
-        logger.info("Unable to find Escrow by wallet_id=%s" % wallet_id)
-
-    # CASE 1: try to find it by 'escrow_id'
-    try:
-        escrow = Escrow.objects.get(id=escrow_id)
-        logger.info("payment_id=%s is related to Escrow(id=%s, status=%s) by escrow_id" % (
-            payment_id, escrow.id, escrow.status
+    # CASE 1: try to find it by 'escrow_id' (has priority over CASE 0)
+    # Both cases are checked within single query (see EventEntitiesResolver.find_escrow)
+    escrow = event_entities_resolver.find_escrow(payment_info)
+    if escrow is not None:
+        logger.info("payment_id=%s is related to Escrow(id=%s, status=%s) by %s" % (
+            payment_id, escrow.id, escrow.status, "escrow_id" if str(escrow.id) == escrow_id else "wallet_id"
         ), extra={
             'payment_id': payment_id,
             'escrow_id': escrow.id,
             'escrow_status': escrow.status,
         })
-    except ObjectDoesNotExist:
-        logger.info("Unable to find Escrow by  escrow_id=%s" % escrow_id)
+    else:
+        logger.info("Unable to find Escrow by wallet_id=%s or escrow_id=%s" % (wallet_id, escrow_id))
 
     # # CASE 2: try to find it by 'payee_id'
     # # In this case 'payee_id' == 'escrow.transit_payee_id', and this means that money goes from Funder -> Escrow
@@ -622,24 +1109,59 @@ def find_escrow_by_criteria(payment_info: Dict) -> Escrow or None:
     return escrow
 
 
-def process_escrow_payment_change(payment_info: Dict):
+def get_related_escrows(events_info: List[Dict]) -> Tuple[Dict, Dict]:
+    """
+    Fetch Escrows referenced by batch of payment/transaction events using single query
+    (bulk counterpart of find_escrow_by_criteria).
+    :param events_info: list of payment_info or transaction_info
+    :return: (mapping of Escrow.id to Escrow, mapping of Escrow.wallet_id to Escrow)
+    """
+    escrow_ids = {UUID(e["escrow_id"]) for e in events_info if e.get("escrow_id")}
+    wallet_ids = {UUID(e["wallet_id"]) for e in events_info if e.get("wallet_id")}
+    if not escrow_ids and not wallet_ids:
+        return {}, {}
+
+    escrows = list(Escrow.objects.filter(Q(id__in=escrow_ids) | Q(wallet_id__in=wallet_ids)))
+    event_entities_resolver.remember(escrows)
+    return {e.id: e for e in escrows}, {e.wallet_id: e for e in escrows if e.wallet_id}
+
+
+def find_related_escrow(event_info: Dict, escrows_by_id: Dict, escrows_by_wallet_id: Dict) -> Escrow or None:
+    """
+    Pick Escrow for event among already fetched ones, using the same criteria as find_escrow_by_criteria
+    :param event_info: payment_info or transaction_info
+    :param escrows_by_id:
+    :param escrows_by_wallet_id:
+    :return:
+    """
+    escrow_id = event_info.get("escrow_id")
+    wallet_id = event_info.get("wallet_id")
+    escrow = escrows_by_id.get(UUID(escrow_id)) if escrow_id else None
+    if escrow is None and wallet_id:
+        escrow = escrows_by_wallet_id.get(UUID(wallet_id))
+    return escrow
+
+
+def process_escrow_payment_change(payment_info: Dict, escrow: Escrow = None, persist_payment_info=True):
     """
     Special code for handling Escrow-related payment events
     :param payment_info:
+    :param escrow: already fetched Escrow (see process_payment_changes_batch), searched for if not specified
+    :param persist_payment_info: whether to save payment info, otherwise it is assumed to be saved already
     :return:
     """
     payment_id = payment_info.get("payment_id")
     payment_status = PaymentStatusType(payment_info.get('status'))
 
-    p_statuses = [PaymentStatusType.PENDING, TransactionStatusType.PROCESSING]
-    if payment_status in p_statuses:
+    if payment_status in ESCROW_SKIPPED_PAYMENT_STATUSES:
         logger.info("Skipping Escrow processing(payment_info=%r), since payment status is in %r" % (
-            payment_info, p_statuses
+            payment_info, ESCROW_SKIPPED_PAYMENT_STATUSES
         ))
         return
 
     # figure out Escrow for processing
-    escrow = find_escrow_by_criteria(payment_info)  # type: Escrow
+    if escrow is None:
+        escrow = find_escrow_by_criteria(payment_info)  # type: Escrow
 
     if escrow is None:
         logger.info("Unable to find matching Escrow, which corresponds to payment_info=%r" % payment_info)
@@ -651,9 +1173,10 @@ def process_escrow_payment_change(payment_info: Dict):
     # 'on_transaction_changed' event
 
     # persist actual payment_info in our local Django model
-    escrow.update_payment_info(
-        status=PaymentStatusType(payment_info.get('status'))
-    )
+    if persist_payment_info:
+        escrow.update_payment_info(
+            status=PaymentStatusType(payment_info.get('status'))
+        )
 
     # actually process Escrow
     try:
@@ -687,9 +1210,7 @@ def process_schedule_payment_change(payment_info: Dict, request_id=None):
     payment_id = payment_info.get("payment_id")
     payment_account_id = payment_info.get("account_id")
     schedule_id = payment_info.get("schedule_id")
-    funding_source_id = payment_info.get("funding_source_id")
     payment_status = PaymentStatusType(payment_info.get('status'))
-    amount = int(payment_info.get("amount"))
 
     if schedule_id is None:
         logger.info("Skipping payment (id=%s), it is not related to any schedule" % payment_id, extra={
@@ -735,9 +1256,8 @@ def process_schedule_payment_change(payment_info: Dict, request_id=None):
     schedule_payment.payment_status = payment_status
     schedule_payment.save(update_fields=['payment_status'])
 
-    # refresh actual count of payments for specific schedule
-    if payment_status is PaymentStatusType.SUCCESS:
-        schedule.refresh_number_of_payments_made()
+    # refresh actual counters of payments for specific schedule, so that they can be just read later on
+    schedule.refresh_payment_counters()
 
     # update Schedule status
     schedule.update_status()
@@ -746,6 +1266,23 @@ def process_schedule_payment_change(payment_info: Dict, request_id=None):
     if not schedule.can_retry_with_backup_funding_source():
         return
 
+    retry_with_backup_funding_source(schedule=schedule, payment_info=payment_info, request_id=request_id)
+
+
+def retry_with_backup_funding_source(schedule: Schedule, payment_info: Dict, request_id=None):
+    """
+    Repeat failed payment of Schedule using its backup funding source
+    :param schedule:
+    :param payment_info: info about failed payment
+    :param request_id:
+    :return:
+    """
+    payment_id = payment_info.get("payment_id")
+    schedule_id = str(schedule.id)
+    funding_source_id = payment_info.get("funding_source_id")
+    payment_status = PaymentStatusType(payment_info.get('status'))
+    amount = int(payment_info.get("amount"))
+
     logger.info("Retrying payment (id=%s, status=%s) using backup funding source(id=%s, was=%s)" % (
         payment_id, payment_status, schedule.backup_funding_source_id, funding_source_id
     ), extra={
@@ -769,8 +1306,25 @@ def process_schedule_payment_change(payment_info: Dict, request_id=None):
 
 
 @shared_task
-@transaction.atomic
 def on_payment_change(payment_info: Dict):
+    """
+    Receive notification about changes in Payment model from Payment-api, events of the same Schedule/Escrow
+    are processed serially within dedicated queue (see get_event_queue).
+    :param payment_info:
+    :return:
+    """
+    mark_events_received([payment_info])
+    queue = get_event_queue(payment_info)
+    if queue is None:
+        return process_payment_change(payment_info)
+
+    logger.debug("Routing payment (id=%s) event to %s queue" % (payment_info.get("payment_id"), queue))
+    process_payment_change.apply_async(args=[payment_info], queue=queue)
+
+
+@shared_task
+@transaction.atomic
+def process_payment_change(payment_info: Dict):
     """
     Process notification about changes in Payment model received from Payment-api.
     :param payment_info:
@@ -797,12 +1351,210 @@ def on_payment_change(payment_info: Dict):
         'payment_status': payment_status,
     })
 
+    event_id = PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, payment_id, payment_status.value, payment_info) \
+        if payment_id else None
+    if payment_id and event_id is None:
+        logger.info("Skipping duplicate 'payment changed' event (payment_id=%s, status=%s)" % (
+            payment_id, payment_status
+        ), extra={'payment_id': payment_id, 'payment_status': payment_status})
+        return
+
     # try to process payment event in the context of Escrow
     process_escrow_payment_change(payment_info=payment_info)
 
     # try to process payment event in the context of Schedule
     process_schedule_payment_change(payment_info=payment_info, request_id=request_id)
 
+    if event_id:
+        PaymentApiEvent.mark_processed([event_id])
+
+
+@shared_task
+def on_payment_changes_batch(payments_info: List[Dict]):
+    """
+    Receive a batch of notifications about changes in Payment model, batch is split by queues (see get_event_queue).
+    :param payments_info: list of payment_info
+    :return:
+    """
+    mark_events_received(payments_info)
+    for queue, queue_payments_info in group_events_by_queue(payments_info).items():
+        if queue is None:
+            process_payment_changes_batch(queue_payments_info)
+        else:
+            process_payment_changes_batch.apply_async(args=[queue_payments_info], queue=queue)
+
+
+@shared_task
+@transaction.atomic
+def process_payment_changes_batch(payments_info: List[Dict]):
+    """
+    Process a batch of notifications about changes in Payment model (see process_payment_change).
+    Related Escrows, Schedules and their payments are fetched & updated using bulk queries, payment counters and status
+    are refreshed once per Schedule, afterwards per-payment Escrow processing and retries are performed.
+    :param payments_info: list of payment_info
+    :return:
+    """
+    request_id = RequestIdGenerator.get()
+    logging.init_shared_extra(request_id)
+    logger.info("Received batch of %s 'payment changed' events, starting processing" % len(payments_info),
+                extra={'request_id': request_id})
+
+    payments_info, event_ids = accept_events_batch(PaymentApiEvent.PAYMENT, "payment_id", payments_info)
+
+    # Escrow-related part (see process_escrow_payment_change)
+    escrows_by_id, escrows_by_wallet_id = get_related_escrows(payments_info)
+    escrow_payments = []
+    escrow_statuses = OrderedDict()
+    for payment_info, event_id in zip(payments_info, event_ids):
+        payment_status = PaymentStatusType(payment_info.get('status'))
+        escrow = find_related_escrow(payment_info, escrows_by_id, escrows_by_wallet_id)
+        if escrow is None or payment_status in ESCROW_SKIPPED_PAYMENT_STATUSES:
+            continue
+        escrow_statuses[escrow.id] = payment_status
+        escrow_payments.append((escrow, payment_info, event_id))
+
+    Escrow.bulk_update_payment_info(escrow_statuses)
+    for escrow_id, payment_status in escrow_statuses.items():
+        escrows_by_id[escrow_id].has_pending_payment = payment_status in Escrow.PENDING_PAYMENT_STATUSES
+
+    failed_event_ids = []
+    for escrow, payment_info, event_id in escrow_payments:
+        try:
+            with transaction.atomic():
+                process_escrow_payment_change(payment_info=payment_info, escrow=escrow, persist_payment_info=False)
+        except Exception:
+            failed_event_ids.append(event_id)
+            logger.error("Unable to process Escrow payment (payment_info=%r): %r" % (payment_info, format_exc()))
+
+    # Schedule-related part (see process_schedule_payment_change)
+    schedule_payments = get_schedule_related_payments(payments_info, event_ids)
+    SchedulePayments.bulk_update_statuses([
+        (schedule.id, payment_info.get("payment_id"), PaymentStatusType(payment_info.get('status')))
+        for schedule, payment_info, _ in schedule_payments
+    ])
+
+    schedules = OrderedDict((schedule.id, schedule) for schedule, _, _ in schedule_payments)
+    failed_schedule_ids = reconcile_batch_schedules(list(schedules.keys()))
+
+    # Retry payments using backup funding source if it is available
+    last_payments = {
+        str(sp.payment_id): sp for sp in SchedulePayments.objects.filter(
+            schedule_id__in=list(schedules.keys()),
+            payment_id__in=[payment_info.get("payment_id") for _, payment_info, _ in schedule_payments],
+            is_last_in_chain=True
+        )
+    }
+    checked_payment_ids = set()
+    for schedule, payment_info, event_id in reversed(schedule_payments):
+        if schedule.id in failed_schedule_ids:
+            failed_event_ids.append(event_id)
+            continue
+        payment_id = str(UUID(payment_info.get("payment_id")))
+        schedule_payment = last_payments.get(payment_id)
+        # status of payment is defined by the last event within batch, payments with follow-ups are not retried
+        if payment_id in checked_payment_ids or schedule_payment is None:
+            continue
+        checked_payment_ids.add(payment_id)
+        try:
+            # failure of single event must not affect the rest of batch
+            with transaction.atomic():
+                if schedule.can_retry_with_backup_funding_source(latest_schedule_payment=schedule_payment):
+                    retry_with_backup_funding_source(
+                        schedule=schedule,
+                        payment_info=dict(payment_info, status=schedule_payment.payment_status.value),
+                        request_id=payment_info.get("request_id", request_id)
+                    )
+        except Exception:
+            failed_event_ids.append(event_id)
+            logger.error("Unable to process Schedule payment (payment_info=%r): %r" % (payment_info, format_exc()),
+                         extra={'schedule_id': schedule.id, 'payment_id': payment_id})
+
+    complete_events_batch(event_ids, failed_event_ids)
+
+
+def reconcile_batch_schedules(schedule_ids: List) -> set:
+    """
+    Refresh actual counters of payments and status of all schedules affected by batch of events with single statement,
+    no matter how many payments were changed. If it fails, schedules are reconciled one by one, so that failure of
+    single schedule doesn't affect the rest of batch.
+    :param schedule_ids:
+    :return: ids of schedules which failed to be reconciled
+    """
+    if not schedule_ids:
+        return set()
+    try:
+        with transaction.atomic():
+            Schedule.reconcile_statuses(schedule_ids)
+        return set()
+    except Exception:
+        logger.error("Unable to reconcile schedules of batch (count=%s), reconciling one by one: %r" % (
+            len(schedule_ids), format_exc()
+        ))
+
+    failed_schedule_ids = set()
+    for schedule_id in schedule_ids:
+        try:
+            with transaction.atomic():
+                Schedule.reconcile_statuses([schedule_id])
+        except Exception:
+            failed_schedule_ids.add(schedule_id)
+            logger.error("Unable to reconcile schedule (id=%s): %r" % (schedule_id, format_exc()),
+                         extra={'schedule_id': schedule_id})
+    return failed_schedule_ids
+
+
+def get_schedule_related_payments(payments_info: List[Dict], event_ids: List) -> List[Tuple[Schedule, Dict, int]]:
+    """
+    Fetch Schedules referenced by batch of payment events using single query and filter out events which should not be
+    processed in the context of Schedules (see process_schedule_payment_change)
+    :param payments_info: list of payment_info
+    :param event_ids: ids of inbox records of events, aligned with payments_info (see accept_events_batch)
+    :return: list of (schedule, payment_info, event_id)
+    """
+    schedule_ids = {UUID(p["schedule_id"]) for p in payments_info if p.get("schedule_id")}
+    if not schedule_ids:
+        return []
+
+    schedules = {s.id: s for s in Schedule.objects.filter(id__in=schedule_ids).annotate(
+        annotated_origin_payment_account_id=Schedule.origin_payment_account_id_expression()
+    )}
+    existing_user_ids = set(User.objects.filter(
+        id__in={s.origin_user_id for s in schedules.values()}
+    ).values_list("id", flat=True))
+
+    result = []
+    for payment_info, event_id in zip(payments_info, event_ids):
+        payment_id = payment_info.get("payment_id")
+        payment_account_id = payment_info.get("account_id")
+        schedule_id = payment_info.get("schedule_id")
+        if schedule_id is None:
+            continue
+
+        schedule = schedules.get(UUID(schedule_id))
+        if schedule is None:
+            logger.error("Given schedule (id=%s) not found, skipping payment (id=%s)" % (schedule_id, payment_id),
+                         extra={'schedule_id': schedule_id, 'payment_id': payment_id})
+            continue
+
+        if str(schedule.origin_payment_account_id) != payment_account_id:
+            logger.info("Skipping payment (id=%s), not related to schedule\'s payer(origin_payment_account_id=%s)" % (
+                payment_id, schedule.origin_payment_account_id
+            ), extra={
+                'payment_id': payment_id,
+                'schedule_id': schedule_id,
+                'payment_account_id': payment_account_id
+            })
+            continue
+
+        if schedule.origin_user_id not in existing_user_ids:
+            logger.error("Given user (id=%s) no longer exists, skipping payment (id=%s)" % (
+                schedule.origin_user_id, payment_id
+            ), extra={'payment_id': payment_id, 'schedule_id': schedule_id})
+            continue
+
+        result.append((schedule, payment_info, event_id))
+    return result
+
 
 # Must NOT be executed in transaction. This requirement comes from "make_payment" requirements.
 @shared_task
@@ -840,7 +1592,7 @@ def make_overdue_payment(schedule_id: str, request_id=None):
     # Select all SchedulePayment which are last in chains and are not in SUCCESS status
     overdue_payments = LastSchedulePayments.objects.filter(
         schedule_id=schedule_id,
-        payment_status__in=[PaymentStatusType.FAILED, PaymentStatusType.REFUND, PaymentStatusType.CANCELED]
+        payment_status__in=Schedule.OVERDUE_PAYMENT_STATUSES
     ).order_by("created_at")  # type: list[LastSchedulePayments]
 
     logger.info("Total overdue payments (schedule_id=%s): %s" % (schedule_id, len(overdue_payments)), extra={
@@ -889,149 +1641,100 @@ def make_overdue_payment(schedule_id: str, request_id=None):
     schedule.processing = False
 
 
-def process_all_deposit_payments(scheduled_date, is_execution_date_limited=True):
+def process_all_payments_for_dates(dates: List[Tuple[datetime, bool]], dispatcher: PaymentsBatchDispatcher = None,
+                                   shard: Tuple[int, int] = None):
     """
-    Process all deposit payments for specified date
-    :param scheduled_date:
-    :param is_execution_date_limited: bool
+    Process all deposit & periodic (one time, weekly, monthly, quarterly, yearly) payments for specified dates
+    within single pass (see Schedule.get_processable_occurrences).
+
+    :param dates: list of (scheduled_date, is_execution_date_limited) pairs
+    :param dispatcher: submits found payments by batches, new one is used (and flushed) if not specified
+    :param shard: (shard, shards_count) pair to process only part of schedules, all schedules are processed if not set
     :return:
     """
-    request_id = RequestIdGenerator.get()
-    logging.init_shared_extra(request_id)
-    logger.info(f"Process all deposit payments for date: {scheduled_date}", extra={
-        # TODO: how are datetime types handled in logging.extra ??
-        'scheduled_date': scheduled_date,
-        'is_execution_date_limited': is_execution_date_limited
+    own_dispatcher = dispatcher is None
+    dispatcher = dispatcher or PaymentsBatchDispatcher(request_id=RequestIdGenerator.get())
+    logging.init_shared_extra(dispatcher.request_id)
+    logger.info("Process all payments for dates: %s" % dates, extra={
+        'dates': [(str(scheduled_date), is_limited) for scheduled_date, is_limited in dates]
     })
 
-    # make sure we always keep consistent order, otherwise we'll get unpredictable results
-    payments = DepositsSchedule.objects.filter(
-        Q(scheduled_date=scheduled_date) &
-        Q(status__in=Schedule.PROCESSABLE_SCHEDULE_STATUSES) &
-        Schedule.is_execution_date_limited_filters(is_execution_date_limited)
-    ).order_by("created_at")
-
-    paginator = Paginator(payments, settings.CELERY_BEAT_PER_PAGE_OBJECTS)
-    for p in paginator.page_range:
-        for s in paginator.page(p):
-            s = s  # type: DepositsSchedule
-            logger.info("Submit deposit payment (schedule_id=%s, origin_user_id=%s, "
-                        "origin_payment_account_id=%s, deposit_payment_amount=%s, period=%s)" % (
-                            s.id, s.origin_user_id, s.origin_payment_account_id, s.deposit_amount, s.period
-                        ),
-                        extra={
-                            'schedule_id': s.id,
-                            'funding_source_id': s.funding_source_id,
-                            'amount': s.deposit_amount,
-                            'period': s.period
-                        })
-
-            # submit task for asynchronous processing to queue
-            make_payment.delay(
+    occurrences = Schedule.get_processable_occurrences(
+        [(arrow.get(scheduled_date).date(), is_limited) for scheduled_date, is_limited in dates]
+    )
+    if shard:
+        occurrences = Schedule.filter_by_shard(occurrences, *shard, column="schedule_id")
+
+    # NOTE: keyset_iterator keeps consistent order, otherwise we'll get unpredictable results
+    for o in keyset_iterator(occurrences, ordering=("scheduled_date", "id")):  # type: ScheduleOccurrence
+        s = o.schedule  # type: Schedule
+        payment_amount = s.deposit_amount if o.is_deposit else s.payment_amount
+        logger.debug("Submit %s payment (schedule_id=%s, origin_user_id=%s, payment_account_id=%s, "
+                     "payment_amount=%s, period=%s, scheduled_date=%s)" % (
+                         "deposit" if o.is_deposit else "regular", s.id, s.origin_user_id, o.payment_account_id,
+                         payment_amount, s.period, o.scheduled_date
+                     ),
+                     extra={
+                         'schedule_id': s.id,
+                         'funding_source_id': s.funding_source_id,
+                         'amount': payment_amount,
+                         'period': s.period,
+                         'is_deposit': o.is_deposit
+                     })
+
+        # submit payment for asynchronous processing to queue (as a part of batch)
+        if o.is_deposit:
+            dispatcher.add(
                 user_id=str(s.origin_user_id),
-                payment_account_id=str(s.origin_payment_account_id),
+                payment_account_id=str(o.payment_account_id),
                 schedule_id=str(s.id),
                 currency=str(s.currency.value),
                 payment_amount=int(s.deposit_amount),
                 additional_information=str(s.deposit_additional_information),
                 payee_id=str(s.payee_id),
                 funding_source_id=str(s.funding_source_id),
-                request_id=request_id,
                 is_deposit=True
             )
-
-    logger.info(f"Finished deposit payments ({scheduled_date}) processing.", extra={'logGlobalDuration': True})
-
-
-def process_all_periodic_payments(scheduled_date: datetime, period: SchedulePeriod, is_execution_date_limited=True):
-    """
-    Process all Periodic (weekly, monthly, quarterly, yearly) payments for specified date
-    :param scheduled_date:
-    :type scheduled_date: datetime
-    :param period:
-    :type period: SchedulePeriod
-    :param is_execution_date_limited: whether or not process payments with special restrictions to exection_date
-    :return:
-
-    """
-    request_id = RequestIdGenerator.get()
-    logging.init_shared_extra(request_id)
-    logger.info(f"Process all periodic({period}) payments for date: {scheduled_date}", extra={
-        'scheduled_date': scheduled_date,
-        'period': str(period),
-        'is_execution_date_limited': is_execution_date_limited
-    })
-
-    cls = Schedule.get_periodic_class(period)  # type: PeriodicSchedule
-    # make sure we always keep consistent order, otherwise we'll get unpredictable results
-    payments = cls.objects.filter(
-        Q(scheduled_date=scheduled_date) &
-        Q(status__in=Schedule.PROCESSABLE_SCHEDULE_STATUSES) &
-        Schedule.is_execution_date_limited_filters(is_execution_date_limited)
-    ).order_by("created_at")
-
-    paginator = Paginator(payments, settings.CELERY_BEAT_PER_PAGE_OBJECTS)
-    for p in paginator.page_range:
-        for s in paginator.page(p):  # type: PeriodicSchedule
-            logger.debug("Submit regular payment (schedule_id=%s, origin_user_id=%s, payment_account_id=%s, "
-                         "origin_payment_amount=%s, deposit_payment_amount=%s, period=%s)" % (
-                             s.id, s.origin_user_id, s.origin_payment_account_id, s.payment_amount, s.deposit_amount,
-                             s.period
-                         ),
-                         extra={
-                             'schedule_id': s.id,
-                             'funding_source_id': s.funding_source_id,
-                             'amount': s.payment_amount,
-                             'period': s.period
-                         })
-
-            # submit task for asynchronous processing to queue
-            make_payment.delay(
+        else:
+            dispatcher.add(
                 user_id=str(s.origin_user_id),
-                payment_account_id=str(s.origin_payment_account_id),
+                payment_account_id=str(o.payment_account_id),
                 schedule_id=str(s.id),
                 currency=str(s.currency.value),
                 payment_amount=int(s.payment_amount),
                 additional_information=str(s.additional_information),
                 payee_id=str(s.payee_id),
                 funding_source_id=str(s.funding_source_id),
-                original_scheduled_date=s.original_scheduled_date,
-                request_id=request_id
+                original_scheduled_date=o.original_scheduled_date
             )
 
-    logger.info(f"Finished periodic({period}) payments ({scheduled_date}) processing.", extra={
-        'logGlobalDuration': True
-    })
+    if own_dispatcher:
+        dispatcher.flush()
 
+    logger.info("Finished payments processing for dates: %s" % dates, extra={'logGlobalDuration': True})
 
-def process_all_payments_for_date(date: datetime, is_execution_date_limited: bool):
+
+def process_all_payments_for_date(date: datetime, is_execution_date_limited: bool,
+                                  dispatcher: PaymentsBatchDispatcher = None, shard: Tuple[int, int] = None):
     """
     Process all payments for specific date taking into account inforamtion about execution time.
 
     :param date:
     :param is_execution_date_limited:
+    :param dispatcher: submits found payments by batches, new one is used (and flushed) if not specified
+    :param shard: (shard, shards_count) pair to process only part of schedules, all schedules are processed if not set
     :rtype date: datetime.datetime
     :return:
     """
-    logger.info("Process all payments for date=%s, is_execution_date_limited=%s" % (
-        date, is_execution_date_limited
-    ))
-    # process deposit payments first
-    process_all_deposit_payments(date, is_execution_date_limited)
-
-    # process periodic payments
-    for period in SchedulePeriod:
-        process_all_periodic_payments(
-            scheduled_date=date,
-            period=period,
-            is_execution_date_limited=is_execution_date_limited
-        )
+    process_all_payments_for_dates([(date, is_execution_date_limited)], dispatcher=dispatcher, shard=shard)
 
 
 @shared_task
 def initiate_daily_payments():
     """
     Initial entry point task which iterates through all Schedules and initiates payment tasks if dates match.
+    Schedules are split into PAYMENTS_PROCESSING_SHARDS shards, each of them is processed by separate
+    process_daily_payments_shard task, so that processing is distributed across all available workers.
 
     :return:
     """
@@ -1041,20 +1744,50 @@ def initiate_daily_payments():
     now = arrow.utcnow()
 
     logger.info(f"Starting daily ({now}) payments processing...", extra={
-        'BLACKLISTED_DAYS_MAX_RETRY_COUNT': BLACKLISTED_DAYS_MAX_RETRY_COUNT
+        'BLACKLISTED_DAYS_MAX_RETRY_COUNT': BLACKLISTED_DAYS_MAX_RETRY_COUNT,
+        'PAYMENTS_BATCH_SIZE': PAYMENTS_BATCH_SIZE,
+        'PAYMENTS_PROCESSING_SHARDS': PAYMENTS_PROCESSING_SHARDS
     })
 
+    dates = get_daily_payments_dates(now)
+    run_id = RequestIdGenerator.get()
+    DailyPaymentsShard.objects.bulk_create([
+        DailyPaymentsShard(run_id=run_id, shard=shard, shards_count=PAYMENTS_PROCESSING_SHARDS)
+        for shard in range(PAYMENTS_PROCESSING_SHARDS)
+    ])
+
+    for shard in range(PAYMENTS_PROCESSING_SHARDS):
+        process_daily_payments_shard.delay(
+            run_id=run_id,
+            shard=shard,
+            shards_count=PAYMENTS_PROCESSING_SHARDS,
+            dates=[[str(date), is_execution_date_limited] for date, is_execution_date_limited in dates]
+        )
+
+    logger.info(f"Submitted daily ({now}) payments processing (run_id={run_id}, shards={PAYMENTS_PROCESSING_SHARDS})",
+                extra={'logGlobalDuration': True})
+
+
+def get_daily_payments_dates(now: arrow.Arrow) -> List[Tuple[datetime, bool]]:
+    """
+    Get dates (with execution date limitation flag) which payments should be processed today.
+    Along with today's payments we process payments of following blacklisted days (weekends, holidays), because
+    scheduler will not process payments with execution date limitation during these days.
+
+    :param now: current date
+    :return: list of (date, is_execution_date_limited) pairs
+    """
     retry_count = 1
     scheduled_date = now
 
     # We can safely start processing for payments that don't have any execution date limitation (in general, this is
     # about interaction with the bank): operations will be executed inside payment service and weekends & holidays
     # restrictions have no effect
-    process_all_payments_for_date(scheduled_date.datetime, is_execution_date_limited=False)
+    dates = [(scheduled_date.datetime, False)]
 
     if BlacklistDate.contains(scheduled_date.datetime.date()):
         logger.info("Skipping scheduler execution because '%s' is a special day" % now)
-        return
+        return dates
 
     while True:
         if retry_count > BLACKLISTED_DAYS_MAX_RETRY_COUNT:
@@ -1064,12 +1797,11 @@ def initiate_daily_payments():
 
         # We already process payments that do not have any execution date limitation, now we will concentrate on
         # payments for which blacklisted dates are important. During first iteration we will process schedules for today
-        process_all_payments_for_date(scheduled_date.datetime, is_execution_date_limited=True)
+        dates.append((scheduled_date.datetime, True))
 
         # Taking next day as scheduled date that should be verified and processed if necessary
         scheduled_date = scheduled_date.shift(days=1)
-        logger.info(f"Finished with processing all payments, check if next date ({scheduled_date}) "
-                    f"is blacklisted (retry_count={retry_count})")
+        logger.info(f"Check if next date ({scheduled_date}) is blacklisted (retry_count={retry_count})")
         # Check if specified date is not blacklisted, i.e. NOT weekend and/or special day
         if not BlacklistDate.contains(scheduled_date.date()):
             # No need to continue because scheduler will be executed on "scheduled_date"
@@ -1078,7 +1810,193 @@ def initiate_daily_payments():
 
         retry_count += 1
 
-    logger.info(f"Finished daily ({now}) payments processing.", extra={'logGlobalDuration': True})
+    return dates
+
+
+@shared_task
+def process_daily_payments_shard(run_id: str, shard: int, shards_count: int, dates: List[List]):
+    """
+    Process payments of single shard for all dates collected by initiate_daily_payments.
+
+    :param run_id: identifier of daily payments processing run, shared by all shards
+    :param shard: number of shard, starting from 0
+    :param shards_count: total number of shards
+    :param dates: list of [date, is_execution_date_limited] pairs
+    :return:
+    """
+    logging.init_shared_extra(run_id)
+    logger.info(f"Starting daily payments processing for shard {shard}/{shards_count} (run_id={run_id})")
+    now = timezone.now()
+    DailyPaymentsShard.objects.filter(run_id=run_id, shard=shard).update(started_at=now, updated_at=now)
+
+    dispatcher = DailyPaymentsShardDispatcher(run_id, shard)
+    is_failed = False
+    try:
+        process_all_payments_for_dates(
+            [(arrow.get(date).datetime, is_execution_date_limited) for date, is_execution_date_limited in dates],
+            dispatcher=dispatcher,
+            shard=(shard, shards_count)
+        )
+        dispatcher.flush()
+    except Exception:
+        is_failed = True
+        logger.error("Daily payments processing for shard %s/%s (run_id=%s) failed due to: %r" % (
+            shard, shards_count, run_id, format_exc()
+        ))
+    finally:
+        complete_daily_payments_shard(run_id, shard, dispatcher, is_failed)
+
+
+@shared_task
+def check_daily_payments_shards():
+    """
+    Find unfinished shards of daily payments processing without heartbeat within STALE_DAILY_PAYMENTS_SHARD_MINUTES
+    and re-queue them (already initiated payments are skipped thanks to idempotence keys). Shards of runs older than
+    DAILY_PAYMENTS_SHARD_REQUEUE_HOURS are marked as failed instead. Run periodically by Celery beat
+    (see frontend_api.apps.PERIODIC_TASKS).
+
+    :return:
+    """
+    logging.init_shared_extra()
+    now = timezone.now()
+    stale_before = now - timedelta(minutes=STALE_DAILY_PAYMENTS_SHARD_MINUTES)
+    requeue_after = now - timedelta(hours=DAILY_PAYMENTS_SHARD_REQUEUE_HOURS)
+
+    expired_run_ids = DailyPaymentsShard.objects.filter(
+        updated_at__lt=stale_before,
+        created_at__lt=requeue_after,
+        finished_at__isnull=True
+    ).values_list("run_id", flat=True).distinct()
+    for run_id in list(expired_run_ids):
+        give_up_daily_payments_shards(run_id, stale_before)
+
+    requeue_daily_payments_shards(stale_before, requeue_after)
+
+
+@transaction.atomic
+def give_up_daily_payments_shards(run_id: str, stale_before: datetime):
+    """
+    Mark stale shards of the run as failed and report results of the run, if it is finished now.
+
+    :param run_id:
+    :param stale_before: shards without heartbeat since this time are considered stale
+    :return:
+    """
+    # Lock all shards of the run in the same order as complete_daily_payments_shard does
+    shards = list(DailyPaymentsShard.objects.select_for_update().filter(run_id=run_id).order_by("shard"))
+    now = timezone.now()
+    for s in shards:
+        if s.is_finished or s.updated_at >= stale_before:
+            continue
+        logger.error("Daily payments processing for shard %s/%s (run_id=%s) was not finished, giving up" % (
+            s.shard, s.shards_count, s.run_id
+        ), extra={'run_id': s.run_id, 'shard': s.shard})
+        s.finished_at = now
+        s.is_failed = True
+        s.save(update_fields=["finished_at", "is_failed", "updated_at"])
+
+    if all(s.is_finished for s in shards):
+        report_daily_payments_run(run_id, shards)
+
+
+@transaction.atomic
+def requeue_daily_payments_shards(stale_before: datetime, requeue_after: datetime):
+    """
+    Re-queue stale shards of runs, which were started after requeue_after.
+
+    :param stale_before: shards without heartbeat since this time are considered stale
+    :param requeue_after:
+    :return:
+    """
+    # skip shards which are being completed right now (see complete_daily_payments_shard)
+    stale_shards = DailyPaymentsShard.objects.select_for_update(skip_locked=True).filter(
+        updated_at__lt=stale_before,
+        created_at__gte=requeue_after,
+        finished_at__isnull=True
+    ).order_by("created_at", "shard")
+
+    for s in stale_shards:
+        logger.error("Daily payments processing for shard %s/%s (run_id=%s) has no heartbeat within %s minutes, "
+                     "re-queueing" % (s.shard, s.shards_count, s.run_id, STALE_DAILY_PAYMENTS_SHARD_MINUTES),
+                     extra={'run_id': s.run_id, 'shard': s.shard})
+        # shard is considered stale again only if re-queued task doesn't update heartbeat in time as well
+        s.started_at = timezone.now()
+        s.save(update_fields=["started_at", "updated_at"])
+        dates = get_daily_payments_dates(arrow.get(s.created_at))
+        transaction.on_commit(lambda shard=s, dates=dates: process_daily_payments_shard.delay(
+            run_id=shard.run_id,
+            shard=shard.shard,
+            shards_count=shard.shards_count,
+            dates=[[str(date), is_execution_date_limited] for date, is_execution_date_limited in dates]
+        ))
+
+
+@transaction.atomic
+def complete_daily_payments_shard(run_id: str, shard: int, dispatcher: PaymentsBatchDispatcher, is_failed: bool):
+    """
+    Save results of shard processing and report overall results once the last shard of the run is finished.
+
+    :param run_id:
+    :param shard:
+    :param dispatcher:
+    :param is_failed:
+    :return:
+    """
+    # Lock all shards of the run, so that exactly one (the last) shard sees the whole run as finished
+    shards = list(DailyPaymentsShard.objects.select_for_update().filter(run_id=run_id).order_by("shard"))
+    for s in shards:
+        if s.shard == shard:
+            s.finished_at = timezone.now()
+            s.is_failed = is_failed
+            s.messages_count = dispatcher.messages_count
+            s.payments_count = dispatcher.payments_count
+            s.skipped_count = dispatcher.skipped_count
+            s.save(update_fields=[
+                "finished_at", "is_failed", "messages_count", "payments_count", "skipped_count", "updated_at"
+            ])
+
+    logger.info("Finished daily payments processing for shard %s/%s (run_id=%s): messages=%s, payments=%s, "
+                "skipped=%s, publishing took %s" % (
+                    shard, len(shards), run_id, dispatcher.messages_count, dispatcher.payments_count,
+                    dispatcher.skipped_count, dispatcher.publishing_duration
+                ))
+
+    if all(s.is_finished for s in shards):
+        report_daily_payments_run(run_id, shards)
+
+
+def report_daily_payments_run(run_id: str, shards: List[DailyPaymentsShard]):
+    """
+    Log overall results of finished daily payments processing run.
+
+    :param run_id:
+    :param shards: all shards of the run
+    :return:
+    """
+    failed_shards = [s.shard for s in shards if s.is_failed]
+    started_at = min(s.created_at for s in shards)
+    logger.info("Finished daily payments processing (run_id=%s): shards=%s, failed_shards=%s, messages=%s, "
+                "payments=%s, skipped=%s, took %s" % (
+                    run_id, len(shards), len(failed_shards),
+                    sum(s.messages_count for s in shards), sum(s.payments_count for s in shards),
+                    sum(s.skipped_count for s in shards), timezone.now() - started_at
+                ), extra={
+                    'run_id': run_id,
+                    'failed_shards': failed_shards,
+                    'messages_count': sum(s.messages_count for s in shards),
+                    'payments_count': sum(s.payments_count for s in shards),
+                    'skipped_count': sum(s.skipped_count for s in shards)
+                })
+
+    utcnow = arrow.utcnow()
+    ps_hour, ps_minute = settings.PAYMENT_SYSTEM_CLOSING_TIME.split(':')
+    if utcnow > utcnow.replace(hour=int(ps_hour), minute=int(ps_minute)):
+        logger.warning("Daily payments processing (run_id=%s) finished after payment system closing time (%s)" % (
+            run_id, settings.PAYMENT_SYSTEM_CLOSING_TIME
+        ))
+    if failed_shards:
+        logger.error("Daily payments processing (run_id=%s) finished with failed shards: %s" % (run_id, failed_shards),
+                     extra={'run_id': run_id, 'failed_shards': failed_shards})
 
 
 @shared_task
@@ -1089,4 +2007,6 @@ def on_payee_change(payee_info: Dict):
     :return:
     """
     logger.info("Received on_payee_change event, info=%r" % payee_info)
+    if payee_info.get("payee_id"):
+        payment_api_cache.invalidate("payees", payee_info["payee_id"])
     # TODO: update all payee info that is stored in Django models
@@ -0,0 +1,185 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from frontend_api.models.schedule import Schedule
+from frontend_api.models.escrow import Escrow
+
+logger = logging.getLogger(__name__)
+
+# Max number of wallet_id -> escrow_id pairs kept in memory by every worker process
+ESCROW_WALLETS_CACHE_SIZE = getattr(settings, "ESCROW_WALLETS_CACHE_SIZE", 10000)
+
+
+@dataclass(frozen=True)
+class EventEntities:
+    schedule_id: UUID = None  # set if event refers to existing Schedule
+    escrow_id: UUID = None  # set if event refers to existing Escrow by 'escrow_id'
+    wallet_escrow_id: UUID = None  # set if event's 'wallet_id' belongs to existing Escrow
+
+
+class EventEntitiesResolver:
+    """
+    Figures out which Schedule/Escrow payment-api event (payment_info or transaction_info) is related to.
+    Every event is classified using single query, instead of separate lookups per each reference.
+    Escrow's wallet never changes, so wallet_id -> escrow_id pairs are kept in local-memory LRU.
+    """
+
+    def __init__(self, wallets_cache_size=ESCROW_WALLETS_CACHE_SIZE):
+        self.wallets_cache_size = wallets_cache_size
+        self._lock = threading.Lock()
+        self._wallets = OrderedDict()
+        self._metrics = self._empty_metrics()
+
+    def resolve(self, event_info: Dict) -> EventEntities:
+        """
+        :param event_info: payment_info or transaction_info
+        :return:
+        """
+        schedule_id = self._get_uuid(event_info, "schedule_id")
+        escrow_id = self._get_uuid(event_info, "escrow_id")
+        wallet_id = self._get_uuid(event_info, "wallet_id")
+        wallet_escrow_id = self._get_wallet_escrow_id(wallet_id)
+
+        lookups = [schedule_id, escrow_id, wallet_id if wallet_escrow_id is None else None]
+        row = (False, None, None)
+        if any(lookups):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM {schedule} WHERE id = %s), "
+                    "(SELECT id FROM {escrow} WHERE id = %s), "
+                    "(SELECT id FROM {escrow} WHERE wallet_id = %s LIMIT 1)".format(
+                        schedule=Schedule._meta.db_table, escrow=Escrow._meta.db_table
+                    ),
+                    lookups
+                )
+                row = cursor.fetchone()
+        self._count_event(lookups=len([v for v in (schedule_id, escrow_id, wallet_id) if v]),
+                          queries=int(any(lookups)))
+
+        if row[2] is not None:
+            wallet_escrow_id = row[2]
+            self._remember_wallet(wallet_id, wallet_escrow_id)
+
+        result = EventEntities(
+            schedule_id=schedule_id if row[0] else None,
+            escrow_id=row[1],
+            wallet_escrow_id=wallet_escrow_id
+        )
+        logger.debug("Resolved entities of event (%r): %r" % (event_info, result))
+        return result
+
+    def find_escrow(self, event_info: Dict) -> Escrow or None:
+        """
+        Fetch Escrow referenced by event using single query: Escrow found by 'escrow_id' has priority
+        over the one found by 'wallet_id'.
+        :param event_info: payment_info or transaction_info
+        :return:
+        """
+        escrow_id = self._get_uuid(event_info, "escrow_id")
+        wallet_id = self._get_uuid(event_info, "wallet_id")
+        wallet_escrow_id = self._get_wallet_escrow_id(wallet_id)
+        references = [v for v in (escrow_id, wallet_id) if v]
+        self._count_event(lookups=len(references), queries=int(bool(references)))
+        if not references:
+            return None
+
+        criteria = Q(id__in=[v for v in (escrow_id, wallet_escrow_id) if v])
+        if wallet_escrow_id is None and wallet_id is not None:
+            criteria |= Q(wallet_id=wallet_id)
+        escrows = list(Escrow.objects.filter(criteria))
+        self.remember(escrows)
+
+        by_id = {e.id: e for e in escrows}
+        return by_id.get(escrow_id) or next((e for e in escrows if e.wallet_id == wallet_id), None)
+
+    def resolve_wallets(self, wallet_ids: Iterable[UUID]) -> Dict:
+        """
+        Find Escrows of wallets, wallets which are not in LRU are looked up using single query.
+        :param wallet_ids:
+        :return: mapping of wallet_id to escrow_id, only for wallets which belong to Escrows
+        """
+        result = {}
+        missing = set()
+        for wallet_id in wallet_ids:
+            escrow_id = self._get_wallet_escrow_id(wallet_id)
+            if escrow_id is None:
+                missing.add(wallet_id)
+            else:
+                result[wallet_id] = escrow_id
+
+        if missing:
+            escrows = Escrow.objects.filter(wallet_id__in=list(missing)).values_list("id", "wallet_id")
+            for escrow_id, wallet_id in escrows:
+                self._remember_wallet(wallet_id, escrow_id)
+                result[wallet_id] = escrow_id
+        return result
+
+    def remember(self, escrows: Iterable[Escrow]):
+        """
+        Keep wallets of already fetched Escrows
+        :param escrows:
+        """
+        for escrow in escrows:
+            if escrow.wallet_id:
+                self._remember_wallet(escrow.wallet_id, escrow.id)
+
+    def clear(self):
+        with self._lock:
+            self._wallets.clear()
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["queries_saved"] = metrics["lookups"] - metrics["queries"]
+        metrics["queries_saved_per_event"] = metrics["queries_saved"] / metrics["events"] if metrics["events"] else 0
+        return metrics
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = self._empty_metrics()
+
+    @staticmethod
+    def _empty_metrics() -> Dict:
+        # 'lookups' is the number of queries which would be made by looking up each reference separately
+        return {"events": 0, "lookups": 0, "queries": 0, "wallet_cache_hits": 0, "wallet_cache_misses": 0}
+
+    @staticmethod
+    def _get_uuid(event_info: Dict, field: str) -> UUID or None:
+        value = event_info.get(field)
+        return UUID(str(value)) if value else None
+
+    def _get_wallet_escrow_id(self, wallet_id: UUID) -> UUID or None:
+        if wallet_id is None:
+            return None
+        with self._lock:
+            escrow_id = self._wallets.get(wallet_id)
+            if escrow_id is None:
+                self._metrics["wallet_cache_misses"] += 1
+                return None
+            self._wallets.move_to_end(wallet_id)
+            self._metrics["wallet_cache_hits"] += 1
+            return escrow_id
+
+    def _remember_wallet(self, wallet_id: UUID, escrow_id: UUID):
+        with self._lock:
+            self._wallets[wallet_id] = escrow_id
+            self._wallets.move_to_end(wallet_id)
+            while len(self._wallets) > self.wallets_cache_size:
+                self._wallets.popitem(last=False)
+
+    def _count_event(self, lookups: int, queries: int):
+        with self._lock:
+            self._metrics["events"] += 1
+            self._metrics["lookups"] += lookups
+            self._metrics["queries"] += queries
+
+
+event_entities_resolver = EventEntitiesResolver()
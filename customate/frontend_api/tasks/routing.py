@@ -0,0 +1,103 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, List
+from uuid import UUID
+
+from django.conf import settings
+
+from frontend_api.tasks.resolvers import event_entities_resolver
+
+logger = logging.getLogger(__name__)
+
+# Payment-api events of the same Schedule/Escrow are always routed to the same queue out of PAYMENT_EVENTS_QUEUES_COUNT
+# (named "<PAYMENT_EVENTS_QUEUE_PREFIX>.<number>"), every such queue must be consumed by single worker process
+# (--concurrency=1), so that events of one entity are processed serially. Routing is disabled if set to 0.
+PAYMENT_EVENTS_QUEUES_COUNT = getattr(settings, "PAYMENT_EVENTS_QUEUES_COUNT", 0)
+PAYMENT_EVENTS_QUEUE_PREFIX = getattr(settings, "PAYMENT_EVENTS_QUEUE_PREFIX", "payment_events")
+
+# Event fields which identify entity (in order of priority), whose DB rows are updated during event processing.
+# Event which refers to Escrow only by its wallet is routed by escrow_id (see get_event_entity_id).
+EVENT_ENTITY_FIELDS = ("schedule_id", "escrow_id")
+
+
+def jump_consistent_hash(key: int, buckets_count: int) -> int:
+    """
+    Map key to one of buckets using "jump consistent hash" (John Lamping, Eric Veach), so that changing number of
+    buckets from n to n+1 moves only 1/(n+1) of keys.
+    :param key: 64-bit integer
+    :param buckets_count:
+    :return: number of bucket, starting from 0
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    bucket, j = -1, 0
+    while j < buckets_count:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def get_event_wallet_id(event_info: Dict) -> UUID or None:
+    """
+    :param event_info: payment_info or transaction_info
+    :return: wallet_id of event, which refers to neither Schedule nor Escrow
+    """
+    if any(event_info.get(field) for field in EVENT_ENTITY_FIELDS):
+        return None
+    wallet_id = event_info.get("wallet_id")
+    return UUID(str(wallet_id)) if wallet_id else None
+
+
+def get_event_entity_id(event_info: Dict, wallet_escrow_ids: Dict = None) -> UUID or None:
+    """
+    :param event_info: payment_info or transaction_info
+    :param wallet_escrow_ids: mapping of wallet_id to escrow_id (see EventEntitiesResolver.resolve_wallets),
+        resolved by event_entities_resolver if not specified
+    :return: id of Schedule, Escrow (also the one found by event's wallet) or wallet the event belongs to
+    """
+    for field in EVENT_ENTITY_FIELDS:
+        value = event_info.get(field)
+        if value:
+            return UUID(str(value))
+
+    wallet_id = get_event_wallet_id(event_info)
+    if wallet_id is None:
+        return None
+    if wallet_escrow_ids is None:
+        wallet_escrow_ids = event_entities_resolver.resolve_wallets([wallet_id])
+    return wallet_escrow_ids.get(wallet_id, wallet_id)
+
+
+def get_event_queue(event_info: Dict, queues_count: int = None, wallet_escrow_ids: Dict = None) -> str or None:
+    """
+    :param event_info: payment_info or transaction_info
+    :param queues_count: PAYMENT_EVENTS_QUEUES_COUNT if not specified
+    :param wallet_escrow_ids: see get_event_entity_id
+    :return: name of queue for processing event, None if event can be processed by any worker
+    """
+    queues_count = PAYMENT_EVENTS_QUEUES_COUNT if queues_count is None else queues_count
+    if not queues_count:
+        return None
+    entity_id = get_event_entity_id(event_info, wallet_escrow_ids)
+    if entity_id is None:
+        return None
+
+    return "%s.%s" % (PAYMENT_EVENTS_QUEUE_PREFIX, jump_consistent_hash(entity_id.int, queues_count))
+
+
+def group_events_by_queue(events_info: List[Dict], queues_count: int = None) -> Dict:
+    """
+    :param events_info: list of payment_info or transaction_info
+    :param queues_count: PAYMENT_EVENTS_QUEUES_COUNT if not specified
+    :return: mapping of queue name (see get_event_queue) to list of events, keeping original order of events
+    """
+    queues_count = PAYMENT_EVENTS_QUEUES_COUNT if queues_count is None else queues_count
+    # Escrows of all wallets within batch are looked up at once
+    wallet_ids = {get_event_wallet_id(event_info) for event_info in events_info} if queues_count else set()
+    wallet_ids.discard(None)
+    wallet_escrow_ids = event_entities_resolver.resolve_wallets(wallet_ids) if wallet_ids else {}
+
+    result = OrderedDict()
+    for event_info in events_info:
+        result.setdefault(get_event_queue(event_info, queues_count, wallet_escrow_ids), []).append(event_info)
+    return result
@@ -8,11 +8,10 @@ from celery import shared_task
 from botocore.exceptions import ClientError
 from requests import delete as delete_http_request
 from requests.exceptions import RequestException
-from django.core.paginator import Paginator
-from django.conf import settings
 
 from frontend_api.models import Schedule, Document
 from frontend_api.fields import ScheduleStatus, SchedulePurpose
+from frontend_api.tasks.iterators import keyset_iterator
 
 logger = logging.getLogger(__name__)
 
@@ -37,13 +36,25 @@ def process_unaccepted_schedules():
         deposit_payment_date__isnull=True,
         start_date__lte=now.datetime.date())
     unaccepted_schedules = schedules_with_deposit_payment_date | schedules_without_deposit_payment_date
-    # TODO: add order!
-    paginator = Paginator(unaccepted_schedules, settings.CELERY_BEAT_PER_PAGE_OBJECTS)
-    for page in paginator.page_range:
-        # Update statuses via .move_to_status()
-        # WARN: potential generation of 1-N SQL UPDATE command here
-        for schedule in paginator.page(page).object_list:
-            schedule.move_to_status(ScheduleStatus.rejected)
+    # Update statuses via .move_to_status()
+    # WARN: potential generation of 1-N SQL UPDATE command here
+    for schedule in keyset_iterator(unaccepted_schedules):
+        schedule.move_to_status(ScheduleStatus.rejected)
+
+
+@shared_task
+def reconcile_schedules_statuses(schedule_ids: list = None):
+    """
+    Repair drift of schedules' status, is_overdue & payment counters (see Schedule.reconcile_statuses).
+    Intended to be run periodically for all schedules.
+    :param schedule_ids: list of schedule ids (str), all schedules if not specified
+    :return:
+    """
+    logger.info("Reconciling statuses of schedules (schedule_ids=%s)" % (schedule_ids or "all"))
+    updated = Schedule.reconcile_statuses(schedule_ids)
+    logger.info("Reconciled statuses of schedules, %s schedule(s) updated" % updated, extra={
+        'updated_schedules': updated
+    })
 
 
 @shared_task
@@ -56,21 +67,18 @@ def remove_unassigned_documents():
 
     # Documents without related schedule which created more than hour ago
     outdated_documents = Document.objects.filter(schedule=None, created_at__lte=hour_ago, key__isnull=False)
-    # TODO: add order!
-    paginator = Paginator(outdated_documents, settings.CELERY_BEAT_PER_PAGE_OBJECTS)
-    for page in paginator.page_range:
-        for document in paginator.page(page).object_list:  # type: Document
-            # Get presigned url for deleting document
-            try:
-                delete_url = document.generate_s3_presigned_url(operation_name='delete_object')
-            except ClientError as e:
-                logger.error("AWS S3 service is unavailable %r" % format_exc())
-                return
-            # Make delete request with gotten url
-            try:
-                delete_http_request(delete_url)
-            except RequestException:
-                logger.error("S3 connection error during removing file %r" % format_exc())
-                return
-            # Remove appropriate relation from database.
-            document.delete()
+    for document in keyset_iterator(outdated_documents):  # type: Document
+        # Get presigned url for deleting document
+        try:
+            delete_url = document.generate_s3_presigned_url(operation_name='delete_object')
+        except ClientError as e:
+            logger.error("AWS S3 service is unavailable %r" % format_exc())
+            return
+        # Make delete request with gotten url
+        try:
+            delete_http_request(delete_url)
+        except RequestException:
+            logger.error("S3 connection error during removing file %r" % format_exc())
+            return
+        # Remove appropriate relation from database.
+        document.delete()
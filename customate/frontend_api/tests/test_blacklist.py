@@ -2,7 +2,7 @@ from django.test import TestCase
 import logging
 import arrow
 
-from frontend_api.models.blacklist import BlacklistDate
+from frontend_api.models.blacklist import BlacklistDate, blacklist_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 class BlacklistDateTest(TestCase):
     def setUp(self):
         BlacklistDate.objects.all().update(is_active=False)
+        # neither bulk update nor rollback of test's transaction sends signals
+        blacklist_calendar.invalidate()
+        self.addCleanup(blacklist_calendar.invalidate)
 
     def test_contains_no_match(self):
         BlacklistDate(date="2019-09-03", description="Christmas").save()
@@ -34,3 +37,33 @@ class BlacklistDateTest(TestCase):
         date = arrow.get(2019, 9, 1).datetime.date()  # 2019-09-01 is a weekend
 
         self.assertTrue(BlacklistDate.contains(date))
+
+    def test_contains_uses_single_query_for_window(self):
+        BlacklistDate(date="2019-09-03", description="Christmas").save()
+
+        with self.assertNumQueries(1):
+            results = [BlacklistDate.contains(arrow.get(2019, 9, day).datetime.date()) for day in range(2, 10)]
+
+        self.assertEqual([False, True, False, False, False, True, True, False], results)
+
+    def test_contains_invalidated_on_save(self):
+        date = arrow.get(2019, 9, 3).datetime.date()
+        self.assertFalse(BlacklistDate.contains(date))
+
+        BlacklistDate(date=date, description="Christmas").save()
+
+        self.assertTrue(BlacklistDate.contains(date))
+
+    def test_next_business_day(self):
+        BlacklistDate(date="2019-09-09", description="Christmas").save()
+        date = arrow.get(2019, 9, 7).datetime.date()  # Saturday
+
+        self.assertEqual(arrow.get(2019, 9, 10).datetime.date(), blacklist_calendar.next_business_day(date))
+
+    def test_next_business_day_raises_error_after_max_retries(self):
+        for day in list(range(2, 7)) + list(range(9, 14)):  # two weeks of holidays, Monday - Friday
+            BlacklistDate(date=arrow.get(2019, 9, day).datetime.date(), description="Holiday").save()
+        date = arrow.get(2019, 9, 1).datetime.date()  # Sunday
+
+        with self.assertRaises(ValueError):
+            blacklist_calendar.next_business_day(date)
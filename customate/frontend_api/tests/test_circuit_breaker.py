@@ -0,0 +1,56 @@
+from django.test import SimpleTestCase
+import logging
+
+import requests
+
+from external_apis.circuit_breaker import CircuitBreaker, CIRCUIT_BREAKER_DEFAULTS
+from frontend_api.exceptions import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def get_breaker(self, **options):
+        return CircuitBreaker("test", **dict(CIRCUIT_BREAKER_DEFAULTS, min_calls=4, **options))
+
+    def call_failing(self, breaker):
+        try:
+            with breaker.call():
+                raise requests.ConnectionError()
+        except requests.ConnectionError:
+            pass
+
+    def test_opens_after_failure_rate_exceeded(self):
+        breaker = self.get_breaker()
+        with breaker.call():
+            pass
+        for _ in range(3):
+            self.call_failing(breaker)
+
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        with self.assertRaises(UpstreamUnavailable):
+            with breaker.call():
+                self.fail("Open circuit should not let calls through")
+        self.assertEqual(1, breaker.get_metrics()["rejected"])
+
+    def test_successful_probe_closes_circuit(self):
+        breaker = self.get_breaker(open_timeout=0)
+        for _ in range(4):
+            self.call_failing(breaker)
+
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        with breaker.call() as call:
+            call.failed = False
+
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_bulkhead_rejects_calls_above_max_concurrency(self):
+        breaker = self.get_breaker(max_concurrency=1, bulkhead_timeout=0)
+
+        with breaker.call():
+            with self.assertRaises(UpstreamUnavailable):
+                with breaker.call():
+                    pass
+
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+        self.assertEqual(0, breaker.get_metrics()["in_flight"])
@@ -0,0 +1,46 @@
+from datetime import timedelta
+import logging
+
+from django.test import TestCase
+from django.utils import timezone
+
+from frontend_api.models import DailyPaymentsShard
+from frontend_api.tasks.payments import check_daily_payments_shards
+
+logger = logging.getLogger(__name__)
+
+
+class DailyPaymentsShardTest(TestCase):
+    def _create_shard(self, run_id: str, shard: int, heartbeat_minutes_ago: int,
+                      created_hours_ago: int = 1) -> DailyPaymentsShard:
+        s = DailyPaymentsShard.objects.create(run_id=run_id, shard=shard, shards_count=2)
+        DailyPaymentsShard.objects.filter(id=s.id).update(
+            created_at=timezone.now() - timedelta(hours=created_hours_ago),
+            started_at=timezone.now() - timedelta(hours=created_hours_ago),
+            updated_at=timezone.now() - timedelta(minutes=heartbeat_minutes_ago)
+        )
+        return s
+
+    def test_shards_without_heartbeat_are_requeued(self):
+        running = self._create_shard("run", 0, heartbeat_minutes_ago=1)
+        stale = self._create_shard("run", 1, heartbeat_minutes_ago=120)
+
+        check_daily_payments_shards()
+
+        running, stale = [DailyPaymentsShard.objects.get(id=s.id) for s in (running, stale)]
+        self.assertFalse(running.is_finished)
+        self.assertLess(running.started_at, timezone.now() - timedelta(minutes=30))
+        self.assertFalse(stale.is_finished)
+        self.assertGreater(stale.started_at, timezone.now() - timedelta(minutes=1))
+
+    def test_expired_shards_are_given_up(self):
+        finished = self._create_shard("expired", 0, heartbeat_minutes_ago=120, created_hours_ago=48)
+        DailyPaymentsShard.objects.filter(id=finished.id).update(finished_at=timezone.now())
+        expired = self._create_shard("expired", 1, heartbeat_minutes_ago=120, created_hours_ago=48)
+
+        check_daily_payments_shards()
+
+        finished, expired = [DailyPaymentsShard.objects.get(id=s.id) for s in (finished, expired)]
+        self.assertFalse(finished.is_failed)
+        self.assertTrue(expired.is_finished)
+        self.assertTrue(expired.is_failed)
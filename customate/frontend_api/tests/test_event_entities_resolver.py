@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+import logging
+from uuid import uuid4
+
+from frontend_api.models import Escrow
+from frontend_api.tasks.resolvers import EventEntitiesResolver
+
+logger = logging.getLogger(__name__)
+
+
+class EventEntitiesResolverTest(SimpleTestCase):
+    def test_known_escrow_wallet_is_resolved_without_query(self):
+        resolver = EventEntitiesResolver()
+        escrow = Escrow(id=uuid4(), wallet_id=uuid4())
+        resolver.remember([escrow])
+
+        entities = resolver.resolve({"transaction_id": str(uuid4()), "wallet_id": str(escrow.wallet_id)})
+
+        self.assertEqual(escrow.id, entities.wallet_escrow_id)
+        self.assertIsNone(entities.schedule_id)
+        metrics = resolver.get_metrics()
+        self.assertEqual(0, metrics["queries"])
+        self.assertEqual(1, metrics["queries_saved_per_event"])
+        self.assertEqual(1, metrics["wallet_cache_hits"])
+
+    def test_wallets_cache_is_bounded(self):
+        resolver = EventEntitiesResolver(wallets_cache_size=2)
+        escrows = [Escrow(id=uuid4(), wallet_id=uuid4()) for _ in range(3)]
+        resolver.remember(escrows)
+
+        self.assertEqual([e.wallet_id for e in escrows[1:]], list(resolver._wallets.keys()))
@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase
+import logging
+from uuid import uuid4
+
+from frontend_api.models import Escrow
+from frontend_api.tasks.resolvers import event_entities_resolver
+from frontend_api.tasks.routing import get_event_entity_id, get_event_queue, group_events_by_queue, jump_consistent_hash
+
+logger = logging.getLogger(__name__)
+
+
+class EventRoutingTest(SimpleTestCase):
+    def test_events_of_one_schedule_share_queue(self):
+        schedule_id = str(uuid4())
+        payment_event = {"payment_id": str(uuid4()), "schedule_id": schedule_id, "wallet_id": str(uuid4())}
+        transaction_event = {"transaction_id": str(uuid4()), "schedule_id": schedule_id}
+
+        self.assertEqual(get_event_queue(payment_event, 8), get_event_queue(transaction_event, 8))
+        self.assertIsNone(get_event_queue(payment_event, 0))
+        self.assertIsNone(get_event_queue({"payment_id": str(uuid4())}, 8))
+
+    def test_grouping_keeps_order_of_events(self):
+        escrow_id = str(uuid4())
+        events = [{"escrow_id": escrow_id, "status": status} for status in ("PROCESSING", "SUCCESS")]
+
+        groups = group_events_by_queue(events + [{"payment_id": str(uuid4())}], 8)
+
+        self.assertEqual(events, groups[get_event_queue(events[0], 8)])
+        self.assertEqual(1, len(groups[None]))
+
+    def test_adding_queue_moves_small_share_of_entities(self):
+        keys = [uuid4().int for _ in range(1000)]
+
+        moved = [key for key in keys if jump_consistent_hash(key, 8) != jump_consistent_hash(key, 9)]
+
+        self.assertTrue(all(jump_consistent_hash(key, 9) == 8 for key in moved))
+        self.assertLess(len(moved), 250)
+
+    def test_wallet_event_shares_queue_with_its_escrow_events(self):
+        escrow = Escrow(id=uuid4(), wallet_id=uuid4())
+        event_entities_resolver.remember([escrow])
+        self.addCleanup(event_entities_resolver.clear)
+        wallet_event = {"transaction_id": str(uuid4()), "wallet_id": str(escrow.wallet_id)}
+        escrow_event = {"payment_id": str(uuid4()), "escrow_id": str(escrow.id)}
+
+        self.assertEqual(escrow.id, get_event_entity_id(wallet_event))
+        self.assertEqual(get_event_queue(escrow_event, 8), get_event_queue(wallet_event, 8))
+        groups = group_events_by_queue([wallet_event, escrow_event], 8)
+        self.assertEqual([[wallet_event, escrow_event]], list(groups.values()))
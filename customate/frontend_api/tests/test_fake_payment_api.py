@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+import logging
+from uuid import uuid4
+
+from external_apis.payment.fake_server import FakePaymentApi
+
+logger = logging.getLogger(__name__)
+
+
+class FakePaymentApiTest(SimpleTestCase):
+    def setUp(self):
+        self.fake_api = FakePaymentApi(seed=1)
+
+    def test_created_payment_emits_payment_and_transaction_events(self):
+        status, response = self.fake_api.handle("POST", "/payments/", {"data": {
+            "type": "payments",
+            "attributes": {"userId": str(uuid4()), "currency": "GBP", "scheduleId": str(uuid4()),
+                           "data": {"amount": 100}},
+            "relationships": {
+                "account": {"data": {"type": "accounts", "id": str(uuid4())}},
+                "origin": {"data": {"type": "funding_sources", "id": str(uuid4())}},
+                "recipient": {"data": {"type": "payees", "id": str(uuid4())}}
+            }
+        }})
+
+        self.assertEqual(201, status)
+        self.assertEqual("PENDING", response["data"]["attributes"]["status"])
+        events = [self.fake_api.events.get() for _ in range(self.fake_api.events.qsize())]
+        self.assertEqual(["on_payment_change", "on_transaction_change", "on_payment_change"], [e[0] for e in events])
+        self.assertEqual(["PROCESSING", "SUCCESS", "SUCCESS"], [e[1]["status"] for e in events])
+        self.assertEqual(response["data"]["id"], events[-1][1]["payment_id"])
+
+    def test_find_payees_by_rsql_filter(self):
+        account_id = str(uuid4())
+        self.fake_api.handle("POST", "/wallets/", {"data": {
+            "type": "wallets",
+            "attributes": {"currency": "EUR"},
+            "relationships": {"account": {"data": {"type": "accounts", "id": account_id}}}
+        }})
+
+        status, response = self.fake_api.handle(
+            "GET", "/payees?filter[payees]=account.id==%s;type==WALLET;currency==EUR" % account_id, None
+        )
+
+        self.assertEqual(200, status)
+        self.assertEqual(1, len(response["data"]))
+        self.assertEqual(account_id, response["data"][0]["relationships"]["account"]["data"]["id"])
@@ -0,0 +1,34 @@
+from django.test import TestCase
+import logging
+import arrow
+
+from frontend_api.models.blacklist import BlacklistDate
+from frontend_api.tasks.iterators import keyset_iterator
+
+logger = logging.getLogger(__name__)
+
+
+class KeysetIteratorTest(TestCase):
+    def setUp(self):
+        for day in range(1, 8):
+            BlacklistDate(date=arrow.get(2019, 9, day).datetime.date(), description="Test").save()
+        self.queryset = BlacklistDate.objects.filter(description="Test")
+
+    def test_iterates_all_records_in_order(self):
+        expected = list(self.queryset.order_by("created_at", "id").values_list("id", flat=True))
+
+        result = [d.id for d in keyset_iterator(self.queryset, chunk_size=3)]
+
+        self.assertEqual(expected, result)
+
+    def test_records_modified_during_iteration_are_not_skipped(self):
+        # deactivating records shifts OFFSET-based pages, but keyset chunks should stay intact
+        queryset = self.queryset.filter(is_active=True)
+        processed = 0
+        for blacklist_date in keyset_iterator(queryset, chunk_size=2):
+            blacklist_date.is_active = False
+            blacklist_date.save()
+            processed += 1
+
+        self.assertEqual(7, processed)
+        self.assertFalse(queryset.exists())
@@ -0,0 +1,42 @@
+from django.core.cache import caches
+from django.test import TestCase
+import logging
+from uuid import uuid4
+
+from external_apis.payment.cache import PaymentApiCache
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentApiCacheTest(TestCase):
+    def setUp(self):
+        self.cache = PaymentApiCache()
+        caches[self.cache.alias].clear()
+        self.loaded = []
+
+    def load(self, value):
+        self.loaded.append(value)
+        return value
+
+    def test_get_or_load_requests_upstream_once(self):
+        payee_id = uuid4()
+
+        first = self.cache.get_or_load("payees", payee_id, lambda: self.load("payee"))
+        second = self.cache.get_or_load("payees", payee_id, lambda: self.load("other"))
+        self.cache.clear_local()
+        third = self.cache.get_or_load("payees", payee_id, lambda: self.load("other"))
+
+        self.assertEqual(["payee"] * 3, [first, second, third])
+        self.assertEqual(["payee"], self.loaded)
+        self.assertEqual({"local_hits": 1, "hits": 1, "misses": 1, "invalidations": 0},
+                         self.cache.get_metrics()["payees"])
+
+    def test_invalidate_forces_reload(self):
+        payee_id = uuid4()
+        self.cache.get_or_load("payees", payee_id, lambda: self.load("old"))
+
+        self.cache.invalidate("payees", str(payee_id))
+        result = self.cache.get_or_load("payees", payee_id, lambda: self.load("new"))
+
+        self.assertEqual("new", result)
+        self.assertEqual(["old", "new"], self.loaded)
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+import logging
+from uuid import uuid4
+
+from frontend_api.models import PaymentApiEvent
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentApiEventTest(TestCase):
+    def test_duplicate_event_is_not_accepted(self):
+        payment_id = uuid4()
+        payload = {"payment_id": str(payment_id), "status": "SUCCESS"}
+
+        event_id = PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, payment_id, "SUCCESS", payload)
+        duplicate_id = PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, str(payment_id), "SUCCESS", payload)
+        next_status_id = PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, payment_id, "REFUND", payload)
+
+        self.assertIsNotNone(event_id)
+        self.assertIsNone(duplicate_id)
+        self.assertIsNotNone(next_status_id)
+        self.assertEqual(2, PaymentApiEvent.objects.filter(entity_id=payment_id).count())
+
+    def test_event_with_non_canonical_id_is_accepted(self):
+        payment_id = uuid4()
+
+        event_id = PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, str(payment_id).upper(), "SUCCESS", {})
+
+        self.assertEqual(event_id, PaymentApiEvent.objects.get(entity_id=payment_id).id)
+
+    def test_accept_many_returns_only_new_events(self):
+        existing_id, new_id = str(uuid4()), str(uuid4())
+        PaymentApiEvent.accept(PaymentApiEvent.TRANSACTION, existing_id, "SUCCESS", {})
+
+        accepted = PaymentApiEvent.accept_many(PaymentApiEvent.TRANSACTION, [
+            (existing_id, "SUCCESS", {}),
+            (new_id, "SUCCESS", {}),
+        ])
+
+        self.assertEqual([(new_id, "SUCCESS")], list(accepted.keys()))
+        PaymentApiEvent.mark_processed(list(accepted.values()))
+        self.assertIsNotNone(PaymentApiEvent.objects.get(entity_id=new_id).processed_at)
+
+    def test_accept_events_batch_skips_duplicates_within_batch(self):
+        from frontend_api.tasks.payments import accept_events_batch
+
+        payment_id, processed_id = str(uuid4()), str(uuid4())
+        PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, processed_id, "SUCCESS", {})
+        events = [
+            {"payment_id": payment_id, "status": "PROCESSING"},
+            {"payment_id": processed_id, "status": "SUCCESS"},
+            {"payment_id": payment_id.upper(), "status": "PROCESSING"},
+            {"payment_id": payment_id, "status": "SUCCESS"},
+        ]
+
+        accepted, event_ids = accept_events_batch(PaymentApiEvent.PAYMENT, "payment_id", events)
+
+        self.assertEqual([events[0], events[3]], accepted)
+        self.assertEqual(2, len(event_ids))
+
+    def test_complete_events_batch_discards_failed_events(self):
+        from frontend_api.tasks.payments import accept_events_batch, complete_events_batch
+
+        succeeded_id, failed_id = str(uuid4()), str(uuid4())
+        events = [{"payment_id": succeeded_id, "status": "SUCCESS"}, {"payment_id": failed_id, "status": "FAILED"}]
+        accepted, event_ids = accept_events_batch(PaymentApiEvent.PAYMENT, "payment_id", events)
+
+        complete_events_batch(event_ids, failed_event_ids=[event_ids[1]])
+
+        self.assertIsNotNone(PaymentApiEvent.objects.get(entity_id=succeeded_id).processed_at)
+        self.assertFalse(PaymentApiEvent.objects.filter(entity_id=failed_id).exists())
+        # redelivered failed event is processed again
+        accepted, _ = accept_events_batch(PaymentApiEvent.PAYMENT, "payment_id", events)
+        self.assertEqual([events[1]], accepted)
+
+    def test_received_at_is_taken_from_payload(self):
+        payment_id = uuid4()
+        received_at = timezone.now() - timedelta(minutes=5)
+
+        PaymentApiEvent.accept(PaymentApiEvent.PAYMENT, payment_id, "SUCCESS", {"received_at": received_at.isoformat()})
+
+        self.assertEqual(received_at, PaymentApiEvent.objects.get(entity_id=payment_id).received_at)
+
+    def test_only_old_processed_events_are_purged(self):
+        from frontend_api.tasks.payments import purge_processed_payment_api_events
+
+        old_id, recent_id, unprocessed_id = str(uuid4()), str(uuid4()), str(uuid4())
+        accepted = PaymentApiEvent.accept_many(PaymentApiEvent.PAYMENT, [
+            (old_id, "SUCCESS", {}), (recent_id, "SUCCESS", {}), (unprocessed_id, "SUCCESS", {})
+        ])
+        PaymentApiEvent.mark_processed([accepted[(old_id, "SUCCESS")], accepted[(recent_id, "SUCCESS")]])
+        PaymentApiEvent.objects.filter(entity_id=old_id).update(processed_at=timezone.now() - timedelta(days=365))
+
+        purge_processed_payment_api_events()
+
+        self.assertEqual({recent_id, unprocessed_id}, {
+            str(entity_id) for entity_id in PaymentApiEvent.objects.values_list("entity_id", flat=True)
+        })
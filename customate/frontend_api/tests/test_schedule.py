@@ -4,18 +4,29 @@ import arrow
 import logging
 
 from django.db.models import Q
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
 
 from core.fields import FundingSourceType, Currency, PayeeType, PaymentStatusType
 from core.models import User
 from frontend_api.fields import SchedulePeriod, ScheduleStatus, SchedulePurpose, AccountType
 from frontend_api.models import Schedule, UserAccount
+from frontend_api.serializers.schedule import ScheduleSerializer
+from frontend_api.views.schedule import ScheduleViewSet
+from frontend_api.tasks.payments import PaymentsBatchDispatcher, make_payment
+from external_apis.circuit_breaker import get_breaker, _breakers
+from external_apis.payment.session import BREAKER as PAYMENT_API_BREAKER
 
-from frontend_api.models.schedule import DepositsSchedule, OnetimeSchedule, WeeklySchedule, SchedulePayments
+from frontend_api.models.schedule import DepositsSchedule, OnetimeSchedule, WeeklySchedule, SchedulePayments, \
+    ScheduleOccurrence, LastSchedulePayments
 
 logger = logging.getLogger(__name__)
 
 
+class FailingPaymentsBatchDispatcher(PaymentsBatchDispatcher):
+    def _publish(self, batch):
+        raise ConnectionError("Broker is not available")
+
+
 class ScheduleModelTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -329,6 +340,169 @@ class ScheduleModelTest(TestCase):
         # No match because created schedule has CREDIT_CARD funding source
         self.assertEquals(0, schedules_count)
 
+    def test_bulk_create_pending_skips_existing_idempotence_key(self):
+        schedule = self._get_test_schedule_model()
+        schedule.save()
+        existing = self._get_test_schedulepayment_model(schedule, PaymentStatusType.PENDING)
+        existing.idempotence_key = uuid4()
+        existing.save()
+
+        new_key = uuid4()
+        created = SchedulePayments.bulk_create_pending([
+            dict(schedule_id=schedule.id, payment_id=uuid4(), funding_source_id=schedule.funding_source_id,
+                 original_amount=schedule.payment_amount, is_deposit=False, idempotence_key=key)
+            for key in (existing.idempotence_key, new_key)
+        ])
+
+        self.assertEqual([new_key], list(created.keys()))
+        self.assertEqual(PaymentStatusType.PENDING, SchedulePayments.objects.get(id=created[new_key]).payment_status)
+
+    def test_pending_schedule_payments_deleted_when_batch_publish_fails(self):
+        schedule = self._get_test_schedule_model()
+        schedule.save()
+        dispatcher = FailingPaymentsBatchDispatcher(batch_size=10)
+        dispatcher.add(user_id=str(self.user.id), payment_account_id=str(uuid4()), schedule_id=str(schedule.id),
+                       currency=Currency.EUR.value, payment_amount=100, additional_information="",
+                       payee_id=str(schedule.payee_id), funding_source_id=str(schedule.funding_source_id))
+
+        with self.assertRaises(ConnectionError):
+            dispatcher.flush()
+
+        self.assertFalse(SchedulePayments.objects.filter(schedule_id=schedule.id).exists())
+        self.assertEqual(0, dispatcher.messages_count)
+
+    def test_failed_payment_initiation_refreshes_payment_counters(self):
+        schedule = self._get_test_schedule_model()
+        schedule.save()
+
+        # invalid payment account id makes payment initiation fail before any request to payment-api
+        make_payment(user_id=str(self.user.id), payment_account_id="invalid", schedule_id=str(schedule.id),
+                     currency=Currency.EUR.value, payment_amount=100, additional_information="",
+                     payee_id=str(schedule.payee_id), funding_source_id=str(schedule.funding_source_id))
+        schedule = Schedule.objects.get(id=schedule.id)
+
+        self.assertEqual(1, schedule.number_of_overdue_payments)
+        self.assertTrue(schedule.is_overdue)
+
+    def test_payment_stays_pending_while_payment_api_is_unavailable(self):
+        breaker = get_breaker(PAYMENT_API_BREAKER)
+        self.addCleanup(_breakers.pop, PAYMENT_API_BREAKER, None)
+        for _ in range(breaker.min_calls):
+            with breaker.call() as call:
+                call.failed = True
+        schedule = self._get_test_schedule_model()
+        schedule.save()
+
+        make_payment(user_id=str(self.user.id), payment_account_id=str(uuid4()), schedule_id=str(schedule.id),
+                     currency=Currency.EUR.value, payment_amount=100, additional_information="",
+                     payee_id=str(schedule.payee_id), funding_source_id=str(schedule.funding_source_id))
+        schedule = Schedule.objects.get(id=schedule.id)
+
+        schedule_payment = SchedulePayments.objects.get(schedule_id=schedule.id)
+        self.assertEqual(PaymentStatusType.PENDING, schedule_payment.payment_status)
+        self.assertEqual(0, schedule.number_of_overdue_payments)
+        self.assertFalse(schedule.is_overdue)
+
+    def test_last_schedule_payments_follow_payment_chain(self):
+        schedule = self._get_test_schedule_model()
+        schedule.save()
+        first_payment = self._get_test_schedulepayment_model(schedule, PaymentStatusType.FAILED)
+        first_payment.save()
+        retry_payment = self._get_test_schedulepayment_model(schedule, PaymentStatusType.SUCCESS)
+        retry_payment.parent_payment_id = first_payment.payment_id
+        retry_payment.save()
+
+        last_payment_ids = LastSchedulePayments.objects.filter(schedule_id=schedule.id).values_list("id", flat=True)
+
+        self.assertEqual([retry_payment.id], list(last_payment_ids))
+        self.assertFalse(SchedulePayments.objects.get(id=first_payment.id).is_last_in_chain)
+
+    def test_refresh_payment_counters(self):
+        schedule = self._get_test_schedule_model()
+        schedule.save()
+        self._get_test_schedulepayment_model(schedule, PaymentStatusType.SUCCESS).save()
+        self._get_test_schedulepayment_model(schedule, PaymentStatusType.FAILED).save()
+        deposit_payment = self._get_test_schedulepayment_model(schedule, PaymentStatusType.SUCCESS)
+        deposit_payment.is_deposit = True
+        deposit_payment.original_amount = 50
+        deposit_payment.save()
+
+        schedule.refresh_payment_counters()
+        schedule = Schedule.objects.get(id=schedule.id)
+
+        self.assertEqual(1, schedule.number_of_payments_made)
+        self.assertEqual(150, schedule.total_paid_sum)
+        self.assertEqual(1, schedule.number_of_overdue_payments)
+        # reading counters doesn't touch DB
+        with self.assertNumQueries(0):
+            self.assertEqual(9, schedule.number_of_payments_left)
+
+    def test_reconcile_statuses(self):
+        overdue_schedule = self._get_test_schedule_model()
+        overdue_schedule.save()
+        self._get_test_schedulepayment_model(overdue_schedule, PaymentStatusType.SUCCESS).save()
+        self._get_test_schedulepayment_model(overdue_schedule, PaymentStatusType.FAILED).save()
+        completed_schedule = self._get_test_schedule_model()
+        completed_schedule.number_of_payments = 1
+        completed_schedule.save()
+        self._get_test_schedulepayment_model(completed_schedule, PaymentStatusType.SUCCESS).save()
+
+        updated = Schedule.reconcile_statuses([overdue_schedule.id, completed_schedule.id])
+        overdue_schedule = Schedule.objects.get(id=overdue_schedule.id)
+        completed_schedule = Schedule.objects.get(id=completed_schedule.id)
+
+        self.assertEqual(2, updated)
+        self.assertTrue(overdue_schedule.is_overdue)
+        self.assertEqual(ScheduleStatus.open, overdue_schedule.status)
+        self.assertEqual(1, overdue_schedule.number_of_payments_made)
+        self.assertFalse(completed_schedule.is_overdue)
+        self.assertEqual(ScheduleStatus.closed, completed_schedule.status)
+        # nothing has changed since last reconciliation
+        self.assertEqual(0, Schedule.reconcile_statuses())
+
+    def test_filter_by_shard_splits_schedules(self):
+        schedule_ids = set()
+        for _ in range(10):
+            schedule = self._get_test_schedule_model()
+            schedule.save()
+            schedule_ids.add(schedule.id)
+
+        shards_count = 3
+        sharded_ids = []
+        for shard in range(shards_count):
+            queryset = Schedule.filter_by_shard(Schedule.objects.filter(id__in=schedule_ids), shard, shards_count)
+            sharded_ids.extend(queryset.values_list("id", flat=True))
+
+        # every schedule belongs to exactly one shard
+        self.assertEqual(len(schedule_ids), len(sharded_ids))
+        self.assertEqual(schedule_ids, set(sharded_ids))
+
+
+class ScheduleListQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('test_user')
+        cls.payment_account_id = uuid4()
+        UserAccount(account_type=AccountType.personal, user=cls.user, payment_account_id=cls.payment_account_id).save()
+        for i in range(100):
+            Schedule(name=f"Schedule {i}", start_date=arrow.utcnow().shift(days=1).datetime.date(), payment_amount=100,
+                     purpose=SchedulePurpose.pay, status=ScheduleStatus.open, currency=Currency.EUR,
+                     period=SchedulePeriod.weekly, payee_id=uuid4(), payee_type=PayeeType.WALLET,
+                     number_of_payments=10, funding_source_id=uuid4(), funding_source_type=FundingSourceType.WALLET,
+                     origin_user_id=cls.user.id).save()
+
+    def test_schedules_page_rendered_with_constant_number_of_queries(self):
+        queryset = ScheduleViewSet.annotate_queryset(Schedule.objects.filter(origin_user_id=self.user.id))
+        request = RequestFactory().get('/api/v1/schedules/')
+        request.user = self.user
+
+        # 1 query for schedules (with payment account ids) + 1 query for prefetched documents
+        with self.assertNumQueries(2):
+            rows = ScheduleSerializer(queryset, many=True, context={'request': request}).data
+
+        self.assertEqual(100, len(rows))
+        self.assertTrue(all(str(row['origin_payment_account_id']) == str(self.payment_account_id) for row in rows))
+
 
 class DepositsScheduleModelTest(TestCase):
 
@@ -466,3 +640,69 @@ class WeeklyScheduleModelTest(TestCase):
         weekly_schedule = WeeklySchedule.objects.filter(id=schedule.id)[0]
         self.assertEqual(start_date.shift(days=-7).datetime.date(), weekly_schedule.scheduled_date)
         #  Not sure why weekly_schedule.scheduled_date has "date" type here, not datetime
+
+
+class ScheduleOccurrenceModelTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('test_user')
+        UserAccount(account_type=AccountType.personal, user=cls.user, payment_account_id=uuid4()).save()
+
+    @staticmethod
+    def _get_test_schedule_model(start_date):
+        return Schedule(period=SchedulePeriod.weekly, status=ScheduleStatus.open, payment_amount=100,
+                        purpose=SchedulePurpose.pay, currency=Currency.GBP, payee_id=str(uuid4()),
+                        payee_type=PayeeType.WALLET, start_date=start_date.datetime.date(),
+                        origin_user_id=ScheduleOccurrenceModelTest.user.id, number_of_payments=2,
+                        deposit_amount=100, deposit_payment_date=start_date.shift(days=-1).datetime.date(),
+                        funding_source_id=str(uuid4()), funding_source_type=FundingSourceType.WALLET)
+
+    def test_occurrences_created_with_schedule(self):
+        start_date = arrow.get(2019, 9, 1)
+        schedule = self._get_test_schedule_model(start_date)
+        schedule.save()
+
+        regular_dates = ScheduleOccurrence.objects.filter(schedule_id=schedule.id, is_deposit=False) \
+            .order_by("scheduled_date").values_list("scheduled_date", flat=True)
+        self.assertEqual([start_date.shift(weeks=i).datetime.date() for i in range(3)], list(regular_dates))
+        self.assertTrue(ScheduleOccurrence.objects.filter(
+            schedule_id=schedule.id, is_deposit=True, scheduled_date=start_date.shift(days=-1).datetime.date()
+        ).exists())
+
+    def test_occurrences_refreshed_on_funding_source_type_change(self):
+        start_date = arrow.get(2019, 9, 1)
+        schedule = self._get_test_schedule_model(start_date)
+        schedule.save()
+
+        schedule.funding_source_type = FundingSourceType.CREDIT_CARD
+        schedule.save(update_fields=["funding_source_type"])
+
+        occurrence = ScheduleOccurrence.objects.get(
+            schedule_id=schedule.id, is_deposit=False, original_scheduled_date=start_date.datetime.date()
+        )
+        self.assertEqual(start_date.shift(days=-7).datetime.date(), occurrence.scheduled_date)
+
+    def test_future_occurrences_removed_on_stop(self):
+        schedule = self._get_test_schedule_model(arrow.utcnow().shift(days=7))
+        schedule.save()
+
+        schedule.move_to_status(ScheduleStatus.stopped)
+
+        self.assertFalse(ScheduleOccurrence.objects.filter(schedule_id=schedule.id).exists())
+
+    def test_get_processable_occurrences_for_several_dates(self):
+        start_date = arrow.get(2019, 9, 2)
+        schedule = self._get_test_schedule_model(start_date)
+        schedule.save()
+
+        occurrences = list(Schedule.get_processable_occurrences([
+            (start_date.shift(days=-1).datetime.date(), False),
+            (start_date.datetime.date(), False),
+            (start_date.shift(weeks=1).datetime.date(), True),
+        ]).filter(schedule_id=schedule.id))
+
+        # deposit & first regular payment, while second regular payment has no execution date limitation
+        self.assertEqual([True, False], [o.is_deposit for o in occurrences])
+        self.assertEqual(start_date.datetime.date(), occurrences[1].original_scheduled_date)
+        self.assertEqual(self.user.account.useraccount.payment_account_id, occurrences[1].payment_account_id)
@@ -102,5 +102,6 @@ urlpatterns = [
             ),
 
     path('presigned-urls/', view=views.PreSignedUrlView.as_view(), name="presigned-urls"),
+    path('circuit-breakers/', view=views.CircuitBreakersView.as_view(), name="circuit-breakers"),
     path('profiles/<pk>/', view=views.ProfileView.as_view(), name='profiles'),
 ]
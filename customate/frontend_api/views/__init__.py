@@ -30,6 +30,7 @@ from frontend_api.views.profile import ProfileView
 from frontend_api.views.schedule import ScheduleViewSet
 from frontend_api.views.escrow import EscrowViewSet, EscrowOperationViewSet
 from frontend_api.views.s3_sign import PreSignedUrlView
+from frontend_api.views.circuit_breaker import CircuitBreakersView
 
 __all__ = [
     PatchRelatedMixin,
@@ -62,5 +63,6 @@ __all__ = [
     ProfileView,
     ScheduleViewSet,
     EscrowViewSet,
-    PreSignedUrlView
+    PreSignedUrlView,
+    CircuitBreakersView
 ]
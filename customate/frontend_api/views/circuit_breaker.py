@@ -0,0 +1,23 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from external_apis.circuit_breaker import get_breakers_metrics
+from frontend_api.permissions import IsSuperAdmin
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreakersView(APIView):
+    """
+    Shows state of upstream services' circuit breakers within the worker process which handles request
+    """
+    permission_classes = (
+        IsAuthenticated,
+        IsSuperAdmin
+    )
+
+    def get(self, request):
+        return Response({"attributes": get_breakers_metrics()})
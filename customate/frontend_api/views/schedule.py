@@ -75,9 +75,21 @@ class ScheduleViewSet(views.ModelViewSet):
 
     def get_queryset(self, *args, **kwargs):
         target_account_ids = self.request.user.get_all_related_account_ids()
-        return Schedule.objects.filter(
+        return self.annotate_queryset(Schedule.objects.filter(
             Q(origin_user__account__id__in=target_account_ids) | Q(recipient_user__account__id__in=target_account_ids)
-        )
+        ))
+
+    @staticmethod
+    def annotate_queryset(queryset):
+        """
+        Select everything ScheduleSerializer needs along with schedules, so that list of schedules is rendered
+        with constant number of queries (regardless of page size)
+        :param queryset:
+        :return:
+        """
+        return queryset.annotate(
+            annotated_origin_payment_account_id=Schedule.origin_payment_account_id_expression()
+        ).prefetch_related("documents")
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from copy import deepcopy
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Max number of upstream responses kept in memory by every process (see ResourceViewSet.Meta.response_cache_ttl)
+PAYMENT_API_RESPONSE_CACHE_SIZE = getattr(settings, "PAYMENT_API_RESPONSE_CACHE_SIZE", 1000)
+
+
+class CachedResponse:
+    def __init__(self, json_data: dict, etag: str, ttl: float):
+        self.json_data = json_data
+        self.etag = etag
+        self.expires_at = time.monotonic() + ttl
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class ResponseCache:
+    """
+    Process-local LRU of upstream JSON:API documents fetched by ResourceViewSet GET requests.
+    Responses are stored per resource & scope (e.g. payment account) and upstream url, which contains all effective
+    filters, pagination and inclusions. Any create/update/delete of resource within current process drops all
+    its responses. Expired responses are kept to make conditional requests (If-None-Match) to upstream.
+    """
+
+    def __init__(self, size=PAYMENT_API_RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._generations = defaultdict(int)
+        self._metrics = defaultdict(lambda: {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0})
+
+    def get(self, resource: str, scope, url: str) -> CachedResponse or None:
+        with self._lock:
+            key = self._get_key(resource, scope, url)
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def get_fresh_json(self, resource: str, scope, url: str) -> dict or None:
+        """
+        :return: copy of cached document if it is not expired yet
+        """
+        response = self.get(resource, scope, url)
+        if response is None or not response.is_fresh:
+            self.count(resource, "misses")
+            return None
+        self.count(resource, "hits")
+        return deepcopy(response.json_data)
+
+    def set(self, resource: str, scope, url: str, json_data: dict, etag: str, ttl: float):
+        with self._lock:
+            key = self._get_key(resource, scope, url)
+            self._responses[key] = CachedResponse(deepcopy(json_data), etag, ttl)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.size:
+                self._responses.popitem(last=False)
+
+    def invalidate(self, resource: str):
+        logger.debug("Invalidating cached responses of %s resource" % resource)
+        with self._lock:
+            # responses of previous generations are never read again and will be evicted as least recently used
+            self._generations[resource] += 1
+            self._metrics[resource]["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+
+    def count(self, resource: str, metric: str):
+        with self._lock:
+            self._metrics[resource][metric] += 1
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {resource: dict(metrics) for resource, metrics in self._metrics.items()}
+
+    def _get_key(self, resource: str, scope, url: str) -> tuple:
+        return resource, self._generations[resource], str(scope), url
+
+
+response_cache = ResponseCache()
@@ -1,3 +1,4 @@
+from copy import deepcopy
 from traceback import format_exc
 from typing import List, Tuple, Union
 
@@ -6,6 +7,7 @@ from jsonapi_client.resourceobject import ResourceObject
 from rest_framework.exceptions import ValidationError
 from jsonapi_client import Session as DefaultSession, Modifier
 import logging
+import requests
 
 # Get an instance of a logger
 from jsonapi_client.exceptions import DocumentError
@@ -14,11 +16,16 @@ import collections
 
 from core.logger import Timer
 from customate.settings import EXTERNAL_SERVICES_TIMEOUT
+from external_apis.circuit_breaker import get_breaker
+from external_apis.payment.cache import payment_api_cache
+from payment_api.core.cache import response_cache
+from payment_api.core.pool import session_pool
 from payment_api.core.resource.mixins import ResourceMappingMixin, JsonApiErrorParser
 
 logger = logging.getLogger(__name__)
 
 SERVICE = 'PaymentApi'
+BREAKER = 'payment_api'
 
 
 class ResourceObjectWithCustomId(ResourceObject):
@@ -40,8 +47,17 @@ class ResourceObjectWithCustomId(ResourceObject):
 
 
 class Session(DefaultSession):
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(self, *args, response_cache_ttl=None, response_cache_resource=None, response_cache_scope=None,
+                 **kwargs) -> None:
+        """
+        :param response_cache_ttl: keep GET responses in response_cache for given number of seconds, if specified
+        :param response_cache_resource: resource name, cached responses are invalidated by
+        :param response_cache_scope: additional part of cache key (e.g. payment account id)
+        """
         request_kwargs = {'headers': self._generate_request_headers(), 'timeout': EXTERNAL_SERVICES_TIMEOUT}
+        self.response_cache_ttl = response_cache_ttl
+        self.response_cache_resource = response_cache_resource
+        self.response_cache_scope = response_cache_scope
         super().__init__(request_kwargs=request_kwargs, *args, **kwargs)
 
     def _generate_request_headers(self):
@@ -92,13 +108,61 @@ class Session(DefaultSession):
         return doc
 
     def _ext_fetch_by_url(self, url: str) -> 'Document':
+        return self.read(self.fetch_json_by_url(url), url)
+
+    def fetch_json_by_url(self, url: str) -> dict:
+        """
+        Fetch raw JSON:API document, without building resource objects (see ResourceViewSet pass-through mode)
+        """
+        if self.response_cache_ttl:
+            json_data = response_cache.get_fresh_json(self.response_cache_resource, self.response_cache_scope, url)
+            if json_data is not None:
+                logger.debug('Using cached Payment API resource (url=%s)' % url,
+                             extra={'url': url, 'service': SERVICE})
+                return json_data
+
         logger.info('Fetching Payment API resource (url=%s)' % url, extra={'url': url, 'service': SERVICE})
-        timer = Timer()
-        result = super()._ext_fetch_by_url(url)
+        with get_breaker(BREAKER).call() as call:
+            timer = Timer()
+            try:
+                result = self._fetch_json(url)
+            except DocumentError as e:
+                call.failed = (e.errors or {}).get('status_code', 0) >= 500
+                raise
         logger.info('Fetched Payment API resource (url=%s)' % url,
                     extra={'url': url, 'duration': timer.duration(), 'service': SERVICE})
         return result
 
+    def _fetch_json(self, url: str) -> dict:
+        """
+        Internal use.
+        Fetch document raw json from server over pooled connection, using conditional request (If-None-Match)
+        if expired response is cached.
+        """
+        self.assert_sync()
+        resource, scope = self.response_cache_resource, self.response_cache_scope
+        cached = response_cache.get(resource, scope, url) if self.response_cache_ttl else None
+        request_kwargs = dict(self._request_kwargs)
+        if cached is not None and cached.etag:
+            request_kwargs['headers'] = dict(request_kwargs.get('headers') or {}, **{'If-None-Match': cached.etag})
+
+        response = session_pool.get_http_session().get(url, **request_kwargs)
+        if response.status_code == requests.codes.not_modified and cached is not None:
+            response_cache.count(resource, "not_modified")
+            response_cache.set(resource, scope, url, cached.json_data, cached.etag, self.response_cache_ttl)
+            return deepcopy(cached.json_data)
+
+        if response.status_code != HttpStatus.OK_200:
+            raise DocumentError(f'Error {response.status_code}: '
+                                f'{error_from_response(response)}',
+                                errors={'status_code': response.status_code},
+                                response=response)
+
+        json_data = response.json()
+        if self.response_cache_ttl:
+            response_cache.set(resource, scope, url, json_data, response.headers.get('ETag'), self.response_cache_ttl)
+        return json_data
+
     def http_request(self, http_method: str, url: str, send_json: dict,
                      expected_statuses: List[str] = None) -> Tuple[int, dict, str]:
         """
@@ -106,15 +170,16 @@ class Session(DefaultSession):
         Method to make PATCH/POST requests to server using requests library.
         """
         self.assert_sync()
-        import requests
         expected_statuses = expected_statuses or HttpStatus.ALL_OK
 
         self._request_kwargs["headers"].update({'Content-Type': 'application/vnd.api+json'})
         logger.info("Request to Payment API: url=%s, method=%s", url, http_method,
                     extra={'body': send_json, 'url': url, 'method': http_method, 'service': SERVICE})
-        timer = Timer()
-        response = requests.request(http_method, url, json=send_json,
-                                    **self._request_kwargs)
+        with get_breaker(BREAKER).call() as call:
+            timer = Timer()
+            response = session_pool.get_http_session().request(http_method, url, json=send_json,
+                                                               **self._request_kwargs)
+            call.failed = response.status_code >= 500
         logger.info("Response from Payment API: status=%s", response.status_code,
                     extra={'body': response.text, 'status_code': response.status_code, 'url': url,
                            'duration': timer.duration(), 'service': SERVICE})
@@ -187,10 +252,16 @@ class Client(ResourceMappingMixin, JsonApiErrorParser):
     _embedded_resources = None
     _url_suffix = None
 
-    def __init__(self, base_url, embedded_resources=None, url_suffix=None, *args, **kwargs):
+    def __init__(self, base_url, embedded_resources=None, url_suffix=None, response_cache_ttl=None,
+                 response_cache_resource=None, response_cache_scope=None, *args, **kwargs):
         self._base_url = base_url
         self._embedded_resources = embedded_resources
         self._url_suffix = url_suffix
+        self._response_cache_options = {
+            'response_cache_ttl': response_cache_ttl,
+            'response_cache_resource': response_cache_resource,
+            'response_cache_scope': response_cache_scope
+        }
         super().__init__(*args, **kwargs)
 
     def __getattr__(self, item):
@@ -210,7 +281,7 @@ class Client(ResourceMappingMixin, JsonApiErrorParser):
 
     @cached_property
     def client(self):
-        return Session(self._base_url, schema={})
+        return Session(self._base_url, schema={}, **self._response_cache_options)
 
     @property
     def request_kwargs(self):
@@ -243,6 +314,9 @@ class Client(ResourceMappingMixin, JsonApiErrorParser):
         try:
             self._apply_resource_attributes(instance, attributes)
             instance.commit(custom_url=self.get_post_url(instance))
+            response_cache.invalidate(instance.type)
+            # e.g. updated payee or funding source must not be served from cache to schedule/escrow serializers
+            payment_api_cache.invalidate(instance.type, instance.id)
             return instance
 
         except DocumentError as ex:
@@ -265,6 +339,7 @@ class Client(ResourceMappingMixin, JsonApiErrorParser):
 
             instance.force_create()
             instance.commit(custom_url=self.get_post_url(instance))
+            response_cache.invalidate(resource_name)
 
             logger.debug(instance)
             return instance
@@ -295,6 +370,7 @@ class Client(ResourceMappingMixin, JsonApiErrorParser):
             self.client.add_resources(instance)
             instance.delete()
             instance.commit()
+            response_cache.invalidate(resource_name)
         except DocumentError as ex:
             logger.error("PaymentClient.delete caught a document error: %r " % format_exc(), extra={
                 'resource_name': resource_name,
@@ -308,4 +384,8 @@ class Client(ResourceMappingMixin, JsonApiErrorParser):
                 raise ex
 
     def add_model_schema(self, resource_name, properties):
+        """
+        :param resource_name:
+        :param properties: model properties, preferably shared ones from schema_registry
+        """
         self.client.schema.add_model_schema({resource_name: {'properties': properties}})
@@ -0,0 +1,42 @@
+import threading
+
+from django.conf import settings
+
+from external_apis.pool import SessionPool
+
+# Number of kept-alive connections to payment-api shared by all proxy sessions of one process, should be not less than
+# number of concurrent requests (threads/greenlets) served by one worker
+PAYMENT_API_PROXY_POOL_SIZE = getattr(settings, "PAYMENT_API_PROXY_POOL_SIZE", 20)
+
+
+class SchemaRegistry:
+    """
+    Process-wide registry of JSON:API model properties, which are built only once per resource serializer class
+    (the same resource may be written by different serializers) instead of on every create.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._properties = {}
+
+    def get_properties(self, key, build) -> dict:
+        """
+        :param key: owner of model properties, e.g. serializer class
+        :param build: callable, which returns model properties, is called once per key
+        :return: model properties, must not be modified by caller
+        """
+        properties = self._properties.get(key)
+        if properties is None:
+            with self._lock:
+                properties = self._properties.get(key)
+                if properties is None:
+                    properties = self._properties[key] = build()
+        return properties
+
+    def clear(self):
+        with self._lock:
+            self._properties.clear()
+
+
+schema_registry = SchemaRegistry()
+session_pool = SessionPool(size=PAYMENT_API_PROXY_POOL_SIZE, name="payment-api proxy")
@@ -36,22 +36,22 @@ class RQLFilterMixin:
         if resource is None:
             resource = self.resource
 
-        parts = key.split('__')
-        parts.insert(0, resource)
+        return {f'[{resource}]=': self.compile_filter(key).format(value=value)}
 
-        if parts[-1] in self.OPERATORS.keys():
-            value = self.OPERATORS[parts[-1]].format(value=value)
+    @classmethod
+    def compile_filter(cls, key):
+        """
+        :param key: filter name, e.g. "payment__wallet_id__in"
+        :return: template of RQL expression with "{value}" placeholder, e.g. "payment.walletId=in=({value})"
+        """
+        parts = key.split('__')
+        if parts[-1] in cls.OPERATORS:
+            template = cls.OPERATORS[parts[-1]]
             parts = parts[:-1]
         else:
-            value = f'=={value}'
+            template = '=={value}'
 
-        if len(parts) > 1:
-            field_parts = [camelize(part, False) for part in parts[1:]]
-            value = f'{".".join(field_parts)}{value}'
-
-        key = f'[{parts[0]}]='
-
-        return {key: value}
+        return '.'.join(camelize(part, False) for part in parts) + template
 
     def parse_value(self, filters, key, value):
         if isinstance(value, dict):
@@ -66,46 +66,67 @@ class RQLFilterMixin:
             return {key: value}
 
 
+class RQLFilterPlan(RQLFilterMixin):
+    """
+    Filtering rules of viewset class, compiled once from its filterset_fields and Meta.filters: allowed filter names,
+    their RQL templates (camelized field paths and operators) and default/override filters.
+    """
+
+    def __init__(self, base_filters_config, meta_filters=None):
+        self.base_filters = {}
+        for filter_name, filter_parts in (base_filters_config if isinstance(base_filters_config, dict) else {}).items():
+            self.base_filters.update({f'{filter_name}__{filter_part}': filter_part for filter_part in filter_parts})
+
+        self.templates = {filter_name: self.compile_filter(filter_name) for filter_name in self.base_filters}
+
+        # (filter name, filter object, whether it overrides incoming filter value)
+        self.meta_filters = []
+        for filter_obj in meta_filters or []:
+            filter_key = next(iter(filter_obj))
+            filter_value = filter_obj[filter_key]
+            # We need to have a chance to override incoming filter value (for example, to make sure that user didn't
+            # query other account's data)
+            force_override = isinstance(filter_value, dict) and bool(filter_value.get('force_override_filter'))
+            self.meta_filters.append((filter_key, filter_obj, force_override))
+
+    def format(self, filter_name, value, resource):
+        return {f'[{resource}]=': self.templates[filter_name].format(value=value)}
+
+    @classmethod
+    def for_view(cls, view) -> 'RQLFilterPlan':
+        view_class = type(view)
+        plan = view_class.__dict__.get('_rql_filter_plan')
+        if plan is None:
+            plan = cls(getattr(view_class, 'filterset_fields', None),
+                       getattr(getattr(view_class, 'Meta', None), 'filters', None))
+            view_class._rql_filter_plan = plan
+        return plan
+
+
 class RQLFilterSet(RQLFilterMixin):
 
-    def __init__(self, filter_data, view, queryset, request, base_filters):
+    def __init__(self, filter_data, view, queryset, request, base_filters, plan=None):
         self._filter_data = filter_data
         self._view = view
         self._queryset = queryset
         self._request = request
-        self.base_filters = self._initiate_base_filters(base_filters if isinstance(base_filters, dict) else {})
+        if plan is None:
+            plan = RQLFilterPlan(base_filters, getattr(getattr(view, 'Meta', None), 'filters', None))
+        self._plan = plan
+        self.base_filters = plan.base_filters
 
     @cached_property
     def resource(self):
         return self._view.external_resource_name
 
-    def _initiate_base_filters(self, base_filters_config):
-        base_filters = {}
-        for filter_name, filter_parts in base_filters_config.items():
-            base_filters.update({f'{filter_name}__{filter_part}': filter_part for filter_part in filter_parts})
-        return base_filters
-
     @cached_property
     def filter_data(self):
         filter_data = self._filter_data.get('data', {})
-        meta = getattr(self._view, 'Meta', None)
-        filters = getattr(meta, 'filters', None)
-        if filters:
-            for filter_obj in filters:
-                if not self._is_filter_already_set(filter_data, filter_obj):
-                    filter_data.update(filter_obj)
+        for filter_key, filter_obj, force_override in self._plan.meta_filters:
+            if force_override or filter_data.get(filter_key, None) is None:
+                filter_data.update(filter_obj)
         return filter_data
 
-    def _is_filter_already_set(self, existing_filter_data, new_filter_obj):
-        filter_key = list(new_filter_obj.keys())[0]
-
-        # We need to have a chance to override incoming filter value (for example, to make sure that user didn't
-        # query other account's data)
-        if isinstance(new_filter_obj.get(filter_key), dict) and new_filter_obj.get(filter_key).get('force_override_filter'):
-            return False
-        else:
-            return existing_filter_data.get(filter_key, None) is not None
-
     @property
     def qs(self):
         queryset = self._queryset
@@ -127,7 +148,8 @@ class RQLFilterSet(RQLFilterMixin):
                     resource = data.get(filter_name).get('resource') \
                         if isinstance(data.get(filter_name), dict) \
                         else None
-                    filter_data = self.parse_filter(filter_name, value.get(filter_name), resource)
+                    filter_data = self._plan.format(filter_name, value.get(filter_name),
+                                                    self.resource if resource is None else resource)
                     key = next(iter(filter_data))
 
                     if filters.get(key, None):
@@ -146,7 +168,8 @@ class ResourceFilterBackend(DjangoFilterBackend):
     def filter_queryset(self, request, queryset, view):
         data = self.get_filterset_kwargs(request, queryset, view)
         # TODO add filtermapping
-        filter_set = RQLFilterSet(data, view, queryset, request, base_filters=getattr(view, 'filterset_fields', None))
+        filter_set = RQLFilterSet(data, view, queryset, request, base_filters=getattr(view, 'filterset_fields', None),
+                                  plan=RQLFilterPlan.for_view(view))
 
         self._validate_filter(data.pop('filter_keys'), filter_set)
 
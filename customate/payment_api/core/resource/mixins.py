@@ -1,5 +1,151 @@
+import threading
+
+
+def _compile_apply_instance_mapping(key, data):
+    op, value = data.get('op'), data.get('value')
+    if op == 'copy':
+        def apply_copy(mixin, resource):
+            try:
+                attribute = getattr(resource, key)
+            except AttributeError:
+                return
+            setattr(resource, value, attribute)
+        return apply_copy
+
+    if op == 'edit':
+        def apply_edit(mixin, resource):
+            if hasattr(resource, key):
+                setattr(resource, key, value)
+        return apply_edit
+
+    if op == 'custom' and callable(value):
+        def apply_custom(mixin, resource):
+            value(resource)
+        return apply_custom
+
+    if op == 'map':
+        def apply_map(mixin, resource):
+            relationships = getattr(resource, '_relationships', None)
+            attributes = getattr(resource, '_attributes', None)
+            if relationships is not None and value in relationships and not (attributes and value in attributes):
+                resource._relationships[key] = resource._relationships.pop(value)
+                dirty_attributes = resource._attributes._dirty_attributes
+                dirty_attributes.discard(value)
+                dirty_attributes.discard(key)
+            else:
+                mixin._apply_instance_mapping(key, data, resource)
+        return apply_map
+
+
+def _compile_apply_data_mapping(key, data):
+    op, value = data.get('op'), data.get('value')
+    if op == 'copy':
+        def apply_copy(mixin, resource):
+            if key in resource:
+                resource[value] = resource[key]
+        return apply_copy
+
+    if op == 'edit':
+        def apply_edit(mixin, resource):
+            if key in resource:
+                resource[key] = value
+        return apply_edit
+
+    if op == 'map':
+        def apply_map(mixin, resource):
+            if resource.get(value):
+                resource[key] = resource.pop(value)
+        return apply_map
+
+
+def _compile_reverse_instance_mapping(key, data):
+    op, value = data.get('op'), data.get('value')
+    if op == 'edit':
+        old_value = data.get('old_value')
+
+        def reverse_edit(mixin, resource):
+            if hasattr(resource, key):
+                setattr(resource, key, old_value)
+        return reverse_edit
+
+
+def _compile_reverse_data_mapping(key, data):
+    op, value = data.get('op'), data.get('value')
+    if op == 'copy':
+        def reverse_copy(mixin, resource):
+            if key in resource and value in resource:
+                resource.pop(value)
+        return reverse_copy
+
+    if op == 'map':
+        def reverse_map(mixin, resource):
+            if key in resource:
+                resource[value] = resource.pop(key, None)
+        return reverse_map
+
+    if op == 'edit':
+        old_value = data.get('old_value')
+
+        def reverse_edit(mixin, resource):
+            if key in resource:
+                resource[key] = old_value
+        return reverse_edit
+
+
+_MAPPING_COMPILERS = {
+    ('apply', 'instance'): _compile_apply_instance_mapping,
+    ('apply', 'data'): _compile_apply_data_mapping,
+    ('reverse', 'instance'): _compile_reverse_instance_mapping,
+    ('reverse', 'data'): _compile_reverse_data_mapping,
+}
+
+# Compiled mappings shared by all mixin instances (e.g. per-request clients of the same view) with the same mapping
+_mapping_cache = {}
+_mapping_cache_lock = threading.Lock()
+
+
+def compile_mapping(resource_mapping, action, kind) -> tuple:
+    """
+    Compile mapping items into specialized callables (one per item), which are called as fn(mixin, resource).
+    Items, which cannot be specialized, fall back to generic ResourceMappingMixin._<action>_<kind>_mapping.
+    :param resource_mapping: list of {key: {'op': ..., 'value': ..., 'old_value': ...}}
+    :param action: "apply" or "reverse"
+    :param kind: "instance" or "data"
+    :return: tuple of callables
+    """
+    try:
+        signature = (action, kind) + tuple(
+            (key, tuple(sorted(data.items()))) for key, data in (next(iter(item.items())) for item in resource_mapping)
+        )
+        hash(signature)
+    except TypeError:
+        signature = None
+
+    compiled = _mapping_cache.get(signature) if signature else None
+    if compiled is None:
+        compiler = _MAPPING_COMPILERS[(action, kind)]
+        generic = f'_{action}_{kind}_mapping'
+        items = []
+        for item in resource_mapping:
+            key = next(iter(item))
+            data = item.get(key)
+            fn = compiler(key, data)
+            if fn is None:
+                def fn(mixin, resource, key=key, data=data):
+                    getattr(mixin, generic)(key, data, resource)
+            items.append(fn)
+        compiled = tuple(items)
+        if signature:
+            with _mapping_cache_lock:
+                _mapping_cache[signature] = compiled
+    return compiled
+
+
 class ResourceMappingMixin:
     _resource_mapping = None
+    _compiled_mappings = None
+    # use mapping callables compiled by compile_mapping instead of generic per item dispatching
+    compile_mappings = True
 
     def __init__(self, *args, **kwargs):
         if 'resource_mapping' in kwargs:
@@ -19,12 +165,18 @@ class ResourceMappingMixin:
                 self.resource_mapping.append(item)
         else:
             self.resource_mapping.append(mapping)
+        self._compiled_mappings = None
 
     def key_mapping(self, data, keys):
         for old_key, new_key in keys.items():
             data[new_key] = data.pop(old_key)
 
     def apply_mapping(self, resource):
+        if self.compile_mappings:
+            for fn in self._get_compiled_mapping('apply', resource):
+                fn(self, resource)
+            return resource
+
         map_attr = self._get_mapping_strategy('apply', resource)
         for item in self.resource_mapping:
             key = next(iter(item))
@@ -33,6 +185,15 @@ class ResourceMappingMixin:
 
         return resource
 
+    def _get_compiled_mapping(self, action, resource):
+        kind = 'data' if isinstance(resource, dict) else 'instance'
+        if self._compiled_mappings is None:
+            self._compiled_mappings = {}
+        compiled = self._compiled_mappings.get((action, kind))
+        if compiled is None:
+            compiled = self._compiled_mappings[(action, kind)] = compile_mapping(self.resource_mapping, action, kind)
+        return compiled
+
     def _get_mapping_strategy(self, action, resource):
         return getattr(self, f'_{action}_{"data" if isinstance(resource, dict) else "instance"}_mapping')
 
@@ -92,6 +253,11 @@ class ResourceMappingMixin:
                 resource[key] = data.get('value')
 
     def reverse_mapping(self, resource):
+        if self.compile_mappings:
+            for fn in self._get_compiled_mapping('reverse', resource):
+                fn(self, resource)
+            return resource
+
         mapping_strategy = self._get_mapping_strategy('reverse', resource)
         for item in self.resource_mapping:
             key = next(iter(item))
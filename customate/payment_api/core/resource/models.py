@@ -98,14 +98,30 @@ class ResourceQueryset(JsonApiErrorParser, RQLFilterMixin):
             try:
                 self._response = self.request(self.resource, self.payload)
             except DocumentError as ex:
-                data = self._parse_document_error(ex)
-                if data:
-                    raise ValidationError(data)
-                else:
-                    raise ex
+                self._raise_document_error(ex)
 
         return self._response
 
+    def fetch_json(self) -> dict:
+        """
+        Fetch raw upstream document of queryset, without building resource objects and applying mappings
+        """
+        if isinstance(self._response, EmptyResponse):
+            return {'data': [], 'meta': {'page': {'totalRecords': 0}}}
+
+        resource_id, filter_ = self.client._resource_type_and_filter(self.payload)
+        try:
+            return self.client.fetch_json_by_url(self.client._url_for_resource(self.resource, resource_id, filter_))
+        except DocumentError as ex:
+            self._raise_document_error(ex)
+
+    def _raise_document_error(self, ex):
+        data = self._parse_document_error(ex)
+        if data:
+            raise ValidationError(data)
+        else:
+            raise ex
+
     @property
     def payload(self):
         modifiers = self.collected_modifiers
@@ -0,0 +1,160 @@
+import json
+import logging
+import threading
+from typing import Dict, List
+
+from jsonapi_client.common import jsonify_attribute_name
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.reverse import reverse
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+from rest_framework_json_api.utils import _format_object
+
+from core.fields import SerializerField
+from payment_api.core.resource.fields import ExternalResourceRelatedField, ManyRelatedField
+from payment_api.core.resource.serializers import ResourceSerializer
+
+logger = logging.getLogger(__name__)
+
+# Query params, which require full rendering of resources by JSON:API renderer (included resources, sparse fieldsets)
+RENDERER_QUERY_PARAMS = ('include', 'fields[')
+
+
+def dumps(value) -> str:
+    """
+    Serialize value the same way rest_framework's JSONRenderer does (encoder and JSON settings)
+    """
+    return json.dumps(
+        value,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=SHORT_SEPARATORS if api_settings.COMPACT_JSON else LONG_SEPARATORS
+    ).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+class PassThroughPlan:
+    """
+    Rules for rewriting upstream JSON:API resources into the same document ResourceViewSet would render through
+    its serializer: resource type, attribute names (upstream "source" -> serializer field name) with values converted
+    by field.to_representation, relationships with local links, member names formatted according to
+    JSON_API_FORMAT_FIELD_NAMES. Everything else from upstream (resource links, unknown attributes) is dropped.
+    Built once per serializer class, see get_pass_through_plan.
+    """
+
+    def __init__(self, serializer: BaseSerializer):
+        self.resource_type = serializer.Meta.resource_name
+        # custom representation of resources (as well as per-resource and root meta) cannot be reproduced by
+        # rewriting upstream document
+        self.is_supported = type(serializer).to_representation is ResourceSerializer.to_representation and \
+            not getattr(serializer.Meta, 'meta_fields', None) and not hasattr(serializer, 'get_root_meta')
+        # upstream attribute name -> (field name, field), in order of serializer fields
+        self.attributes = {}
+        # upstream relationship name -> (field name, resource type, self link view, related link view)
+        self.relationships = {}
+
+        included_serializers = getattr(serializer, 'related_resources', {})
+        for name, field in serializer.fields.items():
+            source = getattr(field, 'result_source', field.source)
+            if name == 'id' or getattr(field, 'write_only', False):
+                continue
+            if source == '*' or '.' in source or isinstance(field, (BaseSerializer, SerializerField)):
+                self.is_supported = False
+            elif isinstance(field, (ManyRelatedField, ExternalResourceRelatedField)):
+                relation = getattr(field, 'child_relation', field)
+                included = included_serializers.get(name)
+                self.relationships[source] = (
+                    name,
+                    getattr(getattr(included, 'Meta', None), 'resource_name', None),
+                    getattr(relation, 'self_link_view_name', None),
+                    getattr(relation, 'related_link_view_name', None),
+                )
+            else:
+                # resource objects of jsonapi_client look attributes up by "jsonified" names
+                self.attributes[jsonify_attribute_name(source)] = (name, field)
+
+    def rewrite(self, resources: List[Dict], request):
+        """
+        Rewrite upstream resources in place, so that no copies of (potentially large) document are made
+        :param resources: "data" of upstream document
+        :param request:
+        """
+        for resource in resources:
+            resource.pop('links', None)
+            resource.pop('meta', None)
+            resource['type'] = self.resource_type
+            resource_id = resource.get('id')
+
+            upstream_attributes = resource.get('attributes') or {}
+            attributes = {}
+            for key, (name, field) in self.attributes.items():
+                if key in upstream_attributes:
+                    value = upstream_attributes[key]
+                    attributes[name] = value if value is None else field.to_representation(value)
+            resource['attributes'] = _format_object(attributes)
+
+            upstream_relationships = resource.pop('relationships', None) or {}
+            relationships = {}
+            for key, (name, resource_type, self_view, related_view) in self.relationships.items():
+                if key in upstream_relationships:
+                    relationships[name] = self._rewrite_relationship(
+                        upstream_relationships[key], resource_id, name, resource_type, self_view, related_view,
+                        request
+                    )
+            if relationships:
+                resource['relationships'] = _format_object(relationships)
+
+    def _rewrite_relationship(self, relationship, resource_id, name, resource_type, self_view, related_view,
+                              request):
+        data = relationship.get('data')
+        if resource_type:
+            for identifier in (data if isinstance(data, list) else [data] if data else []):
+                identifier['type'] = resource_type
+
+        result = {}
+        links = {}
+        for link, view_name in (('self', self_view), ('related', related_view)):
+            if view_name:
+                links[link] = reverse(view_name, kwargs={'pk': resource_id, 'related_field': name}, request=request)
+        if links:
+            result['links'] = links
+        result['data'] = data
+        return result
+
+    def stream(self, resources: List[Dict], top_level: Dict):
+        """
+        Serialize document by chunks (one per resource), instead of building whole response body in memory.
+        Members go in the same order as rendered by JSON:API renderer.
+        :param resources: rewritten resources
+        :param top_level: other members of document ("links" and "meta" of pagination)
+        """
+        links = top_level.get('links')
+        yield '{%s"data":[' % ('"links":%s,' % dumps(links) if links else '')
+        for index, resource in enumerate(resources):
+            yield (',' if index else '') + dumps(resource)
+        yield ']'
+        meta = top_level.get('meta')
+        if meta:
+            yield ',"meta":%s' % dumps(_format_object(meta))
+        yield '}'
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def get_pass_through_plan(serializer: BaseSerializer) -> PassThroughPlan or None:
+    """
+    :return: plan of serializer class, None if serializer output cannot be reproduced without full rendering
+    """
+    serializer_class = type(serializer)
+    if serializer_class not in _plans:
+        with _plans_lock:
+            if serializer_class not in _plans:
+                plan = PassThroughPlan(serializer)
+                _plans[serializer_class] = plan if plan.is_supported else None
+                logger.info("Built pass-through plan for %s (supported=%s)" % (
+                    serializer_class.__name__, plan.is_supported
+                ))
+    return _plans[serializer_class]
@@ -8,6 +8,7 @@ from rest_framework_json_api.serializers import Serializer, IncludedResourcesVal
 from inflection import camelize
 
 from core.fields import SerializerField
+from payment_api.core.pool import schema_registry
 from payment_api.core.resource.models import ExternalResourceModel
 from payment_api.core.resource.fields import ExternalResourceRelatedField, ManyRelatedField
 
@@ -108,7 +109,8 @@ class ResourceSerializer(IncludedResourcesValidationMixin, Serializer):
 
         self.client.reverse_mapping(validated_data)
 
-        self.client.add_model_schema(self.Meta.model.resource, self.resource_properties)
+        properties = schema_registry.get_properties(type(self), lambda: self.resource_properties)
+        self.client.add_model_schema(self.Meta.model.resource, properties)
         instance = self.client.create(self.Meta.model.resource, validated_data)
         return self.client.apply_mapping(instance)
 
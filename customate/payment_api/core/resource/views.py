@@ -1,10 +1,14 @@
 import logging
+from django.http import StreamingHttpResponse
 from django.utils.functional import cached_property
 from django.conf import settings
 
+from external_apis.payment.cache import payment_api_cache
+from payment_api.core.cache import response_cache
 from payment_api.core.client import Client
 from rest_framework_json_api.views import ModelViewSet, RelationshipView
 from payment_api.core.resource.models import ResourceQueryset
+from payment_api.core.resource.passthrough import RENDERER_QUERY_PARAMS, get_pass_through_plan
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +23,29 @@ class ResourceViewSet(ModelViewSet):
     def client(self):
         embedded_resources = getattr(self.Meta, 'embedded_resources', None) if hasattr(self, 'Meta') else None
         resource_suffix_name = getattr(self.Meta, 'resource_suffix_name', None) if hasattr(self, 'Meta') else None
-        client = Client(self.base_url, embedded_resources=embedded_resources, url_suffix=resource_suffix_name)
+        client = Client(self.base_url, embedded_resources=embedded_resources, url_suffix=resource_suffix_name,
+                        **self.get_response_cache_options())
         client.resource_mapping = {'id': {'op': 'copy', 'value': 'pk'}}
         self._check_resource_mapping(client)
         return client
 
+    def get_response_cache_options(self):
+        """
+        Upstream responses of GET requests are cached (see payment_api.core.cache) only if viewset's Meta
+        specifies response_cache_ttl (seconds)
+        """
+        response_cache_ttl = getattr(self._meta, 'response_cache_ttl', None)
+        if not response_cache_ttl or not self.request or self.request.method != 'GET':
+            return {}
+
+        user = self.request.user
+        account = getattr(user, 'account', None) if not user.is_anonymous else None
+        return {
+            'response_cache_ttl': response_cache_ttl,
+            'response_cache_resource': self.external_resource_name,
+            'response_cache_scope': getattr(account, 'payment_account_id', None)
+        }
+
     def _check_resource_mapping(self, client):
         if self._meta and hasattr(self._meta, 'resource_mapping'):
             client.resource_mapping = self._meta.resource_mapping
@@ -94,6 +116,43 @@ class ResourceViewSet(ModelViewSet):
 
         return self._queryset
 
+    def list(self, request, *args, **kwargs):
+        plan = self.get_pass_through_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        document = queryset.fetch_json()
+        resources = document.get('data') or []
+        page = (document.get('meta') or {}).get('page') or {}
+
+        top_level = {}
+        if self.paginator is not None:
+            # paginator needs total number of records only, its page of integers is not used
+            self.paginate_queryset(range(page.get('totalRecords', len(resources))))
+            top_level = self.paginator.get_paginated_response(None).data
+            top_level.pop('results', None)
+
+        plan.rewrite(resources, request)
+        return StreamingHttpResponse(plan.stream(resources, top_level), content_type='application/vnd.api+json')
+
+    def get_pass_through_plan(self):
+        """
+        List responses are streamed to client right from upstream document (instead of building resource objects,
+        applying mappings and rendering them through serializer) if viewset's Meta enables pass_through, no custom
+        resource mappings are specified and request doesn't need included resources or sparse fieldsets.
+        :return: PassThroughPlan or None
+        """
+        if not getattr(self._meta, 'pass_through', False) or hasattr(self._meta, 'resource_mapping'):
+            return None
+        if any(param.startswith(RENDERER_QUERY_PARAMS) for param in self.request.query_params):
+            return None
+
+        serializer = self.get_serializer()
+        if hasattr(serializer.Meta, 'resource_mapping'):
+            return None
+        return get_pass_through_plan(serializer)
+
     # def perform_create(self, serializer):
     #     pass
     #
@@ -103,6 +162,8 @@ class ResourceViewSet(ModelViewSet):
     def perform_destroy(self, instance):
         instance.delete()
         instance.commit()
+        response_cache.invalidate(self.external_resource_name)
+        payment_api_cache.invalidate(self.external_resource_name, instance.id)
 
 
 class ResourceRelationshipView(RelationshipView):
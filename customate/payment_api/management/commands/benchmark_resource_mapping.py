@@ -0,0 +1,104 @@
+import time
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+
+from payment_api.core.client import Client
+from payment_api.core.resource.fields import get_pk_from_identifier
+from payment_api.core.resource.mixins import ResourceMappingMixin
+
+
+def transaction_document(count: int) -> dict:
+    return {"data": [{
+        "id": str(uuid4()),
+        "type": "transactions",
+        "attributes": {
+            "active": 1, "isHidden": 0, "amount": 1000, "netAmount": 990, "actualBalance": 5000,
+            "closingBalance": 4000, "executionDate": "2019-10-01T10:00:00Z", "name": "OUTGOING_INTERNAL",
+            "status": "SUCCESS", "data": {"reference": "Benchmark"}
+        },
+        "relationships": {
+            "payment": {"data": {"type": "payments", "id": str(uuid4())}},
+            "origin": {"data": {"type": "funding_sources", "id": str(uuid4())}},
+            "recipient": {"data": {"type": "payees", "id": str(uuid4())}},
+        }
+    } for _ in range(count)]}
+
+
+def funding_source_document(count: int) -> dict:
+    return {"data": [{
+        "id": str(uuid4()),
+        "type": "funding_sources",
+        "attributes": {
+            "title": "Benchmark card", "type": "CREDIT_CARD", "status": "VALID", "currency": "GBP",
+            "data": {"card": {"number": "4111********1111"}}
+        },
+        "relationships": {"account": {"data": {"type": "accounts", "id": str(uuid4())}}}
+    } for _ in range(count)]}
+
+
+class Command(BaseCommand):
+    """
+    Usage: ./manage.py benchmark_resource_mapping --resources=10000 --repeat=5
+
+    Compares generic (per item dispatching) and compiled ResourceMappingMixin mappings, applied the same way
+    ResourceViewSet does it for list responses: client mapping per resource, relationship field mapping per
+    related resource and reverse mapping of validated data on create.
+    """
+    help = 'Measure speedup of compiled resource mappings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=10000, help='Number of resources of every type')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs, the best one is reported')
+
+    def handle(self, *args, **options):
+        count, repeat = options['resources'], options['repeat']
+        client = Client('http://payment-api.local')
+        transactions = client.read(transaction_document(count)).resources
+        funding_sources = client.read(funding_source_document(count)).resources
+        funding_sources_data = [{'id': resource.id, 'title': resource.title} for resource in funding_sources]
+
+        scenarios = [
+            ("transactions", lambda view, field: self.apply(view, field, transactions, 3)),
+            ("funding_sources", lambda view, field: self.apply(view, field, funding_sources, 1)),
+            ("funding_sources (reverse)", lambda view, field: self.reverse(view, funding_sources_data)),
+        ]
+        self.stdout.write("Resources: %s per type, best of %s run(s)" % (count, repeat))
+        for name, scenario in scenarios:
+            durations = {}
+            for compiled in (False, True):
+                view, field = self.get_mixins(compiled)
+                durations[compiled] = min(self.measure(scenario, view, field) for _ in range(repeat))
+            self.stdout.write("%-26s generic: %.3fs, compiled: %.3fs, speedup: x%.2f" % (
+                name, durations[False], durations[True], durations[False] / durations[True]
+            ))
+
+    @staticmethod
+    def get_mixins(compiled: bool):
+        # the same mappings as ResourceViewSet.client and ExternalResourceRelatedField have
+        view = ResourceMappingMixin(resource_mapping={'id': {'op': 'copy', 'value': 'pk'}})
+        field = ResourceMappingMixin(resource_mapping=[
+            {'id': {'op': 'copy', 'value': 'pk'}},
+            {'id': {'op': 'custom', 'value': get_pk_from_identifier}}
+        ])
+        view.compile_mappings = field.compile_mappings = compiled
+        return view, field
+
+    @staticmethod
+    def measure(scenario, view, field) -> float:
+        started = time.perf_counter()
+        scenario(view, field)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def apply(view, field, resources, relationships_count):
+        for resource in resources:
+            view.apply_mapping(resource)
+            for relationship in list(resource._relationships.values())[:relationships_count]:
+                field.apply_mapping(relationship)
+
+    @staticmethod
+    def reverse(view, resources_data):
+        for data in resources_data:
+            # mapping of validated data is applied in place, give it the copy of original data
+            view.reverse_mapping(dict(data, pk=data['id']))
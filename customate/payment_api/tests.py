@@ -1,3 +1,247 @@
-from django.test import TestCase
+import copy
+import json
+import threading
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from rest_framework.fields import CharField, IntegerField
+from rest_framework_json_api.renderers import JSONRenderer
+
+from payment_api.core.cache import ResponseCache
+from payment_api.core.client import Client
+from external_apis.pool import SessionPool
+from payment_api.core.pool import SchemaRegistry
+from payment_api.core.resource.fields import ExternalResourceRelatedField, get_pk_from_identifier
+from payment_api.core.resource.filters import RQLFilterPlan
+from payment_api.core.resource.mixins import ResourceMappingMixin
+from payment_api.core.resource.passthrough import PassThroughPlan
+from payment_api.core.resource.serializers import ResourceMeta, ResourceSerializer
+from payment_api.serializers import TransactionSerializer
+from payment_api.views.transaction import TransactionViewSet
+
+
+class ResponseCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(size=10)
+        self.url = "http://payment-api/wallets?filter[wallets]=account.id==1&page[number]=1&page[size]=10"
+
+    def test_cached_document_is_returned_by_scope(self):
+        self.cache.set("wallets", "account-1", self.url, {"data": []}, '"etag"', ttl=60)
+
+        self.assertEqual({"data": []}, self.cache.get_fresh_json("wallets", "account-1", self.url))
+        self.assertIsNone(self.cache.get_fresh_json("wallets", "account-2", self.url))
+
+    def test_expired_response_is_kept_for_conditional_request(self):
+        self.cache.set("wallets", "account-1", self.url, {"data": []}, '"etag"', ttl=0)
+
+        self.assertIsNone(self.cache.get_fresh_json("wallets", "account-1", self.url))
+        self.assertEqual('"etag"', self.cache.get("wallets", "account-1", self.url).etag)
+
+    def test_invalidate_drops_responses_of_resource(self):
+        self.cache.set("wallets", "account-1", self.url, {"data": []}, None, ttl=60)
+        self.cache.set("payees", "account-1", self.url, {"data": []}, None, ttl=60)
+
+        self.cache.invalidate("wallets")
+
+        self.assertIsNone(self.cache.get("wallets", "account-1", self.url))
+        self.assertIsNotNone(self.cache.get("payees", "account-1", self.url))
+
+
+class SchemaRegistryTest(SimpleTestCase):
+    def test_properties_are_built_once_per_key(self):
+        registry = SchemaRegistry()
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"amount": {"type": ["null", "number"]}}
+
+        first = registry.get_properties("PaymentSerializer", build)
+        second = registry.get_properties("PaymentSerializer", build)
+
+        self.assertIs(first, second)
+        self.assertEqual(1, len(calls))
+
+
+class SessionPoolTest(SimpleTestCase):
+    def test_http_session_is_shared_within_process(self):
+        pool = SessionPool(size=2)
+
+        self.assertIs(pool.get_http_session(), pool.get_http_session())
+
+    def test_http_session_is_shared_between_threads(self):
+        pool = SessionPool(size=2, max_retries=3)
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(pool.get_http_session()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(sessions[0], pool.get_http_session())
+        self.assertEqual(3, pool.get_http_session().get_adapter("http://payment-api").max_retries.total)
+
+
+class PassThroughSerializer(ResourceSerializer):
+    name = CharField(read_only=True)
+    net_amount = IntegerField(read_only=True, source='netAmount')
+    payment = ExternalResourceRelatedField(required=False)
+
+    class Meta(ResourceMeta):
+        resource_name = 'pass_through_transactions'
+
+
+class PassThroughPlanTest(SimpleTestCase):
+    def test_upstream_resources_are_rewritten_in_place(self):
+        plan = PassThroughPlan(PassThroughSerializer())
+        resources = [{
+            "type": "transactions",
+            "id": "1",
+            "links": {"self": "http://payment-api/transactions/1"},
+            "attributes": {"name": "Load funds", "netAmount": "100", "internal": 1},
+            "relationships": {"payment": {"data": {"type": "payments", "id": "2"}}, "wallet": {"data": None}}
+        }]
+
+        plan.rewrite(resources, request=None)
+
+        self.assertEqual([{
+            "type": "pass_through_transactions",
+            "id": "1",
+            "attributes": {"name": "Load funds", "net_amount": 100},
+            "relationships": {"payment": {"data": {"type": "payments", "id": "2"}}}
+        }], resources)
+        document = json.loads("".join(plan.stream(resources, {"meta": {"pagination": {"count": 1}}})))
+        self.assertEqual(resources, document["data"])
+        self.assertEqual({"pagination": {"count": 1}}, document["meta"])
+
+
+class PassThroughRenderingTest(SimpleTestCase):
+    document = {
+        "data": [{
+            "type": "transactions",
+            "id": "3f6a2b8e-35ad-4e8b-a3f1-5d4e52f5c0a1",
+            "links": {"self": "http://payment-api.local/transactions/3f6a2b8e-35ad-4e8b-a3f1-5d4e52f5c0a1"},
+            "attributes": {
+                "active": 1, "isHidden": 0, "amount": 1000, "netAmount": 990, "closingBalance": None,
+                "name": "OUTGOING_INTERNAL", "status": "SUCCESS", "data": {"reference": "Rent \u2028 June"}
+            },
+            "relationships": {
+                "payment": {"data": {"type": "payments", "id": "6b1e0a3c-7f0b-4f44-9d43-3c8d3f2a9e10"}},
+                "origin": {"data": {"type": "funding_sources", "id": "0d5c6b0e-52a4-4a43-8b8f-2f1f3a5b1c22"}},
+                "recipient": {"data": None},
+            }
+        }],
+        "included": [
+            {"type": "payments", "id": "6b1e0a3c-7f0b-4f44-9d43-3c8d3f2a9e10", "attributes": {}},
+            {"type": "funding_sources", "id": "0d5c6b0e-52a4-4a43-8b8f-2f1f3a5b1c22", "attributes": {}},
+        ]
+    }
+
+    def render_through_serializer(self) -> dict:
+        client = Client('http://payment-api.local')
+        client.resource_mapping = {'id': {'op': 'copy', 'value': 'pk'}}
+        resources = client.read(copy.deepcopy(self.document)).resources
+        serializer = TransactionSerializer(resources, many=True, context={'client': client, 'request': None})
+        return json.loads(JSONRenderer().render(serializer.data, renderer_context={'view': TransactionViewSet()}))
+
+    def render_pass_through(self) -> dict:
+        plan = PassThroughPlan(TransactionSerializer(context={'request': None}))
+        resources = copy.deepcopy(self.document)["data"]
+        plan.rewrite(resources, request=None)
+        return json.loads("".join(plan.stream(resources, {})))
+
+    def test_pass_through_document_is_equal_to_rendered_one(self):
+        self.assertEqual(self.render_through_serializer(), self.render_pass_through())
+
+
+class CompiledResourceMappingTest(SimpleTestCase):
+    mapping = [
+        {'id': {'op': 'copy', 'value': 'pk'}},
+        {'type': {'op': 'edit', 'value': 'funds', 'old_value': 'payments'}},
+        {'fee_groups': {'op': 'map', 'value': 'feeGroup'}},
+        {'unknown': {'op': 'custom', 'value': 'not callable'}},
+    ]
+
+    def map_data(self, compile_mappings, method):
+        mixin = ResourceMappingMixin(resource_mapping=self.mapping)
+        mixin.compile_mappings = compile_mappings
+        data = {'id': '1', 'type': 'payments', 'feeGroup': '2', 'unknown': 3}
+        return getattr(mixin, method)(getattr(mixin, method)(data))
+
+    def test_compiled_mapping_is_equal_to_generic_one(self):
+        for method in ('apply_mapping', 'reverse_mapping'):
+            self.assertEqual(self.map_data(False, method), self.map_data(True, method))
+
+    @staticmethod
+    def map_resources(compile_mappings):
+        # the same mappings as ResourceViewSet.client and ExternalResourceRelatedField have, plus relationship map
+        view = ResourceMappingMixin(resource_mapping=[
+            {'id': {'op': 'copy', 'value': 'pk'}},
+            {'type': {'op': 'edit', 'value': 'funds', 'old_value': 'wallets'}},
+            {'owner': {'op': 'map', 'value': 'account'}},
+        ])
+        # reverse "map" of relationship would fetch related resource, so it's not reversed here
+        reverse_view = ResourceMappingMixin(resource_mapping=view.resource_mapping[:2])
+        field = ResourceMappingMixin(resource_mapping=[
+            {'id': {'op': 'copy', 'value': 'pk'}},
+            {'id': {'op': 'custom', 'value': get_pk_from_identifier}},
+        ])
+        view.compile_mappings = reverse_view.compile_mappings = field.compile_mappings = compile_mappings
+        resources = Client('http://payment-api.local').read({"data": [{
+            "type": "wallets",
+            "id": "5b0c7c34-9b5e-4a7e-8f51-0a2f4c1b6d01",
+            "attributes": {"currency": "GBP", "balance": 100},
+            "relationships": {"account": {"data": {"type": "accounts", "id": "8e6f1d2a-0b7c-4c3e-9a1f-2d5b7e9c4a10"}}}
+        }]}).resources
+
+        result = []
+        for resource in resources:
+            view.apply_mapping(resource)
+            relationships = resource._relationships
+            for relationship in relationships.values():
+                field.apply_mapping(relationship)
+            result.append((
+                resource.id, resource.type, resource.pk, dict(resource._attributes),
+                sorted(resource._attributes._dirty_attributes), sorted(relationships.keys()),
+                [getattr(r, 'pk', None) for r in relationships.values()]
+            ))
+            reverse_view.reverse_mapping(resource)
+            result.append((resource.type, dict(resource._attributes), sorted(resource._attributes._dirty_attributes)))
+        return result
+
+    def test_compiled_mapping_of_resource_objects_is_equal_to_generic_one(self):
+        self.assertEqual(self.map_resources(False), self.map_resources(True))
+
+
+class RQLFilterPlanView:
+    filterset_fields = {
+        'status': ('exact',),
+        'payment__wallet_id': ('in', 'exact'),
+    }
+
+    class Meta:
+        filters = [
+            {'status__exact': 'SUCCESS'},
+            {'payment__wallet_id__exact': {'method': 'get_wallet_id', 'force_override_filter': True}},
+        ]
+
+
+class RQLFilterPlanTest(SimpleTestCase):
+    def test_plan_is_compiled_once_per_view_class(self):
+        plan = RQLFilterPlan.for_view(RQLFilterPlanView())
+
+        self.assertIs(plan, RQLFilterPlan.for_view(RQLFilterPlanView()))
+        self.assertEqual(
+            {'status__exact': 'exact', 'payment__wallet_id__in': 'in', 'payment__wallet_id__exact': 'exact'},
+            plan.base_filters
+        )
+        self.assertEqual([False, True], [force_override for _, _, force_override in plan.meta_filters])
+
+    def test_filter_is_formatted_by_compiled_template(self):
+        plan = RQLFilterPlan.for_view(RQLFilterPlanView())
+
+        self.assertEqual(
+            {'[transactions]=': 'payment.walletId=in=(1,2)'},
+            plan.format('payment__wallet_id__in', '1,2', 'transactions')
+        )
+        self.assertEqual(
+            RQLFilterPlan.parse_filter(plan, 'status__exact', 'SUCCESS', 'transactions'),
+            plan.format('status__exact', 'SUCCESS', 'transactions')
+        )
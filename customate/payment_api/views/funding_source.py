@@ -45,6 +45,7 @@ class FundingSourceViewSet(ResourceViewSet):
     }
 
     class Meta:
+        response_cache_ttl = 30
         filters = [
             {'active__exact': 1},
             {'account__id__exact': {'method': 'check_payment_account_id', 'force_override_filter': True}},
@@ -89,6 +89,7 @@ class TransactionViewSet(ResourceViewSet):
     }
 
     class Meta:
+        pass_through = True
         filters = [
             {'active__exact': 1},
             {'is_hidden__exact': 0},
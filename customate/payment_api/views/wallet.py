@@ -49,6 +49,8 @@ class WalletViewSet(ResourceViewSet):
             self.get_queryset().set_empty_response()
 
     class Meta:
+        # balance is changed by payments processed in other processes, so keep it short
+        response_cache_ttl = 5
         filters = [
             {'active__exact': 1},
             {'is_virtual__exact': 0},